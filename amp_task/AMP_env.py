@@ -3,17 +3,57 @@ import numpy as np
 from isaaclab.envs import ManagerBasedRLEnv
 
 from .manager.amp_motion_manager import AMPMotionManager
+from .profiling import PROFILER
 
 class AMP_Env(ManagerBasedRLEnv):
     def __init__(self, cfg, render_mode=None, **kwargs):
         self.cfg = cfg
         super().__init__(cfg, render_mode, **kwargs)
         self.amp_motion_manager = AMPMotionManager(cfg, self, device=self.device)
-        
-    def collect_reference_motions(self, num_samples: int, current_times: np.ndarray | None = None) -> torch.Tensor:
-        return self.amp_motion_manager.collect_reference_motions(num_samples, current_times)
+        self.profiler = PROFILER
+        if self.cfg.amp.profiling:
+            self.enable_profiling(sync_device=self.cfg.amp.profiling_sync_device)
+
+    def enable_profiling(self, sync_device: bool = True, count_allocations: bool = True):
+        """Enable the (global) profiler and record the step phases: physics, managers, resets and AMP.
+
+        Returns:
+            The profiler.
+        """
+        self.profiler.configure(enabled=True, sync_device=sync_device, count_allocations=count_allocations)
+        self.profiler.instrument(self, ["step", "_reset_idx"], prefix="AMP_Env")
+        self.profiler.instrument(self.sim, ["step", "render"], prefix="sim")
+        self.profiler.instrument(self.scene, ["update", "write_data_to_sim"], prefix="scene")
+        for name in ["action", "observation", "reward", "termination", "event", "command", "curriculum"]:
+            manager = getattr(self, f"{name}_manager", None)
+            if manager is not None:
+                self.profiler.instrument(
+                    manager, ["process_action", "apply_action", "compute", "apply"], prefix=f"{name}_manager"
+                )
+        self.profiler.instrument(
+            self.amp_motion_manager,
+            [
+                "amp_step",
+                "collect_reference_motions",
+                "sample_reset_motions",
+                "refresh_reference_observation_bank",
+                "sample_reference_observation_bank",
+            ],
+            prefix="AMPMotionManager",
+        )
+        return self.profiler
+
+    def collect_reference_motions(
+        self, num_samples: int, current_times: torch.Tensor | None = None, motion_ids: torch.Tensor | None = None
+    ) -> torch.Tensor:
+        return self.amp_motion_manager.collect_reference_motions(num_samples, current_times, motion_ids)
     
     def step(self, action: torch.Tensor):
         returns = super().step(action)
         returns = self.amp_motion_manager.amp_step(returns)
-        return returns
\ No newline at end of file
+        return returns
+
+    def close(self):
+        if self.profiler.enabled and self.cfg.amp.profiling_trace_file:
+            self.profiler.export_chrome_trace(self.cfg.amp.profiling_trace_file)
+        super().close()
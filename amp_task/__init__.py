@@ -18,6 +18,15 @@ gym.register(
     },
 )
 
+gym.register(
+    id="Isaac-G1-AMP-Walk-Play-v0",
+    entry_point=AMP_Env,
+    disable_env_checker=True,
+    kwargs={
+        "env_cfg_entry_point": f"{__name__}.g1_amp_env_cfg:HumanoidEnvCfg_PLAY",
+    },
+)
+
 gym.register(
     id="Isaac-G1-AMP-Dance-v0",
     entry_point=AMP_Env,
@@ -27,6 +36,15 @@ gym.register(
     },
 )
 
+gym.register(
+    id="Isaac-G1-AMP-Dance-Play-v0",
+    entry_point=AMP_Env,
+    disable_env_checker=True,
+    kwargs={
+        "env_cfg_entry_point": f"{__name__}.g1_amp_env_cfg:G1_DanceEnvCfg_PLAY",
+    },
+)
+
 gym.register(
     id="Isaac-G1-AMP-Loco-Walk-v0",
     entry_point=AMP_Env,
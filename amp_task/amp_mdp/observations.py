@@ -8,13 +8,13 @@ from __future__ import annotations
 import torch
 from typing import TYPE_CHECKING
 
-from isaaclab.managers import SceneEntityCfg
-from isaaclab.assets import RigidObject
+from isaaclab.managers import ManagerTermBase, ObservationTermCfg, SceneEntityCfg
+from isaaclab.assets import Articulation, RigidObject
 
-from .utils import quaternion_to_tangent_and_normal
+from .utils import compute_obs, quaternion_to_tangent_and_normal
 
 if TYPE_CHECKING:
-    from isaaclab.envs import ManagerBasedEnv
+    from isaaclab.envs import ManagerBasedEnv, ManagerBasedRLEnv
 
 def body_pos_w(env: ManagerBasedEnv, asset_cfg: SceneEntityCfg = SceneEntityCfg("robot")) -> torch.Tensor:
     """
@@ -72,3 +72,53 @@ def key_body_pos_w(env: ManagerBasedEnv, asset_cfg: SceneEntityCfg = SceneEntity
     root_positions = asset.data.body_pos_w[:, asset.data.body_names.index(env.cfg.amp.reference_body)].unsqueeze(-2)
     return (key_body_positions - root_positions).view(key_body_positions.shape[0], -1)
 
+
+class amp_observation(ManagerTermBase):
+    """
+    Computes the AMP observation (see ``compute_obs``): DOF positions and velocities, reference body height,
+    tangent/normal, linear and angular velocities, and key body positions relative to the reference body.
+
+    The body indexes are resolved once. The observation is computed once per environment step (and after resets),
+    and the same tensor is returned to every observation group using this term (e.g. ``policy`` and ``amp_obs``),
+    so it must not be modified in place (e.g. with ``clip`` or ``scale`` in the term configuration).
+    It replaces the per-term functions above, which are kept as its reference (see benchmarks/amp_observation_terms.py).
+    Returns:
+        torch.Tensor: A tensor of shape (N, M) where N is the batch size and M is the AMP observation size.
+    """
+
+    def __init__(self, cfg: ObservationTermCfg, env: ManagerBasedRLEnv):
+        super().__init__(cfg, env)
+        asset_cfg: SceneEntityCfg = cfg.params.get("asset_cfg", SceneEntityCfg("robot"))
+        self._asset: Articulation = env.scene[asset_cfg.name]
+        body_names = self._asset.data.body_names
+        self._ref_body_index = body_names.index(env.cfg.amp.reference_body)
+        # reference body first, then the key bodies (gathered at once)
+        self._body_indexes = torch.tensor(
+            [self._ref_body_index] + [body_names.index(name) for name in env.cfg.amp.key_body_names],
+            dtype=torch.long,
+            device=env.device,
+        )
+        # cache shared by the instances of this term (one per observation group) of the same asset
+        if not hasattr(env, "_amp_observation_cache"):
+            env._amp_observation_cache = {}
+        self._cache = env._amp_observation_cache.setdefault(asset_cfg.name, {"step": None, "observation": None})
+
+    def reset(self, env_ids: torch.Tensor | None = None) -> None:
+        # reset environments have a new state: recompute the observation
+        self._cache["step"] = None
+
+    def __call__(self, env: ManagerBasedRLEnv, asset_cfg: SceneEntityCfg = SceneEntityCfg("robot")) -> torch.Tensor:
+        if self._cache["step"] != env.common_step_counter:
+            data = self._asset.data
+            body_positions = data.body_pos_w[:, self._body_indexes]
+            self._cache["observation"] = compute_obs(
+                data.joint_pos,
+                data.joint_vel,
+                body_positions[:, 0],
+                data.body_quat_w[:, self._ref_body_index],
+                data.body_lin_vel_w[:, self._ref_body_index],
+                data.body_ang_vel_w[:, self._ref_body_index],
+                body_positions[:, 1:],
+            )
+            self._cache["step"] = env.common_step_counter
+        return self._cache["observation"]
@@ -104,13 +104,8 @@ class ObservationsCfg:
     @configclass
     class PolicyCfg(ObsGroup):
         """Observations for the policy."""
-        dof_positions = ObsTerm(func=mdp.joint_pos)
-        dof_velocities = ObsTerm(func=mdp.joint_vel)
-        root_positions = ObsTerm(func=amp_mdp.body_pos_w)
-        root_rotations =ObsTerm(func=amp_mdp.body_quat_w)
-        root_linear_velocities =ObsTerm(func=amp_mdp.body_lin_vel_w)
-        root_angular_velocities =ObsTerm(func=amp_mdp.body_ang_vel_w)
-        key_body_positions =ObsTerm(func=amp_mdp.key_body_pos_w)
+        # AMP observation (shared with the amp_obs group: computed once per step)
+        amp_observation = ObsTerm(func=amp_mdp.amp_observation)
         actions = ObsTerm(func=mdp.last_action)
         def __post_init__(self):
             self.enable_corruption = False
@@ -119,14 +114,8 @@ class ObservationsCfg:
     @configclass
     class AmpCfg(ObsGroup):
         """Observations for the policy."""
-        dof_positions = ObsTerm(func=mdp.joint_pos)
-        dof_velocities = ObsTerm(func=mdp.joint_vel)
-        root_positions = ObsTerm(func=amp_mdp.body_pos_w)
-        root_rotations =ObsTerm(func=amp_mdp.body_quat_w)
-        root_linear_velocities =ObsTerm(func=amp_mdp.body_lin_vel_w)
-        root_angular_velocities =ObsTerm(func=amp_mdp.body_ang_vel_w)
-        key_body_positions =ObsTerm(func=amp_mdp.key_body_pos_w)
-        
+        amp_observation = ObsTerm(func=amp_mdp.amp_observation)
+
         def __post_init__(self):
             self.enable_corruption = False
             self.concatenate_terms = True
@@ -169,7 +158,44 @@ class AMPCfg:
     reference_body = "pelvis"
     num_amp_observations = 2
     num_amp_observation_space = 101
+    # motion file path, directory, glob pattern, or a list of any of them
     motion_file = os.path.join(MOTIONS_DIR, "g1_walk.npz")
+    # relative sampling weight of each motion file (if None, clips are sampled proportionally to their duration)
+    motion_weights = None
+    # motion catalog filter (see MotionCatalog.select), e.g. {"min_duration": 1.0, "max_mean_root_speed": 2.0}.
+    # If not None, motion directories are resolved (recursively) through their catalog index, keeping only the clips
+    # compatible with the robot joints and the AMP bodies, and "motion_weights" can be a catalog weighting criterion
+    # ("uniform", "duration", "num_frames" or "mean_root_speed")
+    motion_catalog_filter = None
+    # whether to memory-map the motion files (only the used DOFs and bodies are read from disk)
+    motion_mmap = True
+    # number of threads loading the motion files in parallel (0 to load them one at a time)
+    motion_num_workers = 4
+    # directory of the binary motion cache (preprocessed motion data, rebuilt if stale or corrupt),
+    # e.g. os.path.join(os.path.expanduser("~"), ".cache", "minimal_g1_amp", "motions"). None to disable
+    motion_cache_dir = None
+    # storage precision of the motion fields ("float32", "float16", "bfloat16", or "int16" for "body_rotations"),
+    # e.g. {"dof_velocities": "float16", "body_rotations": "int16"}. None to store all fields as float32
+    motion_precision = None
+    # seed of the on-device motion sampling generator (offset by the process local rank).
+    # If None, the environment seed is used, and if both are None, the global torch generator is used
+    motion_seed = None
+    # whether to precompute the AMP observation of every motion frame at load time,
+    # so that reference observations are gathered and linearly interpolated from a table
+    precompute_reference_observations = False
+    # maximum absolute difference (checked at load time) between the table and the interpolated motion observations
+    reference_observation_table_tolerance = 1e-2
+    # size of the on-device bank of reference AMP observations (the AMP agent's motion dataset). 0 to disable
+    reference_observation_bank_size = 200000
+    # number of agent updates between partial refreshes of the bank, and fraction of the bank refreshed each time
+    reference_observation_bank_refresh_interval = 1
+    reference_observation_bank_refresh_fraction = 0.0025
+    # opt-in profiling of the environment step phases (see amp_task/profiling.py): call counts, wall-clock and
+    # device-synchronized (CUDA, if profiling_sync_device) times and CUDA allocation counts.
+    # The Chrome/Perfetto trace is written to profiling_trace_file (if not None) when the environment is closed
+    profiling = False
+    profiling_sync_device = True
+    profiling_trace_file = None
     key_body_names = [ 
         "left_shoulder_pitch_link",
         "right_shoulder_pitch_link",
@@ -205,8 +231,21 @@ class HumanoidEnvCfg(ManagerBasedRLEnvCfg):
         self.sim.dt = 1 / 60.0
         self.sim.render_interval = self.decimation
 
+@configclass
+class HumanoidEnvCfg_PLAY(HumanoidEnvCfg):
+    def __post_init__(self):
+        super().__post_init__()
+        # the policy is only evaluated: the agent doesn't sample reference AMP observations
+        self.amp.reference_observation_bank_size = 0
+
 @configclass
 class G1_DanceEnvCfg(HumanoidEnvCfg):
     def __post_init__(self):
         super().__post_init__()
-        self.amp.motion_file = os.path.join(MOTIONS_DIR, "g1_dance.npz")
\ No newline at end of file
+        self.amp.motion_file = os.path.join(MOTIONS_DIR, "g1_dance.npz")
+
+@configclass
+class G1_DanceEnvCfg_PLAY(G1_DanceEnvCfg):
+    def __post_init__(self):
+        super().__post_init__()
+        self.amp.reference_observation_bank_size = 0
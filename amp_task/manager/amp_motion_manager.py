@@ -5,7 +5,7 @@ import gymnasium as gym
 
 from isaaclab.managers.manager_base import ManagerBase, ManagerTermBase
 
-from ..motions import MotionLoader
+from ..motions import MotionCatalog, MotionLibrary
 from ..amp_mdp.utils import compute_obs
 
 MOTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "motions")
@@ -19,56 +19,299 @@ class AMPMotionManager:
 
         self.amp_observation_size = self.cfg.amp.num_amp_observations * self.cfg.amp.num_amp_observation_space
         env.amp_observation_space = gym.spaces.Box(low=-np.inf, high=np.inf, shape=(self.amp_observation_size,))
-        self.amp_observation_buffer = torch.zeros(
-            (env.scene.num_envs, self.cfg.amp.num_amp_observations, self.cfg.amp.num_amp_observation_space), device=device
+        # AMP observation history (circular buffer). Each slot is stored twice (at index i and i + num_amp_observations),
+        # so that the ordered history (newest first) is always a contiguous window starting at the head index
+        num_history = self.cfg.amp.num_amp_observations
+        self._amp_history = torch.zeros(
+            (env.scene.num_envs, 2 * num_history, self.cfg.amp.num_amp_observation_space), device=device
         )
+        self._amp_history_head = 0
+        # flattened windows (one per head index), as returned to the agent
+        self._amp_history_windows = [
+            self._amp_history[:, head : head + num_history].view(-1, self.amp_observation_size)
+            for head in range(num_history)
+        ]
         
         motion_file = self.cfg.amp.motion_file
-        self._motion_loader = MotionLoader(motion_file=motion_file, device=device)
+        motion_weights = self.cfg.amp.motion_weights
+        # only the reference body and the key bodies are used by AMP
+        motion_body_names = list(dict.fromkeys([self.cfg.amp.reference_body] + list(self.cfg.amp.key_body_names)))
+        if self.cfg.amp.motion_catalog_filter is not None:
+            motion_file, motion_weights = self._select_motion_files(
+                env.scene['robot'].data.joint_names, motion_body_names
+            )
+        # on-device random number generator for motion sampling, with a different stream per process
+        motion_seed = self.cfg.amp.motion_seed if self.cfg.amp.motion_seed is not None else self.cfg.seed
+        self._generator = None
+        if motion_seed is not None:
+            local_rank = int(os.environ.get("LOCAL_RANK", 0))
+            self._generator = torch.Generator(device=device)
+            self._generator.manual_seed(motion_seed + local_rank)
+        self._motion_loader = MotionLibrary(
+            motion_files=motion_file,
+            device=device,
+            motion_weights=motion_weights,
+            dof_names=env.scene['robot'].data.joint_names,
+            body_names=motion_body_names,
+            mmap=self.cfg.amp.motion_mmap,
+            generator=self._generator,
+            cache_dir=self.cfg.amp.motion_cache_dir,
+            precision=self.cfg.amp.motion_precision,
+            num_workers=self.cfg.amp.motion_num_workers,
+        )
         
         self.ref_body_index = env.scene['robot'].data.body_names.index(self.cfg.amp.reference_body)
         self.key_body_indexes = [env.scene['robot'].data.body_names.index(name) for name in self.cfg.amp.key_body_names]
         self.motion_dof_indexes = self._motion_loader.get_dof_index(env.scene['robot'].data.joint_names)
         self.motion_ref_body_index = self._motion_loader.get_body_index([self.cfg.amp.reference_body])[0]
         self.motion_key_body_indexes = self._motion_loader.get_body_index(self.cfg.amp.key_body_names)
+        self._amp_history_steps = torch.arange(self.cfg.amp.num_amp_observations, device=device)
+        # motion data used by the AMP observation (the reference body first, then the key bodies, for positions)
+        motion_dof_indexes = torch.tensor(self.motion_dof_indexes, dtype=torch.long, device=device)
+        self._reference_motion_fields = {
+            "dof_positions": motion_dof_indexes,
+            "dof_velocities": motion_dof_indexes,
+            "body_positions": torch.tensor(
+                [self.motion_ref_body_index] + self.motion_key_body_indexes, dtype=torch.long, device=device
+            ),
+            "body_rotations": self.motion_ref_body_index,
+            "body_linear_velocities": self.motion_ref_body_index,
+            "body_angular_velocities": self.motion_ref_body_index,
+        }
 
-    def collect_reference_motions(self, num_samples: int, current_times: np.ndarray | None = None) -> torch.Tensor:
-        # sample random motion times (or use the one specified)
-        if current_times is None:
-            current_times = self._motion_loader.sample_times(num_samples)
-        times = (
-            np.expand_dims(current_times, axis=-1)
-            - self._motion_loader.dt * np.arange(0, self.cfg.amp.num_amp_observations)
-        ).flatten()
-        # get motions
-        (
-            dof_positions,
-            dof_velocities,
-            body_positions,
-            body_rotations,
-            body_linear_velocities,
-            body_angular_velocities,
-        ) = self._motion_loader.sample(num_samples=num_samples, times=times)
-        # compute AMP observation
-
-        amp_observation = compute_obs(
-            dof_positions[:, self.motion_dof_indexes],
-            dof_velocities[:, self.motion_dof_indexes],
+        # per-frame AMP observation table (reference observations are then interpolated from it)
+        self._reference_observation_table = None
+        if self.cfg.amp.precompute_reference_observations:
+            self._reference_observation_table = self._compute_reference_observation_table()
+            self._check_reference_observation_table(num_samples=4096)
+
+        # on-device bank of reference AMP observations (refreshed partially, on a schedule)
+        self._reference_observation_bank = None
+        if self.cfg.amp.reference_observation_bank_size:
+            self._init_reference_observation_bank(device)
+
+    def _select_motion_files(self, dof_names: list[str], body_names: list[str]) -> tuple[list[str], list[float] | None]:
+        """Select the motion files (and their sampling weights) of the motion directories from their catalog index.
+
+        Returns:
+            Motion file paths, and their sampling weights (None to weight them by duration when loading).
+        """
+        motion_files = self.cfg.amp.motion_file
+        motion_files = [motion_files] if isinstance(motion_files, str) else list(motion_files)
+        weight_by = self.cfg.amp.motion_weights
+        assert weight_by is None or isinstance(weight_by, str), (
+            "Motion weights must be a catalog weighting criterion when using the motion catalog"
+        )
+        assert weight_by is None or all(os.path.isdir(entry) for entry in motion_files), (
+            "Catalog weighting criteria are only supported when all motion file entries are directories"
+        )
+        paths, weights = [], []
+        for entry in motion_files:
+            if not os.path.isdir(entry):
+                paths.extend(MotionLibrary.resolve_motion_files(entry))
+                continue
+            catalog = MotionCatalog(entry, reference_body=self.cfg.amp.reference_body)
+            num_indexed = catalog.update()
+            selected = catalog.select(dof_names=dof_names, body_names=body_names, **self.cfg.amp.motion_catalog_filter)
+            print(
+                f"[INFO] Motion catalog ({entry}): {len(selected)}/{len(catalog.entries)} motions selected"
+                f" ({num_indexed} (re)indexed)"
+            )
+            paths.extend(selected)
+            if weight_by is not None:
+                weights.extend(catalog.weights(selected, weight_by=weight_by))
+        assert len(paths), "No motion file matches the motion catalog filter"
+        return paths, weights if weight_by is not None else None
+
+    def _compute_reference_observation_table(self) -> torch.Tensor:
+        """Compute the AMP observation of every (flat) motion frame. Shape is (num_frames, num_amp_observation_space)."""
+        loader = self._motion_loader
+        body_positions = loader.get_field("body_positions")
+        return compute_obs(
+            loader.get_field("dof_positions")[:, self.motion_dof_indexes],
+            loader.get_field("dof_velocities")[:, self.motion_dof_indexes],
             body_positions[:, self.motion_ref_body_index],
-            body_rotations[:, self.motion_ref_body_index],
-            body_linear_velocities[:, self.motion_ref_body_index],
-            body_angular_velocities[:, self.motion_ref_body_index],
+            loader.get_field("body_rotations")[:, self.motion_ref_body_index],
+            loader.get_field("body_linear_velocities")[:, self.motion_ref_body_index],
+            loader.get_field("body_angular_velocities")[:, self.motion_ref_body_index],
             body_positions[:, self.motion_key_body_indexes],
         )
 
+    def _check_reference_observation_table(self, num_samples: int) -> float:
+        """Compare the table-based reference observations with the ones computed from the interpolated motion.
+
+        The table interpolates observations linearly, while the motion rotations are interpolated spherically,
+        so only the root tangent and normal terms may differ slightly between frames.
+
+        Returns:
+            Maximum absolute difference between both paths.
+        """
+        motion_ids = self._motion_loader.sample_motions(num_samples)
+        times = self._motion_loader.sample_clip_times(motion_ids)
+        error = (
+            self._compute_reference_observations(motion_ids, times, use_table=True)
+            - self._compute_reference_observations(motion_ids, times, use_table=False)
+        ).abs().max().item()
+        if error > self.cfg.amp.reference_observation_table_tolerance:
+            print(
+                f"[WARNING] The precomputed AMP observation table differs from the interpolated motion"
+                f" (max abs error: {error})"
+            )
+        return error
+
+    def _compute_reference_observations(
+        self, motion_ids: torch.Tensor, times: torch.Tensor, use_table: bool
+    ) -> torch.Tensor:
+        """Compute the AMP observations of the motion clips at the given times. Shape is (N, num_amp_observation_space)."""
+        # gather and interpolate the precomputed observations
+        if use_table:
+            index_0, index_1, blend = self._motion_loader._compute_clip_frame_blend(motion_ids, times)
+            table = self._reference_observation_table
+            return torch.lerp(table[index_0], table[index_1], blend.unsqueeze(-1))
+        # get only the motion data used by the AMP observation
+        motion = self._motion_loader.sample_fields(
+            num_samples=motion_ids.shape[0], fields=self._reference_motion_fields, motion_ids=motion_ids, times=times
+        )
+        return self._compute_motion_observations(motion)
+
+    def _compute_motion_observations(self, motion: dict[str, torch.Tensor]) -> torch.Tensor:
+        """Compute the AMP observations of motion samples (see ``_reference_motion_fields``).
+        Shape is (N, num_amp_observation_space)."""
+        return compute_obs(
+            motion["dof_positions"],
+            motion["dof_velocities"],
+            motion["body_positions"][:, 0],
+            motion["body_rotations"],
+            motion["body_linear_velocities"],
+            motion["body_angular_velocities"],
+            motion["body_positions"][:, 1:],
+        )
+
+    def _get_history_times(
+        self, motion_ids: torch.Tensor, current_times: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Get the (flattened) motion clips and times of the AMP observation history, the current time first.
+        Shape is (N * num_amp_observations,)."""
+        times = (
+            current_times.unsqueeze(-1)
+            - self._motion_loader.motion_dts[motion_ids].unsqueeze(-1) * self._amp_history_steps
+        ).flatten()
+        motion_ids = motion_ids.unsqueeze(-1).expand(-1, self.cfg.amp.num_amp_observations).flatten()
+        return motion_ids, times
+
+    def sample_reset_motions(self, num_samples: int) -> tuple[dict[str, torch.Tensor], torch.Tensor]:
+        """Sample random motion states to reset environments to, together with their AMP observation history.
+
+        The current frame and the history frames are sampled at once (see ``_reference_motion_fields``),
+        and both the motion states and the AMP observations are computed from that single sample.
+
+        Args:
+            num_samples: Number of reset states to sample.
+
+        Returns:
+            Motion states at the sampled times: robot DOF positions/velocities (shape is (N, D)),
+            reference and key body positions (shape is (N, 1 + K, 3)), and reference body rotations and
+            linear/angular velocities. AMP observation history (current observation first).
+            Shape is (N, num_amp_observations, num_amp_observation_space).
+        """
+        num_history = self.cfg.amp.num_amp_observations
+        motion_ids = self._motion_loader.sample_motions(num_samples)
+        motion_ids, times = self._get_history_times(motion_ids, self._motion_loader.sample_clip_times(motion_ids))
+        motion = self._motion_loader.sample_fields(
+            num_samples=motion_ids.shape[0], fields=self._reference_motion_fields, motion_ids=motion_ids, times=times
+        )
+        amp_observations = self._compute_motion_observations(motion).view(num_samples, num_history, -1)
+        states = {
+            name: values.view(num_samples, num_history, *values.shape[1:])[:, 0] for name, values in motion.items()
+        }
+        return states, amp_observations
+
+    def _init_reference_observation_bank(self, device, chunk_size: int = 65536) -> None:
+        """Allocate and fill the reference observation bank."""
+        bank_size = self.cfg.amp.reference_observation_bank_size
+        self._reference_observation_bank = torch.empty((bank_size, self.amp_observation_size), device=device)
+        for start in range(0, bank_size, chunk_size):
+            num_samples = min(chunk_size, bank_size - start)
+            self._reference_observation_bank[start : start + num_samples] = self.collect_reference_motions(num_samples)
+        refresh_size = max(1, round(self.cfg.amp.reference_observation_bank_refresh_fraction * bank_size))
+        self._reference_observation_bank_offsets = torch.arange(min(refresh_size, bank_size), device=device)
+        self._reference_observation_bank_cursor = 0
+        self._reference_observation_bank_updates = 0
+
+    @property
+    def reference_observation_bank_size(self) -> int:
+        """Number of reference AMP observations in the bank (0 if disabled)."""
+        bank = self._reference_observation_bank
+        return 0 if bank is None else bank.shape[0]
+
+    def refresh_reference_observation_bank(self) -> int:
+        """Advance the bank refresh schedule by one agent update, and refresh the oldest part of the bank when due.
+
+        Returns:
+            Number of refreshed reference observations.
+        """
+        self._reference_observation_bank_updates += 1
+        if self._reference_observation_bank_updates % self.cfg.amp.reference_observation_bank_refresh_interval:
+            return 0
+        bank_size = self._reference_observation_bank.shape[0]
+        indexes = (self._reference_observation_bank_offsets + self._reference_observation_bank_cursor) % bank_size
+        self._reference_observation_bank.index_copy_(0, indexes, self.collect_reference_motions(indexes.shape[0]))
+        self._reference_observation_bank_cursor = (self._reference_observation_bank_cursor + indexes.shape[0]) % bank_size
+        return indexes.shape[0]
+
+    def sample_reference_observation_bank(self, num_samples: int) -> torch.Tensor:
+        """Draw random reference AMP observations (with replacement) from the bank.
+
+        Args:
+            num_samples: Number of reference observations to draw.
+
+        Returns:
+            Reference AMP observations. Shape is (N, num_amp_observations * num_amp_observation_space).
+        """
+        bank = self._reference_observation_bank
+        indexes = torch.randint(bank.shape[0], (num_samples,), device=bank.device, generator=self._generator)
+        return bank.index_select(0, indexes)
+
+    def collect_reference_motions(
+        self, num_samples: int, current_times: torch.Tensor | None = None, motion_ids: torch.Tensor | None = None
+    ) -> torch.Tensor:
+        # sample random motion clips and times (or use the ones specified)
+        if motion_ids is None:
+            motion_ids = self._motion_loader.sample_motions(num_samples)
+        if current_times is None:
+            current_times = self._motion_loader.sample_clip_times(motion_ids)
+        motion_ids, times = self._get_history_times(motion_ids, current_times)
+        amp_observation = self._compute_reference_observations(
+            motion_ids, times, use_table=self._reference_observation_table is not None
+        )
         return amp_observation.view(-1, self.amp_observation_size)
     
+    @property
+    def amp_observation_buffer(self) -> torch.Tensor:
+        """AMP observation history (newest first, read-only view). Shape is (num_envs, num_amp_observations, D)."""
+        num_history = self.cfg.amp.num_amp_observations
+        return self._amp_history[:, self._amp_history_head : self._amp_history_head + num_history]
+
+    def reset_amp_observations(self, env_ids: torch.Tensor, amp_observations: torch.Tensor) -> None:
+        """Overwrite the AMP observation history of the reset environments.
+
+        Args:
+            env_ids: Reset environment indexes. Shape is (N,).
+            amp_observations: AMP observation history (newest first). Shape is (N, num_amp_observations, D).
+        """
+        # rotate the history so that it starts at the head index
+        amp_observations = torch.roll(amp_observations, shifts=self._amp_history_head, dims=1)
+        self._amp_history[env_ids] = torch.cat([amp_observations, amp_observations], dim=1)
+
     def amp_step(self, env_returns):
-        # update AMP observation history
-        for i in reversed(range(self.cfg.amp.num_amp_observations - 1)):
-            self.amp_observation_buffer[:, i + 1] = self.amp_observation_buffer[:, i]
-        # build AMP observation
-        self.amp_observation_buffer[:, 0] = env_returns[0]['amp_obs'].clone()
-        self.extras = {"amp_obs": self.amp_observation_buffer.view(-1, self.amp_observation_size)}
-        env_returns[-1]["amp_obs"] = self.amp_observation_buffer.view(-1, self.amp_observation_size)
-        return env_returns
\ No newline at end of file
+        # update AMP observation history: move the head back and write the newest observation (in both copies)
+        num_history = self.cfg.amp.num_amp_observations
+        self._amp_history_head = (self._amp_history_head - 1) % num_history
+        amp_observation = env_returns[0]['amp_obs']
+        self._amp_history[:, self._amp_history_head].copy_(amp_observation)
+        self._amp_history[:, self._amp_history_head + num_history].copy_(amp_observation)
+        # build AMP observation (flattened history window, without copy)
+        amp_observations = self._amp_history_windows[self._amp_history_head]
+        self.extras = {"amp_obs": amp_observations}
+        env_returns[-1]["amp_obs"] = amp_observations
+        return env_returns
@@ -8,4 +8,7 @@ AMP Motion Loader and motion files.
 """
 
 from .motion_loader import MotionLoader
+from .motion_catalog import MotionCatalog
+from .motion_kinematics import URDFKinematics
+from .motion_library import MotionLibrary
 from .motion_viewer import MotionViewer
@@ -0,0 +1,209 @@
+# Copyright (c) 2022-2025, The Isaac Lab Project Developers (https://github.com/isaac-sim/IsaacLab/blob/main/CONTRIBUTORS.md).
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""
+Binary cache of preprocessed motion data.
+
+A cache file holds the motion data as it is loaded by :class:`MotionLoader` (selected fields, DOFs and bodies,
+as float32 arrays), so that later launches only have to memory-map it. The layout is:
+
+* magic bytes (8 bytes) and cache format version (uint32, little-endian)
+* header size (uint32, little-endian) and JSON header (metadata, array offsets/shapes/dtypes, payload checksum)
+* payload: the arrays (C-contiguous), each one aligned to ``ALIGNMENT`` bytes from the start of the file
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import numpy as np
+import os
+import struct
+import tempfile
+import zlib
+from collections.abc import Mapping
+from typing import Any, Optional
+
+CACHE_MAGIC = b"AMPMOTN\x00"
+"""Magic bytes at the beginning of a cache file."""
+
+CACHE_VERSION = 1
+"""Cache format version. Increment it when the layout or the preprocessing changes."""
+
+ALIGNMENT = 64
+"""Alignment (in bytes) of the arrays in a cache file."""
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _chmod_default(path: str) -> None:
+    # mkstemp creates the file readable by the owner only: use the default permissions (0666 minus the umask)
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, 0o666 & ~umask)
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 hash of a file content.
+
+    Args:
+        path: File path.
+        chunk_size: Size of the chunks read from the file.
+
+    Returns:
+        Hexadecimal hash.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_hash(cache_dir: str, motion_file: str) -> str:
+    """Get the SHA-256 hash of a motion file content, without reading the file if it didn't change.
+
+    The hash is recorded in the cache directory (``sources`` subdirectory), with the file modification time and
+    size. It is only recomputed when the file path is new or its modification time or size changed.
+
+    Args:
+        cache_dir: Cache directory.
+        motion_file: Motion file path.
+
+    Returns:
+        Hexadecimal hash.
+    """
+    path = os.path.abspath(motion_file)
+    stat = os.stat(path)
+    record_path = os.path.join(cache_dir, "sources", f"{hashlib.sha256(path.encode()).hexdigest()[:32]}.json")
+    try:
+        with open(record_path) as file:
+            record = json.load(file)
+        if record["path"] == path and record["mtime_ns"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+            return record["hash"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    digest = file_hash(path)
+    record = {"path": path, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": digest}
+    # the record is only a shortcut: failing to write it is not an error
+    try:
+        os.makedirs(os.path.dirname(record_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(record_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(record, file)
+            _chmod_default(tmp_path)
+            os.replace(tmp_path, record_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except OSError:
+        pass
+    return digest
+
+
+def motion_cache_path(cache_dir: str, motion_file: str, options: Mapping[str, Any]) -> str:
+    """Get the cache file path of a motion file for the given loader options.
+
+    Args:
+        cache_dir: Cache directory.
+        motion_file: Motion file path.
+        options: Loader options that change the cached data (must be JSON serializable).
+
+    Returns:
+        Cache file path, keyed by the motion file content (see :func:`source_hash`), the loader options
+        and the cache format version.
+    """
+    key = json.dumps(
+        {"source": source_hash(cache_dir, motion_file), "options": options, "version": CACHE_VERSION}, sort_keys=True
+    )
+    name = os.path.splitext(os.path.basename(motion_file))[0]
+    return os.path.join(cache_dir, f"{name}-{hashlib.sha256(key.encode()).hexdigest()[:32]}.motion")
+
+
+def save_motion_cache(path: str, metadata: Mapping[str, Any], arrays: Mapping[str, np.ndarray]) -> None:
+    """Write a cache file (atomically).
+
+    Args:
+        path: Cache file path.
+        metadata: Motion metadata (must be JSON serializable).
+        arrays: Motion arrays.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    # compute the array offsets (relative to the payload start)
+    entries, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        entries[name] = {"offset": offset, "shape": list(array.shape), "dtype": array.dtype.str}
+        offset += array.nbytes
+    payload_size = offset
+    # the payload checksum is computed over the padded payload, as it is laid out in the file
+    payload = bytearray(payload_size)
+    for name, array in arrays.items():
+        start = entries[name]["offset"]
+        payload[start : start + array.nbytes] = array.tobytes()
+    header = {
+        "metadata": dict(metadata),
+        "arrays": entries,
+        "payload_size": payload_size,
+        "checksum": zlib.crc32(payload),
+    }
+    header_bytes = json.dumps(header).encode()
+    payload_start = _align(len(CACHE_MAGIC) + 8 + len(header_bytes))
+    header_bytes = header_bytes.ljust(payload_start - len(CACHE_MAGIC) - 8, b" ")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(CACHE_MAGIC)
+            file.write(struct.pack("<II", CACHE_VERSION, len(header_bytes)))
+            file.write(header_bytes)
+            file.write(payload)
+        _chmod_default(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_motion_cache(path: str) -> Optional[tuple[dict[str, Any], dict[str, np.ndarray]]]:
+    """Read a cache file.
+
+    Args:
+        path: Cache file path.
+
+    Returns:
+        Motion metadata and (memory-mapped) motion arrays, or None if the cache file doesn't exist,
+        has a different format version, or is corrupt.
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "rb") as file:
+            if file.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None
+            version, header_size = struct.unpack("<II", file.read(8))
+            if version != CACHE_VERSION:
+                return None
+            header = json.loads(file.read(header_size))
+        payload_start = len(CACHE_MAGIC) + 8 + header_size
+        payload = np.memmap(path, dtype=np.uint8, mode="r", offset=payload_start, shape=(header["payload_size"],))
+        if zlib.crc32(payload) != header["checksum"]:
+            return None
+        arrays = {}
+        for name, entry in header["arrays"].items():
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"]))
+            arrays[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=entry["offset"]).reshape(
+                entry["shape"]
+            )
+        return header["metadata"], arrays
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
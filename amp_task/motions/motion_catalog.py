@@ -0,0 +1,244 @@
+# Copyright (c) 2022-2025, The Isaac Lab Project Developers (https://github.com/isaac-sim/IsaacLab/blob/main/CONTRIBUTORS.md).
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+from __future__ import annotations
+
+import fnmatch
+import json
+import numpy as np
+import os
+import tempfile
+from collections.abc import Sequence
+from typing import Any, Optional
+
+try:
+    from .motion_loader import load_npz
+except ImportError:
+    from motion_loader import load_npz
+
+CATALOG_VERSION = 1
+"""Catalog index format version. Increment it when the stored metadata changes."""
+
+
+class MotionCatalog:
+    """
+    Persistent index of the motion files (NumPy-file format) of a directory.
+
+    The index holds the metadata (FPS, number of frames, duration, DOF and body names) and summary statistics
+    (mean root speed and height) of every motion file, so that clips can be selected, filtered and weighted
+    without opening them. It is updated incrementally: only new files, or files whose modification time or size
+    changed, are read.
+    """
+
+    def __init__(self, motion_dir: str, index_file: Optional[str] = None, reference_body: str = "pelvis") -> None:
+        """Load the catalog index (if any) of a motion directory.
+
+        Args:
+            motion_dir: Directory containing the motion files (searched recursively).
+            index_file: Catalog index file path. If not defined, ``motion_catalog.json`` in the motion directory.
+            reference_body: Body used to compute the root statistics. If a motion doesn't have it,
+                its first body is used.
+
+        Raises:
+            AssertionError: If the specified motion directory doesn't exist.
+        """
+        assert os.path.isdir(motion_dir), f"Invalid directory path: {motion_dir}"
+        self.motion_dir = motion_dir
+        self.index_file = os.path.join(motion_dir, "motion_catalog.json") if index_file is None else index_file
+        self.reference_body = reference_body
+        self._entries: dict[str, dict[str, Any]] = {}
+        if os.path.isfile(self.index_file):
+            try:
+                with open(self.index_file) as file:
+                    index = json.load(file)
+                if index.get("version") == CATALOG_VERSION and index.get("reference_body") == reference_body:
+                    self._entries = index["entries"]
+            except (OSError, ValueError, KeyError):
+                self._entries = {}
+
+    @property
+    def entries(self) -> dict[str, dict[str, Any]]:
+        """Catalog entries, mapped by motion file path (relative to the motion directory)."""
+        return self._entries
+
+    def update(self) -> int:
+        """Index the new and modified motion files, remove the deleted ones, and save the index (if changed).
+
+        If the index can't be written (e.g. read-only motion directory), a warning is printed and the in-memory
+        index is used.
+
+        Returns:
+            Number of (re)indexed motion files.
+        """
+        entries, num_indexed = {}, 0
+        for path in sorted(
+            os.path.relpath(os.path.join(root, name), self.motion_dir)
+            for root, _, names in os.walk(self.motion_dir)
+            for name in names
+            if name.endswith(".npz")
+        ):
+            stat = os.stat(os.path.join(self.motion_dir, path))
+            entry = self._entries.get(path)
+            if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                try:
+                    entry = self._index_file(os.path.join(self.motion_dir, path))
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"[WARNING] Unable to index the motion file ({path}): {e}")
+                    continue
+                entry.update({"mtime_ns": stat.st_mtime_ns, "size": stat.st_size})
+                num_indexed += 1
+            entries[path] = entry
+        changed = num_indexed or entries.keys() != self._entries.keys()
+        self._entries = entries
+        if changed:
+            try:
+                self.save()
+            except OSError as e:
+                # e.g. read-only motion directory: keep the in-memory index
+                print(f"[WARNING] Unable to write the motion catalog ({self.index_file}): {e}")
+        return num_indexed
+
+    def save(self) -> None:
+        """Write the catalog index (atomically)."""
+        index = {"version": CATALOG_VERSION, "reference_body": self.reference_body, "entries": self._entries}
+        directory = os.path.dirname(os.path.abspath(self.index_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(index, file)
+            # mkstemp creates the file readable by the owner only: use the default permissions
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+            os.replace(tmp_path, self.index_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _index_file(self, motion_file: str) -> dict[str, Any]:
+        """Read the metadata and compute the summary statistics of a motion file.
+
+        Args:
+            motion_file: Motion file path.
+
+        Returns:
+            Catalog entry (without the file modification time and size).
+        """
+        data = load_npz(motion_file, mmap=True)
+        dof_names = data["dof_names"].tolist()
+        body_names = data["body_names"].tolist()
+        fps = float(data["fps"])
+        num_frames = int(data["dof_positions"].shape[0])
+        root_index = body_names.index(self.reference_body) if self.reference_body in body_names else 0
+        root_positions = np.asarray(data["body_positions"][:, root_index], dtype=np.float64)
+        root_velocities = np.asarray(data["body_linear_velocities"][:, root_index], dtype=np.float64)
+        return {
+            "fps": fps,
+            "num_frames": num_frames,
+            "duration": (num_frames - 1) / fps,
+            "dof_names": dof_names,
+            "body_names": body_names,
+            "mean_root_speed": float(np.linalg.norm(root_velocities, axis=-1).mean()),
+            "mean_root_height": float(root_positions[:, 2].mean()),
+        }
+
+    def select(
+        self,
+        dof_names: Optional[Sequence[str]] = None,
+        body_names: Optional[Sequence[str]] = None,
+        pattern: Optional[str] = None,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        min_mean_root_speed: Optional[float] = None,
+        max_mean_root_speed: Optional[float] = None,
+    ) -> list[str]:
+        """Select motion files from the index.
+
+        Args:
+            dof_names: DOFs (e.g., the robot joint names) that the motions must have.
+            body_names: Bodies that the motions must have.
+            pattern: Shell-style pattern that the motion file paths (relative to the motion directory) must match.
+            min_duration: Minimum motion duration (in seconds).
+            max_duration: Maximum motion duration (in seconds).
+            min_mean_root_speed: Minimum mean root speed (in m/s).
+            max_mean_root_speed: Maximum mean root speed (in m/s).
+
+        Returns:
+            Selected motion file paths (sorted).
+        """
+        selected = []
+        for path, entry in self._entries.items():
+            if dof_names is not None and not set(dof_names).issubset(entry["dof_names"]):
+                continue
+            if body_names is not None and not set(body_names).issubset(entry["body_names"]):
+                continue
+            if pattern is not None and not fnmatch.fnmatch(path, pattern):
+                continue
+            if (min_duration is not None and entry["duration"] < min_duration) or (
+                max_duration is not None and entry["duration"] > max_duration
+            ):
+                continue
+            if (min_mean_root_speed is not None and entry["mean_root_speed"] < min_mean_root_speed) or (
+                max_mean_root_speed is not None and entry["mean_root_speed"] > max_mean_root_speed
+            ):
+                continue
+            selected.append(os.path.join(self.motion_dir, path))
+        return sorted(selected)
+
+    def weights(self, motion_files: Sequence[str], weight_by: str = "duration") -> list[float]:
+        """Compute the sampling weight of motion files from the index.
+
+        Args:
+            motion_files: Motion file paths (as returned by :meth:`select`).
+            weight_by: Weighting criterion: ``"uniform"``, ``"duration"``, ``"num_frames"`` or ``"mean_root_speed"``.
+
+        Raises:
+            AssertionError: If the weighting criterion is not supported.
+
+        Returns:
+            Sampling weight of each motion file.
+        """
+        assert weight_by in ["uniform", "duration", "num_frames", "mean_root_speed"], (
+            f"Unsupported weighting criterion: {weight_by}"
+        )
+        if weight_by == "uniform":
+            return [1.0] * len(motion_files)
+        return [float(self.get_entry(path)[weight_by]) for path in motion_files]
+
+    def get_entry(self, motion_file: str) -> dict[str, Any]:
+        """Get the catalog entry of a motion file.
+
+        Args:
+            motion_file: Motion file path (as returned by :meth:`select`, or relative to the motion directory).
+
+        Raises:
+            KeyError: If the motion file is not indexed.
+
+        Returns:
+            Catalog entry.
+        """
+        if os.path.isabs(motion_file) or not os.path.isfile(os.path.join(self.motion_dir, motion_file)):
+            motion_file = os.path.relpath(motion_file, self.motion_dir)
+        return self._entries[motion_file]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", type=str, required=True, help="Motion directory")
+    parser.add_argument("--index-file", type=str, default=None, help="Catalog index file")
+    parser.add_argument("--reference-motion", type=str, default=None, help="Motion file with the required DOFs")
+    args = parser.parse_args()
+
+    catalog = MotionCatalog(args.dir, index_file=args.index_file)
+    print(f"Indexed motion files: {catalog.update()} (total: {len(catalog.entries)})")
+    dof_names = None
+    if args.reference_motion is not None:
+        dof_names = load_npz(args.reference_motion)["dof_names"].tolist()
+    selected = catalog.select(dof_names=dof_names)
+    print(f"- compatible motion files: {len(selected)}")
+    print(f"- duration: {sum(catalog.get_entry(path)['duration'] for path in selected):.1f} sec")
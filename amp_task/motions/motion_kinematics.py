@@ -0,0 +1,313 @@
+# Copyright (c) 2022-2025, The Isaac Lab Project Developers (https://github.com/isaac-sim/IsaacLab/blob/main/CONTRIBUTORS.md).
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+from __future__ import annotations
+
+import numpy as np
+import os
+import torch
+import xml.etree.ElementTree as ET
+from collections.abc import Sequence
+from typing import Optional
+
+try:
+    from .motion_loader import load_npz
+except ImportError:
+    from motion_loader import load_npz
+
+DEFAULT_URDF_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "usd", "g1_29dof_rev_1_0.urdf")
+"""Bundled G1 (29 DOF) URDF file."""
+
+MOVABLE_JOINT_TYPES = ("revolute", "continuous", "prismatic")
+"""URDF joint types with a DOF (the other types, except the floating base, are treated as fixed)."""
+
+
+def _rpy_to_matrix(rpy: Sequence[float]) -> np.ndarray:
+    """Rotation matrix of URDF roll-pitch-yaw angles (fixed axes X, Y, Z): Rz(yaw) Ry(pitch) Rx(roll)."""
+    (cr, cp, cy), (sr, sp, sy) = np.cos(rpy), np.sin(rpy)
+    return np.array([
+        [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+        [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+        [-sp, cp * sr, cp * cr],
+    ])
+
+
+def quaternion_to_matrix(quaternions: torch.Tensor) -> torch.Tensor:
+    """Rotation matrices (..., 3, 3) of quaternions (..., 4) (w, x, y, z). The quaternions are normalized."""
+    w, x, y, z = torch.unbind(quaternions / torch.linalg.norm(quaternions, dim=-1, keepdim=True), dim=-1)
+    return torch.stack([
+        1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y),
+        2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x),
+        2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y),
+    ], dim=-1).reshape(quaternions.shape[:-1] + (3, 3))
+
+
+def matrix_to_quaternion(matrices: torch.Tensor) -> torch.Tensor:
+    """Quaternions (..., 4) (w, x, y, z) of rotation matrices (..., 3, 3).
+
+    The quaternion sign follows Eigen's conversion (as pinocchio): positive w if the trace is positive, otherwise
+    computed from the largest diagonal element.
+    """
+    m = matrices
+    trace = m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2]
+    # trace > 0
+    s = torch.sqrt(torch.clamp(trace + 1, min=1e-12))
+    f = 0.5 / s
+    candidates = [torch.stack([
+        0.5 * s, (m[..., 2, 1] - m[..., 1, 2]) * f, (m[..., 0, 2] - m[..., 2, 0]) * f, (m[..., 1, 0] - m[..., 0, 1]) * f
+    ], dim=-1)]
+    # largest diagonal element i (with j = i + 1 and k = i + 2, modulo 3)
+    for i in range(3):
+        j, k = (i + 1) % 3, (i + 2) % 3
+        s = torch.sqrt(torch.clamp(m[..., i, i] - m[..., j, j] - m[..., k, k] + 1, min=1e-12))
+        f = 0.5 / s
+        q = [None] * 4
+        q[0] = (m[..., k, j] - m[..., j, k]) * f
+        q[1 + i] = 0.5 * s
+        q[1 + j] = (m[..., j, i] + m[..., i, j]) * f
+        q[1 + k] = (m[..., k, i] + m[..., i, k]) * f
+        candidates.append(torch.stack(q, dim=-1))
+    largest = torch.where(m[..., 1, 1] > m[..., 0, 0], 1, 0)
+    largest = torch.where(m[..., 2, 2] > torch.gather(
+        torch.diagonal(m, dim1=-2, dim2=-1), -1, largest.unsqueeze(-1)).squeeze(-1), 2, largest)
+    case = torch.where(trace > 0, 0, largest + 1)
+    candidates = torch.stack(candidates, dim=-2)
+    return torch.gather(candidates, -2, case[..., None, None].expand(case.shape + (1, 4))).squeeze(-2)
+
+
+class URDFKinematics:
+    """
+    Batched forward kinematics of a URDF kinematic tree (floating base), in PyTorch.
+
+    The URDF file is parsed once. The world poses of the requested links are computed for all frames in a single
+    pass: the joint transforms of all links are computed at once, then composed with their parent's pose one tree
+    depth at a time (one batched matrix product per depth).
+    """
+
+    def __init__(
+        self,
+        urdf_file: str = DEFAULT_URDF_FILE,
+        body_names: Optional[Sequence[str]] = None,
+        device: torch.device | str = "cpu",
+        dtype: torch.dtype = torch.float64,
+    ) -> None:
+        """Parse a URDF file.
+
+        Args:
+            urdf_file: URDF file path. Its root link is the floating base.
+            body_names: Links whose poses are computed. If not defined, all links.
+            device: The device to compute the kinematics on.
+            dtype: The floating point type of the computation.
+
+        Raises:
+            AssertionError: If the URDF file doesn't exist, doesn't have a single root link, or if a link is missing.
+        """
+        assert os.path.isfile(urdf_file), f"Invalid file path: {urdf_file}"
+        self.device = device
+        self.dtype = dtype
+        robot = ET.parse(urdf_file).getroot()
+
+        joints = {}  # child link -> (joint name, type, parent link, origin translation, origin rotation, axis)
+        self.joint_names = []
+        for joint in robot.findall("joint"):
+            if joint.get("type") == "floating":
+                continue
+            origin, axis = joint.find("origin"), joint.find("axis")
+            xyz = [0.0] * 3 if origin is None else [float(v) for v in origin.get("xyz", "0 0 0").split()]
+            rpy = [0.0] * 3 if origin is None else [float(v) for v in origin.get("rpy", "0 0 0").split()]
+            axis = [1.0, 0.0, 0.0] if axis is None else [float(v) for v in axis.get("xyz").split()]
+            child = joint.find("child").get("link")
+            joints[child] = (joint.get("name"), joint.get("type"), joint.find("parent").get("link"), xyz, rpy, axis)
+            if joint.get("type") in MOVABLE_JOINT_TYPES:
+                self.joint_names.append(joint.get("name"))
+        link_names = [link.get("name") for link in robot.findall("link")]
+        roots = [name for name in link_names if name not in joints]
+        assert len(roots) == 1, f"The URDF file must have a single root link (found: {roots})"
+        self.root_name = roots[0]
+
+        self.body_names = list(link_names if body_names is None else body_names)
+        for name in self.body_names:
+            assert name in link_names, f"Link not found in the URDF file: {name}"
+
+        # links needed to compute the requested ones (the requested links and their ancestors), sorted by depth
+        depths = {self.root_name: 0}
+
+        def depth(name: str) -> int:
+            if name not in depths:
+                depths[name] = depth(joints[name][2]) + 1
+            return depths[name]
+
+        needed = set()
+        for name in self.body_names:
+            while name not in needed:
+                needed.add(name)
+                if name == self.root_name:
+                    break
+                name = joints[name][2]
+        self._link_names = sorted(needed, key=lambda name: (depth(name), link_names.index(name)))
+        link_index = {name: i for i, name in enumerate(self._link_names)}
+        num_links = len(self._link_names)
+
+        parents = np.zeros(num_links, dtype=np.int64)
+        translations = np.zeros((num_links, 3))
+        rotations = np.tile(np.eye(3), (num_links, 1, 1))
+        axes = np.zeros((num_links, 3))
+        self._link_joints = [None] * num_links  # joint name of the movable joints
+        revolute = np.zeros(num_links, dtype=bool)
+        prismatic = np.zeros(num_links, dtype=bool)
+        for i, name in enumerate(self._link_names[1:], start=1):
+            joint_name, joint_type, parent, xyz, rpy, axis = joints[name]
+            parents[i] = link_index[parent]
+            translations[i] = xyz
+            rotations[i] = _rpy_to_matrix(rpy)
+            axes[i] = np.array(axis) / np.linalg.norm(axis)
+            if joint_type in MOVABLE_JOINT_TYPES:
+                self._link_joints[i] = joint_name
+                revolute[i] = joint_type != "prismatic"
+                prismatic[i] = joint_type == "prismatic"
+
+        tensor = lambda x: torch.tensor(x, dtype=dtype, device=device)  # noqa: E731
+        self._parents = torch.tensor(parents, device=device)
+        self._translations = tensor(translations)
+        self._rotations = tensor(rotations)
+        self._axes = tensor(axes)
+        self._revolute = tensor(revolute)
+        self._prismatic = tensor(prismatic)
+        # link indexes per tree depth (excluding the root)
+        link_depths = np.array([depth(name) for name in self._link_names])
+        self._levels = [
+            torch.tensor(np.nonzero(link_depths == d)[0], device=device) for d in range(1, link_depths.max() + 1)
+        ]
+        self._body_indexes = torch.tensor([link_index[name] for name in self.body_names], device=device)
+        self._dof_columns = {}
+
+    def _get_dof_columns(self, dof_names: Optional[Sequence[str]]) -> tuple[torch.Tensor, torch.Tensor]:
+        """Column of the DOF positions of each needed link's joint (0 for fixed joints), and the movable mask."""
+        key = None if dof_names is None else tuple(dof_names)
+        if key not in self._dof_columns:
+            names = self.joint_names if dof_names is None else list(dof_names)
+            columns, movable = [], []
+            for joint_name in self._link_joints:
+                assert joint_name is None or joint_name in names, f"Missing DOF: {joint_name}"
+                columns.append(0 if joint_name is None else names.index(joint_name))
+                movable.append(joint_name is not None)
+            self._dof_columns[key] = (
+                torch.tensor(columns, device=self.device),
+                torch.tensor(movable, dtype=self.dtype, device=self.device),
+            )
+        return self._dof_columns[key]
+
+    def forward(
+        self,
+        root_positions: torch.Tensor | np.ndarray,
+        root_rotations: torch.Tensor | np.ndarray,
+        dof_positions: torch.Tensor | np.ndarray,
+        dof_names: Optional[Sequence[str]] = None,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Compute the world poses of the bodies.
+
+        Args:
+            root_positions: Root link positions, with shape (N, 3).
+            root_rotations: Root link rotations (quaternions, w-x-y-z order), with shape (N, 4).
+            dof_positions: DOF positions, with shape (N, D).
+            dof_names: DOF names of the ``dof_positions`` columns. If not defined, :attr:`joint_names`
+                (movable joints in the URDF order).
+
+        Returns:
+            Body positions, with shape (N, B, 3), and rotations (quaternions, w-x-y-z order), with shape (N, B, 4).
+        """
+        as_tensor = lambda x: torch.as_tensor(x, dtype=self.dtype, device=self.device)  # noqa: E731
+        root_positions, root_rotations, dof_positions = map(as_tensor, (root_positions, root_rotations, dof_positions))
+        columns, movable = self._get_dof_columns(dof_names)
+        # link-major layout (L, N, ...): the per-depth gathers and updates are contiguous
+        q = (dof_positions[:, columns] * movable).T.contiguous()
+
+        # joint transforms (relative to the parent link): origin * joint motion (rotation or translation along the axis)
+        angles = (q * self._revolute[:, None]).unsqueeze(-1)
+        axes = self._axes[:, None].expand(q.shape + (3,))
+        zeros = torch.zeros_like(q)
+        k = torch.stack([
+            zeros, -axes[..., 2], axes[..., 1],
+            axes[..., 2], zeros, -axes[..., 0],
+            -axes[..., 1], axes[..., 0], zeros,
+        ], dim=-1).reshape(q.shape + (3, 3))
+        identity = torch.eye(3, dtype=self.dtype, device=self.device)
+        joint_rotations = identity + torch.sin(angles)[..., None] * k + (1 - torch.cos(angles))[..., None] * (k @ k)
+        local_rotations = self._rotations[:, None] @ joint_rotations
+        local_translations = self._translations[:, None] + (
+            self._rotations[:, None] @ (axes * (q * self._prismatic[:, None]).unsqueeze(-1)).unsqueeze(-1)
+        ).squeeze(-1)
+
+        # world poses, one tree depth at a time
+        num_links, num_frames = q.shape
+        rotations = torch.empty((num_links, num_frames, 3, 3), dtype=self.dtype, device=self.device)
+        positions = torch.empty((num_links, num_frames, 3), dtype=self.dtype, device=self.device)
+        rotations[0] = quaternion_to_matrix(root_rotations)
+        positions[0] = root_positions
+        for links in self._levels:
+            parents = self._parents[links]
+            parent_rotations = rotations[parents]
+            rotations[links] = parent_rotations @ local_rotations[links]
+            positions[links] = positions[parents] + (parent_rotations @ local_translations[links].unsqueeze(-1)).squeeze(-1)
+
+        positions, rotations = positions[self._body_indexes], rotations[self._body_indexes]
+        return positions.transpose(0, 1), matrix_to_quaternion(rotations.transpose(0, 1))
+
+
+def validate_motion_file(
+    motion_file: str, urdf_file: str = DEFAULT_URDF_FILE, device: torch.device | str = "cpu"
+) -> dict[str, tuple[float, float]]:
+    """Compare the body poses stored in a motion file with the forward kinematics of its DOF positions.
+
+    The first stored body is used as the root link (its stored pose is the floating base pose).
+
+    Args:
+        motion_file: Motion file path.
+        urdf_file: URDF file path.
+        device: The device to compute the kinematics on.
+
+    Returns:
+        Maximum position error (in meters) and rotation error (in radians) over the frames, for each body.
+    """
+    data = load_npz(motion_file)
+    body_names = data["body_names"].tolist()
+    kinematics = URDFKinematics(urdf_file, body_names=body_names, device=device)
+    assert body_names[0] == kinematics.root_name, (
+        f"The first body of the motion ({body_names[0]}) must be the URDF root link ({kinematics.root_name})"
+    )
+    body_positions = torch.as_tensor(data["body_positions"], dtype=kinematics.dtype, device=device)
+    body_rotations = torch.as_tensor(data["body_rotations"], dtype=kinematics.dtype, device=device)
+    positions, rotations = kinematics.forward(
+        body_positions[:, 0], body_rotations[:, 0], data["dof_positions"], dof_names=data["dof_names"].tolist()
+    )
+    position_errors = torch.linalg.norm(positions - body_positions, dim=-1).amax(dim=0)
+    dot = torch.abs(torch.sum(rotations * body_rotations, dim=-1) / torch.linalg.norm(body_rotations, dim=-1))
+    rotation_errors = (2 * torch.acos(torch.clamp(dot, max=1.0))).amax(dim=0)
+    return {
+        name: (position_error, rotation_error)
+        for name, position_error, rotation_error in zip(body_names, position_errors.tolist(), rotation_errors.tolist())
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", type=str, nargs="+", required=True, help="Motion files to validate")
+    parser.add_argument("--urdf", type=str, default=DEFAULT_URDF_FILE, help="URDF file")
+    parser.add_argument("--device", type=str, default="cpu", help="Device to compute the kinematics on")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Maximum position error (in meters)")
+    args = parser.parse_args()
+
+    invalid = []
+    for motion_file in args.file:
+        errors = validate_motion_file(motion_file, args.urdf, args.device)
+        print(f"{motion_file}:")
+        for name, (position_error, rotation_error) in errors.items():
+            print(f"  {name:<32} position error: {position_error:.3e} m, rotation error: {rotation_error:.3e} rad")
+        if max(position_error for position_error, _ in errors.values()) > args.tolerance:
+            invalid.append(motion_file)
+    if invalid:
+        print(f"[WARNING] Body positions inconsistent with the URDF kinematics: {invalid}")
@@ -0,0 +1,392 @@
+# Copyright (c) 2022-2025, The Isaac Lab Project Developers (https://github.com/isaac-sim/IsaacLab/blob/main/CONTRIBUTORS.md).
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+from __future__ import annotations
+
+import glob
+import math
+import os
+import time
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping, Sequence
+from typing import Optional
+
+try:
+    from .motion_loader import BODY_FIELDS, DOF_FIELDS, FieldIndexes, MotionLoader, load_npz
+except ImportError:
+    from motion_loader import BODY_FIELDS, DOF_FIELDS, FieldIndexes, MotionLoader, load_npz
+
+
+class MotionLibrary(MotionLoader):
+    """
+    Helper class to load and sample a collection of motion clips from NumPy-file format.
+
+    The frames of all clips are packed into shared flat tensors (concatenated along the frame dimension),
+    so the motion data attributes have the same layout as in :class:`MotionLoader`, with ``num_frames``
+    being the total number of frames. Clips are addressed through per-clip frame offsets, frame counts,
+    time steps, durations and sampling weights, which allows sampling any mix of clips in a single
+    batched gather.
+    """
+
+    def __init__(
+        self,
+        motion_files: str | Sequence[str],
+        device: torch.device,
+        motion_weights: Optional[Sequence[float]] = None,
+        dof_names: Optional[Sequence[str]] = None,
+        body_names: Optional[Sequence[str]] = None,
+        fields: Optional[Sequence[str]] = None,
+        mmap: bool = False,
+        generator: Optional[torch.Generator] = None,
+        cache_dir: Optional[str] = None,
+        precision: Optional[Mapping[str, str]] = None,
+        num_workers: int = 0,
+    ) -> None:
+        """Load the motion files and initialize the internal variables.
+
+        Args:
+            motion_files: Motion file path, directory (all ``.npz`` files in it), glob pattern,
+                or a list of any of them.
+            device: The device to which to load the data.
+            motion_weights: Relative sampling weight of each motion file (after resolving directories
+                and glob patterns, in sorted order). If not defined, clips are sampled proportionally
+                to their duration.
+            dof_names: DOFs to load (in the given order). If not defined, all DOFs are loaded.
+            body_names: Bodies to load (in the given order). If not defined, all bodies are loaded.
+            fields: Motion fields to load. If not defined, all fields are loaded.
+            mmap: Whether to memory-map the motion files, so that only the selected fields,
+                DOFs and bodies are read from disk.
+            generator: Random number generator (on the same device) used for sampling.
+                If not defined, the global torch random number generator is used.
+            cache_dir: Directory of the binary motion cache. If defined, the motion data of each clip is read
+                from the cache (or written to it, if missing, stale or corrupt).
+            precision: Storage precision of the motion fields (see :class:`MotionLoader`).
+            num_workers: Number of threads decoding, validating and copying the motion files (in parallel)
+                into a preallocated host buffer, which is then transferred to the device at once.
+                If 0, the motion files are loaded one at a time.
+
+        Raises:
+            AssertionError: If no motion file is found, if the clips do not share the same skeleton,
+                if a clip has less than two frames, or if the number of weights doesn't match.
+        """
+        self.device = device
+        self.generator = generator
+        self.motion_files = self.resolve_motion_files(motion_files)
+        assert len(self.motion_files), f"No motion file found: {motion_files}"
+
+        start_time = time.perf_counter()
+        loader_kwargs = {
+            "device": "cpu",
+            "verbose": False,
+            "dof_names": dof_names,
+            "body_names": body_names,
+            "fields": fields,
+            "mmap": mmap,
+            "cache_dir": cache_dir,
+        }
+        # the first clip defines the skeleton (DOFs and bodies order) and the loaded fields
+        first_clip = MotionLoader(motion_file=self.motion_files[0], **loader_kwargs)
+        self._dof_names = first_clip.dof_names
+        self._body_names = first_clip.body_names
+        field_names = [name for name in DOF_FIELDS + BODY_FIELDS if getattr(first_clip, name) is not None]
+
+        with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+            # read the number of frames of each clip (from the file headers) to preallocate the host buffer
+            num_frames = list(executor.map(self._read_num_frames, self.motion_files))
+            offsets = [sum(num_frames[:i]) for i in range(len(num_frames))]
+            total_frames = sum(num_frames)
+            # all fields are stored in a single (pinned, if transferred to a GPU) host buffer
+            shapes = {name: (total_frames, *getattr(first_clip, name).shape[1:]) for name in field_names}
+            sizes = [math.prod(shape) for shape in shapes.values()]
+            host_buffer = torch.empty(sum(sizes), dtype=torch.float32, pin_memory=torch.device(device).type == "cuda")
+            host_fields = {
+                name: values.view(shapes[name]) for name, values in zip(shapes, torch.split(host_buffer, sizes))
+            }
+
+            # decode, validate and copy each clip into the host buffer
+            def ingest(index: int) -> tuple[int, float]:
+                path = self.motion_files[index]
+                clip = first_clip if index == 0 else MotionLoader(motion_file=path, **loader_kwargs)
+                assert sorted(clip.dof_names) == sorted(self._dof_names) and sorted(clip.body_names) == sorted(
+                    self._body_names
+                ), f"The skeleton of the motion ({path}) doesn't match the skeleton of ({self.motion_files[0]})"
+                assert clip.num_frames >= 2, f"The motion ({path}) must have at least two frames"
+                assert clip.num_frames == num_frames[index], f"The motion ({path}) has changed while loading"
+                dof_indexes = clip.get_dof_index(self._dof_names)
+                body_indexes = clip.get_body_index(self._body_names)
+                for name in field_names:
+                    indexes = dof_indexes if name in DOF_FIELDS else body_indexes
+                    host_fields[name][offsets[index] : offsets[index] + clip.num_frames] = getattr(clip, name)[
+                        :, indexes
+                    ]
+                return clip.num_frames, float(clip.dt)
+
+            clip_info = list(executor.map(ingest, range(len(self.motion_files))))
+        del first_clip
+
+        # single bulk transfer to the device (fields are views of the device buffer)
+        device_buffer = host_buffer.to(self.device, non_blocking=True)
+        for name, values in zip(shapes, torch.split(device_buffer, sizes)):
+            setattr(self, name, values.view(shapes[name]))
+        for name in DOF_FIELDS + BODY_FIELDS:
+            if name not in shapes:
+                setattr(self, name, None)
+        if torch.device(device).type == "cuda":
+            torch.cuda.synchronize(device)
+        load_time = time.perf_counter() - start_time
+        self.load_statistics = {
+            "num_workers": num_workers,
+            "time": load_time,
+            "clips_per_second": len(clip_info) / load_time,
+            "megabytes_per_second": host_buffer.numel() * host_buffer.element_size() / 1e6 / load_time,
+        }
+        del host_buffer, host_fields
+
+        self._set_precision(precision)
+        # release the shared device buffer when some fields have been converted
+        if precision:
+            for name in shapes:
+                if getattr(self, name).dtype == torch.float32:
+                    setattr(self, name, getattr(self, name).clone())
+
+        self.packed_frames = None
+
+        # per-clip data
+        self.motion_num_frames = torch.tensor([info[0] for info in clip_info], dtype=torch.long, device=device)
+        self.motion_frame_offsets = torch.cumsum(self.motion_num_frames, dim=0) - self.motion_num_frames
+        self.motion_dts = torch.tensor([info[1] for info in clip_info], dtype=torch.float32, device=device)
+        self.motion_durations = self.motion_dts * (self.motion_num_frames - 1)
+        if motion_weights is None:
+            weights = self.motion_durations.clone()
+        else:
+            assert len(motion_weights) == len(clip_info), (
+                f"The number of motion weights ({len(motion_weights)}) doesn't match the number of motions"
+                f" ({len(clip_info)})"
+            )
+            weights = torch.tensor(motion_weights, dtype=torch.float32, device=device)
+        self.motion_weights = weights / weights.sum()
+
+        self.num_frames = self.motion_num_frames.sum().item()
+        self.duration = self.motion_durations.sum().item()
+        print(
+            f"Motion library loaded: {self.num_motions} motion(s), duration: {self.duration} sec,"
+            f" frames: {self.num_frames} ({self.load_statistics['clips_per_second']:.1f} clips/s,"
+            f" {self.load_statistics['megabytes_per_second']:.1f} MB/s, {num_workers} worker(s))"
+        )
+
+    @staticmethod
+    def _read_num_frames(motion_file: str) -> int:
+        """Read the number of frames of a motion file (from the array header, for uncompressed files)."""
+        return load_npz(motion_file, mmap=True)["dof_positions"].shape[0]
+
+    @staticmethod
+    def resolve_motion_files(motion_files: str | Sequence[str]) -> list[str]:
+        """Resolve motion file paths, directories and glob patterns into a sorted list of files.
+
+        Args:
+            motion_files: Motion file path, directory, glob pattern, or a list of any of them.
+
+        Returns:
+            List of motion file paths. Entries resolved from the same directory or pattern are sorted.
+        """
+        if isinstance(motion_files, str):
+            motion_files = [motion_files]
+        paths = []
+        for entry in motion_files:
+            if os.path.isdir(entry):
+                paths.extend(sorted(glob.glob(os.path.join(entry, "*.npz"))))
+            elif glob.has_magic(entry):
+                paths.extend(sorted(glob.glob(entry, recursive=True)))
+            else:
+                assert os.path.isfile(entry), f"Invalid file path: {entry}"
+                paths.append(entry)
+        return paths
+
+    @property
+    def num_motions(self) -> int:
+        """Number of motion clips."""
+        return self.motion_num_frames.shape[0]
+
+    def sample_motions(self, num_samples: int) -> torch.Tensor:
+        """Sample random motion clips according to their sampling weights.
+
+        Args:
+            num_samples: Number of clip samples to generate.
+
+        Returns:
+            Motion clip indexes. Shape is (N,).
+        """
+        return torch.multinomial(self.motion_weights, num_samples, replacement=True, generator=self.generator)
+
+    def sample_clip_times(self, motion_ids: torch.Tensor, duration: float | None = None) -> torch.Tensor:
+        """Sample random motion times uniformly within each clip.
+
+        Args:
+            motion_ids: Motion clip indexes. Shape is (N,).
+            duration: Maximum motion duration to sample.
+                If not defined (or longer than a clip), samples will be within the range of the clip duration.
+
+        Returns:
+            Time samples, between 0 and the specified/clip duration. Shape is (N,).
+        """
+        durations = self.motion_durations[motion_ids]
+        if duration is not None:
+            durations = torch.clamp(durations, max=duration)
+        return durations * torch.rand(motion_ids.shape, device=self.device, generator=self.generator)
+
+    def _compute_clip_frame_blend(
+        self, motion_ids: torch.Tensor, times: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Compute the (flat) indexes of the first and second values, as well as the blending time
+        to interpolate between them and the given times.
+
+        Args:
+            motion_ids: Motion clip indexes. Shape is (N,).
+            times: Times, between 0 and the clip duration, to sample motion values.
+                Specified times will be clipped to fall within the range of the clip duration.
+
+        Returns:
+            First value indexes, Second value indexes, and blending time between 0 (first value) and 1 (second value).
+        """
+        num_frames = self.motion_num_frames[motion_ids]
+        dt = self.motion_dts[motion_ids]
+        offsets = self.motion_frame_offsets[motion_ids]
+        phase = torch.clip(times / self.motion_durations[motion_ids], 0.0, 1.0)
+        index_0 = torch.round(phase * (num_frames - 1)).long()
+        index_1 = torch.minimum(index_0 + 1, num_frames - 1)
+        blend = torch.round((times - index_0 * dt) / dt, decimals=5)
+        return index_0 + offsets, index_1 + offsets, blend
+
+    def _compute_frame_blend(self, times: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Compute the (flat) indexes of the first and second values, as well as the blending time
+        to interpolate between them and the given times (see :meth:`MotionLoader._compute_frame_blend`).
+
+        The times are on the timeline of the clips played one after the other (between 0 and :attr:`duration`,
+        as sampled by :meth:`MotionLoader.sample_times`). Frames are never interpolated across two clips.
+
+        Args:
+            times: Times, between 0 and the total duration of the clips, to sample motion values.
+                Specified times will be clipped to fall within the range of the clip durations.
+
+        Returns:
+            First value indexes, Second value indexes, and blending time between 0 (first value) and 1 (second value).
+        """
+        ends = torch.cumsum(self.motion_durations, dim=0)
+        motion_ids = torch.clamp(torch.searchsorted(ends, times, right=True), max=self.num_motions - 1)
+        return self._compute_clip_frame_blend(motion_ids, times - (ends - self.motion_durations)[motion_ids])
+
+    def _compute_sample_frame_blend(
+        self,
+        num_samples: int,
+        times: Optional[torch.Tensor],
+        duration: float | None,
+        motion_ids: Optional[torch.Tensor],
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Compute the frame indexes and blending times of the samples (see :meth:`sample`)."""
+        if motion_ids is None and times is not None:
+            return self._compute_frame_blend(times)
+        motion_ids = self.sample_motions(num_samples) if motion_ids is None else motion_ids
+        times = self.sample_clip_times(motion_ids, duration) if times is None else times
+        return self._compute_clip_frame_blend(motion_ids, times)
+
+    def sample(
+        self,
+        num_samples: int,
+        times: Optional[torch.Tensor] = None,
+        duration: float | None = None,
+        motion_ids: Optional[torch.Tensor] = None,
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Sample motion data.
+
+        Args:
+            num_samples: Number of samples to generate. If ``times`` or ``motion_ids`` is defined, this parameter
+                is ignored.
+            times: Motion time used for sampling: within each clip if ``motion_ids`` is defined, otherwise on the
+                timeline of the clips played one after the other (as with :meth:`MotionLoader.sample`).
+                If not defined, motion data will be random sampled uniformly in time (within each clip).
+            duration: Maximum motion duration to sample.
+                If ``times`` is defined, this parameter is ignored.
+            motion_ids: Motion clip indexes used for sampling.
+                If not defined, clips will be random sampled according to their sampling weights.
+
+        Returns:
+            Sampled motion data, in the same order and with the same shapes as :meth:`MotionLoader.sample`.
+        """
+        index_0, index_1, blend = self._compute_sample_frame_blend(num_samples, times, duration, motion_ids)
+        return self._sample_frames(index_0, index_1, blend)
+
+    def sample_packed(
+        self,
+        num_samples: int,
+        times: Optional[torch.Tensor] = None,
+        duration: float | None = None,
+        motion_ids: Optional[torch.Tensor] = None,
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Sample motion data from the packed frames (see :meth:`MotionLoader.pack_frames`).
+
+        Args:
+            num_samples: Number of samples to generate. If ``times`` or ``motion_ids`` is defined, this parameter
+                is ignored.
+            times: Motion time used for sampling: within each clip if ``motion_ids`` is defined, otherwise on the
+                timeline of the clips played one after the other (as with :meth:`MotionLoader.sample`).
+                If not defined, motion data will be random sampled uniformly in time (within each clip).
+            duration: Maximum motion duration to sample.
+                If ``times`` is defined, this parameter is ignored.
+            motion_ids: Motion clip indexes used for sampling.
+                If not defined, clips will be random sampled according to their sampling weights.
+
+        Returns:
+            Sampled motion data, in the same order and with the same shapes as :meth:`MotionLoader.sample`.
+        """
+        index_0, index_1, blend = self._compute_sample_frame_blend(num_samples, times, duration, motion_ids)
+        return self._sample_packed_frames(index_0, index_1, blend)
+
+    def sample_fields(
+        self,
+        num_samples: int,
+        fields: Mapping[str, FieldIndexes],
+        times: Optional[torch.Tensor] = None,
+        duration: float | None = None,
+        motion_ids: Optional[torch.Tensor] = None,
+    ) -> dict[str, torch.Tensor]:
+        """Sample only the requested motion data.
+
+        Only the requested fields, DOFs and bodies are gathered and interpolated.
+
+        Args:
+            num_samples: Number of samples to generate. If ``times`` or ``motion_ids`` is defined, this parameter
+                is ignored.
+            fields: Motion fields to sample, mapped to the DOF/body indexes to sample from them
+                (see :meth:`MotionLoader.sample_fields`).
+            times: Motion time used for sampling: within each clip if ``motion_ids`` is defined, otherwise on the
+                timeline of the clips played one after the other (as with :meth:`MotionLoader.sample`).
+                If not defined, motion data will be random sampled uniformly in time (within each clip).
+            duration: Maximum motion duration to sample.
+                If ``times`` is defined, this parameter is ignored.
+            motion_ids: Motion clip indexes used for sampling.
+                If not defined, clips will be random sampled according to their sampling weights.
+
+        Returns:
+            Sampled motion data for each requested field (see :meth:`MotionLoader.sample_fields`).
+        """
+        index_0, index_1, blend = self._compute_sample_frame_blend(num_samples, times, duration, motion_ids)
+        return self._sample_frame_fields(index_0, index_1, blend, fields)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=str, nargs="+", required=True, help="Motion files, directories or patterns")
+    parser.add_argument("--num-workers", type=int, default=0, help="Number of loading threads")
+    args = parser.parse_args()
+
+    library = MotionLibrary(args.files, "cpu", num_workers=args.num_workers)
+
+    print("- number of motions:", library.num_motions)
+    print("- number of frames:", library.num_frames)
+    print("- number of DOFs:", library.num_dofs)
+    print("- number of bodies:", library.num_bodies)
@@ -5,8 +5,124 @@
 
 import numpy as np
 import os
+import struct
 import torch
-from typing import Optional
+import zipfile
+from collections.abc import Mapping, Sequence
+from typing import Optional, Union
+
+try:
+    from .motion_cache import load_motion_cache, motion_cache_path, save_motion_cache
+except ImportError:
+    from motion_cache import load_motion_cache, motion_cache_path, save_motion_cache
+
+DOF_FIELDS = ("dof_positions", "dof_velocities")
+"""Motion fields indexed by DOF, with shape (N, D)."""
+
+BODY_FIELDS = ("body_positions", "body_rotations", "body_linear_velocities", "body_angular_velocities")
+"""Motion fields indexed by body, with shape (N, B, X)."""
+
+FIELD_PRECISIONS = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+    "int16": torch.int16,
+}
+"""Storage precisions of the motion fields. ``int16`` (normalized, for values in [-1, 1]) is only supported by
+the body rotations (unit quaternions)."""
+
+INT16_SCALE = 32767.0
+"""Scale of the normalized int16 storage."""
+
+FieldIndexes = Union[None, int, Sequence[int], torch.Tensor]
+"""DOF/body indexes to sample from a motion field: all (None), a single index, or a list/tensor of indexes."""
+
+
+def load_npz(motion_file: str, mmap: bool = False) -> Mapping[str, np.ndarray]:
+    """Open a NumPy-file (``.npz``) without reading its arrays.
+
+    Args:
+        motion_file: Motion file path to open.
+        mmap: Whether to memory-map the arrays stored without compression.
+            Compressed arrays (and scalars) are then read when the file is opened, and no file handle is kept open.
+            Otherwise, all arrays are read on access, as with :func:`numpy.load`.
+
+    Returns:
+        Mapping from array name to array.
+    """
+    if not mmap:
+        return np.load(motion_file)
+    arrays = {}
+    with np.load(motion_file) as data, zipfile.ZipFile(motion_file) as archive, open(motion_file, "rb") as file:
+        for info in archive.infolist():
+            name = info.filename[: -len(".npy")] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = data[name]
+                continue
+            # skip the zip local file header to get the start of the member's .npy content
+            file.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", file.read(4))
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            elif version == (2, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            else:
+                arrays[name] = data[name]
+                continue
+            if not len(shape) or dtype.hasobject:
+                arrays[name] = data[name]
+                continue
+            arrays[name] = np.memmap(
+                motion_file, dtype=dtype, mode="r", offset=file.tell(), shape=shape, order="F" if fortran_order else "C"
+            )
+    return arrays
+
+
+def interpolate_packed_frames(
+    frames: torch.Tensor,
+    index_0: torch.Tensor,
+    index_1: torch.Tensor,
+    blend: torch.Tensor,
+    rotation_start: int,
+    rotation_end: int,
+) -> torch.Tensor:
+    """Gather and interpolate packed frame records (linear interpolation, and spherical for the rotations).
+
+    Args:
+        frames: The packed frame records. Shape is (num_frames, R).
+        index_0: First frame indexes. Shape is (N,).
+        index_1: Second frame indexes. Shape is (N,).
+        blend: Interpolation coefficient between 0 (first frame) and 1 (second frame). Shape is (N,).
+        rotation_start: First record column of the body rotations (wxyz quaternions).
+        rotation_end: Record column past the last body rotation.
+
+    Returns:
+        Interpolated frame records. Shape is (N, R).
+    """
+    frame_0 = torch.index_select(frames, 0, index_0)
+    frame_1 = torch.index_select(frames, 0, index_1)
+    blend = blend.unsqueeze(-1)
+    frame = torch.lerp(frame_0, frame_1, blend)
+    # spherical linear interpolation of the body rotations (same as MotionLoader._slerp)
+    q0 = frame_0[:, rotation_start:rotation_end].reshape(frame_0.shape[0], -1, 4)
+    q1 = frame_1[:, rotation_start:rotation_end].reshape(frame_1.shape[0], -1, 4)
+    blend = blend.unsqueeze(-1)
+    cos_half_theta = torch.sum(q0 * q1, dim=-1, keepdim=True)
+    q1 = torch.where(cos_half_theta < 0, -q1, q1)
+    cos_half_theta = torch.abs(cos_half_theta)
+    half_theta = torch.acos(cos_half_theta)
+    sin_half_theta = torch.sqrt(1.0 - cos_half_theta * cos_half_theta)
+    ratio_a = torch.sin((1 - blend) * half_theta) / sin_half_theta
+    ratio_b = torch.sin(blend * half_theta) / sin_half_theta
+    q = ratio_a * q0 + ratio_b * q1
+    q = torch.where(torch.abs(sin_half_theta) < 0.001, 0.5 * q0 + 0.5 * q1, q)
+    q = torch.where(cos_half_theta >= 1, q0, q)
+    return torch.cat(
+        [frame[:, :rotation_start], q.reshape(q.shape[0], -1), frame[:, rotation_end:]],
+        dim=-1,
+    )
 
 
 class MotionLoader:
@@ -14,38 +130,203 @@ class MotionLoader:
     Helper class to load and sample motion data from NumPy-file format.
     """
 
-    def __init__(self, motion_file: str, device: torch.device) -> None:
+    def __init__(
+        self,
+        motion_file: str,
+        device: torch.device,
+        verbose: bool = True,
+        dof_names: Optional[Sequence[str]] = None,
+        body_names: Optional[Sequence[str]] = None,
+        fields: Optional[Sequence[str]] = None,
+        mmap: bool = False,
+        generator: Optional[torch.Generator] = None,
+        cache_dir: Optional[str] = None,
+        precision: Optional[Mapping[str, str]] = None,
+    ) -> None:
         """Load a motion file and initialize the internal variables.
 
         Args:
             motion_file: Motion file path to load.
             device: The device to which to load the data.
+            verbose: Whether to print a summary of the loaded motion.
+            dof_names: DOFs to load (in the given order). If not defined, all DOFs are loaded.
+            body_names: Bodies to load (in the given order). If not defined, all bodies are loaded.
+            fields: Motion fields (see ``DOF_FIELDS`` and ``BODY_FIELDS``) to load.
+                Fields that are not loaded are set to None. If not defined, all fields are loaded.
+            mmap: Whether to memory-map the motion file, so that only the selected fields,
+                DOFs and bodies are read from disk.
+            generator: Random number generator (on the same device) used for sampling.
+                If not defined, the global torch random number generator is used.
+            cache_dir: Directory of the binary motion cache (see :mod:`motion_cache`). If defined, the loaded
+                motion data is read from the cache (or written to it, if missing, stale or corrupt).
+            precision: Storage precision (see ``FIELD_PRECISIONS``) of the motion fields. Fields not specified
+                are stored as float32. Sampled motion data is always dequantized to float32.
 
         Raises:
-            AssertionError: If the specified motion file doesn't exist.
+            AssertionError: If the specified motion file doesn't exist, if a specified field, DOF or body name
+                doesn't exist, or if a specified precision is not supported.
         """
         assert os.path.isfile(motion_file), f"Invalid file path: {motion_file}"
-        data = np.load(motion_file)
+        fields = DOF_FIELDS + BODY_FIELDS if fields is None else tuple(fields)
+        for name in fields:
+            assert name in DOF_FIELDS + BODY_FIELDS, f"The specified field ({name}) doesn't exist"
 
         self.device = device
+        self.generator = generator
+
+        cache, cache_path = None, None
+        if cache_dir is not None:
+            options = {
+                "dof_names": None if dof_names is None else list(dof_names),
+                "body_names": None if body_names is None else list(body_names),
+                "fields": list(fields),
+            }
+            cache_path = motion_cache_path(cache_dir, motion_file, options)
+            cache = load_motion_cache(cache_path)
+        if cache is not None:
+            metadata, arrays = cache
+            self._dof_names = metadata["dof_names"]
+            self._body_names = metadata["body_names"]
+            fps = metadata["fps"]
+        else:
+            arrays, fps = self._read_motion_file(motion_file, dof_names, body_names, fields, mmap)
+            if cache_path is not None:
+                metadata = {"fps": fps, "dof_names": self._dof_names, "body_names": self._body_names}
+                try:
+                    save_motion_cache(cache_path, metadata, arrays)
+                except OSError as e:
+                    print(f"[WARNING] Unable to write the motion cache ({cache_path}): {e}")
+
+        def load(name: str) -> Optional[torch.Tensor]:
+            if name not in arrays:
+                return None
+            return torch.tensor(arrays[name], dtype=torch.float32, device=self.device)
+
+        self.dof_positions = load("dof_positions")
+        self.dof_velocities = load("dof_velocities")
+        self.body_positions = load("body_positions")
+        self.body_rotations = load("body_rotations")
+        self.body_linear_velocities = load("body_linear_velocities")
+        self.body_angular_velocities = load("body_angular_velocities")
+        self._set_precision(precision)
+
+        self.packed_frames = None
+
+        self.dt = 1.0 / fps
+        self.num_frames = arrays[fields[0]].shape[0]
+        self.duration = self.dt * (self.num_frames - 1)
+        if verbose:
+            print(f"Motion loaded ({motion_file}): duration: {self.duration} sec, frames: {self.num_frames}")
+
+    def _read_motion_file(
+        self,
+        motion_file: str,
+        dof_names: Optional[Sequence[str]],
+        body_names: Optional[Sequence[str]],
+        fields: Sequence[str],
+        mmap: bool,
+    ) -> tuple[dict[str, np.ndarray], float]:
+        """Read the selected motion data from a motion file, and set the DOF and body names.
+
+        Args:
+            motion_file: Motion file path to read.
+            dof_names: DOFs to read (in the given order). If None, all DOFs are read.
+            body_names: Bodies to read (in the given order). If None, all bodies are read.
+            fields: Motion fields to read.
+            mmap: Whether to memory-map the motion file.
+
+        Raises:
+            AssertionError: If a specified DOF or body name doesn't exist.
+
+        Returns:
+            Motion arrays (as float32) of the selected fields, and motion FPS.
+        """
+        data = load_npz(motion_file, mmap=mmap)
         self._dof_names = data["dof_names"].tolist()
         self._body_names = data["body_names"].tolist()
 
-        self.dof_positions = torch.tensor(data["dof_positions"], dtype=torch.float32, device=self.device)
-        self.dof_velocities = torch.tensor(data["dof_velocities"], dtype=torch.float32, device=self.device)
-        self.body_positions = torch.tensor(data["body_positions"], dtype=torch.float32, device=self.device)
-        self.body_rotations = torch.tensor(data["body_rotations"], dtype=torch.float32, device=self.device)
-        self.body_linear_velocities = torch.tensor(
-            data["body_linear_velocities"], dtype=torch.float32, device=self.device
-        )
-        self.body_angular_velocities = torch.tensor(
-            data["body_angular_velocities"], dtype=torch.float32, device=self.device
-        )
+        # resolve the selected DOFs and bodies (None: all of them)
+        dof_indexes, body_indexes = None, None
+        if dof_names is not None:
+            dof_indexes = self.get_dof_index(dof_names)
+            self._dof_names = list(dof_names)
+        if body_names is not None:
+            body_indexes = self.get_body_index(body_names)
+            self._body_names = list(body_names)
+
+        arrays = {}
+        for name in fields:
+            indexes = dof_indexes if name in DOF_FIELDS else body_indexes
+            array = data[name] if indexes is None else data[name][:, indexes]
+            arrays[name] = np.asarray(array, dtype=np.float32)
+        return arrays, float(data["fps"])
+
+    def _set_precision(self, precision: Optional[Mapping[str, str]]) -> None:
+        """Convert the loaded motion fields to their storage precision.
 
-        self.dt = 1.0 / data["fps"]
-        self.num_frames = self.dof_positions.shape[0]
-        self.duration = self.dt * (self.num_frames - 1)
-        print(f"Motion loaded ({motion_file}): duration: {self.duration} sec, frames: {self.num_frames}")
+        Args:
+            precision: Storage precision of the motion fields. Fields not specified are stored as float32.
+
+        Raises:
+            AssertionError: If a specified field or precision is not supported.
+        """
+        precision = {} if precision is None else dict(precision)
+        self._field_precisions = {}
+        for name in DOF_FIELDS + BODY_FIELDS:
+            dtype = precision.pop(name, "float32")
+            assert dtype in FIELD_PRECISIONS, f"The specified precision ({dtype}) is not supported"
+            assert dtype != "int16" or name == "body_rotations", f"int16 precision is not supported by '{name}'"
+            self._field_precisions[name] = dtype
+            values = getattr(self, name)
+            if values is None or dtype == "float32":
+                continue
+            if dtype == "int16":
+                values = torch.round(torch.clamp(values, -1.0, 1.0) * INT16_SCALE)
+            setattr(self, name, values.to(FIELD_PRECISIONS[dtype]))
+        assert not precision, f"The specified fields ({list(precision)}) don't exist"
+
+    def _dequantize(self, name: str, values: torch.Tensor) -> torch.Tensor:
+        """Convert (gathered) values of a motion field from its storage precision to float32.
+
+        Args:
+            name: Motion field name.
+            values: Values of the motion field.
+
+        Returns:
+            Values as float32.
+        """
+        dtype = self._field_precisions[name]
+        if dtype == "float32":
+            return values
+        if dtype == "int16":
+            # renormalize the quaternions: slerp is sensitive to their norm for small rotation angles
+            return torch.nn.functional.normalize(values.float(), dim=-1)
+        return values.float()
+
+    def get_field(self, name: str) -> torch.Tensor:
+        """Get all the values (for every frame) of a motion field as float32.
+
+        Args:
+            name: Motion field name (see ``DOF_FIELDS`` and ``BODY_FIELDS``).
+
+        Raises:
+            AssertionError: If the field doesn't exist or is not loaded.
+
+        Returns:
+            Values of the motion field. Shape is (num_frames, D) or (num_frames, B, X).
+        """
+        assert name in DOF_FIELDS + BODY_FIELDS, f"The specified field ({name}) doesn't exist"
+        values = getattr(self, name)
+        assert values is not None, f"The specified field ({name}) is not loaded"
+        return self._dequantize(name, values)
+
+    @property
+    def memory_size(self) -> int:
+        """Device memory (in bytes) used by the loaded motion fields."""
+        if self.packed_frames is not None:
+            return self.packed_frames.numel() * self.packed_frames.element_size()
+        sizes = [getattr(self, name) for name in DOF_FIELDS + BODY_FIELDS]
+        return sum(values.numel() * values.element_size() for values in sizes if values is not None)
 
     @property
     def dof_names(self) -> list[str]:
@@ -73,8 +354,8 @@ class MotionLoader:
         *,
         b: Optional[torch.Tensor] = None,
         blend: Optional[torch.Tensor] = None,
-        start: Optional[np.ndarray] = None,
-        end: Optional[np.ndarray] = None,
+        start: Optional[torch.Tensor] = None,
+        end: Optional[torch.Tensor] = None,
     ) -> torch.Tensor:
         """Linear interpolation between consecutive values.
 
@@ -104,8 +385,8 @@ class MotionLoader:
         *,
         q1: Optional[torch.Tensor] = None,
         blend: Optional[torch.Tensor] = None,
-        start: Optional[np.ndarray] = None,
-        end: Optional[np.ndarray] = None,
+        start: Optional[torch.Tensor] = None,
+        end: Optional[torch.Tensor] = None,
     ) -> torch.Tensor:
         """Interpolation between consecutive rotations (Spherical Linear Interpolation).
 
@@ -158,7 +439,7 @@ class MotionLoader:
         new_q = torch.where(torch.abs(cos_half_theta) >= 1, q0, new_q)
         return new_q
 
-    def _compute_frame_blend(self, times: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    def _compute_frame_blend(self, times: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """Compute the indexes of the first and second values, as well as the blending time
         to interpolate between them and the given times.
 
@@ -169,13 +450,13 @@ class MotionLoader:
         Returns:
             First value indexes, Second value indexes, and blending time between 0 (first value) and 1 (second value).
         """
-        phase = np.clip(times / self.duration, 0.0, 1.0)
-        index_0 = (phase * (self.num_frames - 1)).round(decimals=0).astype(int)
-        index_1 = np.minimum(index_0 + 1, self.num_frames - 1)
-        blend = ((times - index_0 * self.dt) / self.dt).round(decimals=5)
+        phase = torch.clip(times / self.duration, 0.0, 1.0)
+        index_0 = torch.round(phase * (self.num_frames - 1)).long()
+        index_1 = torch.clamp(index_0 + 1, max=self.num_frames - 1)
+        blend = torch.round((times - index_0 * self.dt) / self.dt, decimals=5)
         return index_0, index_1, blend
 
-    def sample_times(self, num_samples: int, duration: float | None = None) -> np.ndarray:
+    def sample_times(self, num_samples: int, duration: float | None = None) -> torch.Tensor:
         """Sample random motion times uniformly.
 
         Args:
@@ -193,10 +474,10 @@ class MotionLoader:
         assert (
             duration <= self.duration
         ), f"The specified duration ({duration}) is longer than the motion duration ({self.duration})"
-        return duration * np.random.uniform(low=0.0, high=1.0, size=num_samples)
+        return duration * torch.rand(num_samples, device=self.device, generator=self.generator)
 
     def sample(
-        self, num_samples: int, times: Optional[np.ndarray] = None, duration: float | None = None
+        self, num_samples: int, times: Optional[torch.Tensor] = None, duration: float | None = None
     ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
         """Sample motion data.
 
@@ -215,16 +496,194 @@ class MotionLoader:
         """
         times = self.sample_times(num_samples, duration) if times is None else times
         index_0, index_1, blend = self._compute_frame_blend(times)
-        blend = torch.tensor(blend, dtype=torch.float32, device=self.device)
+        return self._sample_frames(index_0, index_1, blend)
+
+    def _sample_frames(
+        self, index_0: torch.Tensor, index_1: torch.Tensor, blend: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Interpolate all motion data between the given frames.
+
+        Args:
+            index_0: First frame indexes.
+            index_1: Second frame indexes.
+            blend: Interpolation coefficient between 0 (first frame) and 1 (second frame).
+
+        Returns:
+            Interpolated motion data, in the same order and with the same shapes as :meth:`sample`
+            (None for the fields that are not loaded).
+        """
+
+        def interpolate(name: str) -> Optional[torch.Tensor]:
+            values = getattr(self, name)
+            if values is None:
+                return None
+            value_0 = self._dequantize(name, values[index_0])
+            value_1 = self._dequantize(name, values[index_1])
+            if name == "body_rotations":
+                return self._slerp(value_0, q1=value_1, blend=blend)
+            return self._interpolate(value_0, b=value_1, blend=blend)
 
         return (
-            self._interpolate(self.dof_positions, blend=blend, start=index_0, end=index_1),
-            self._interpolate(self.dof_velocities, blend=blend, start=index_0, end=index_1),
-            self._interpolate(self.body_positions, blend=blend, start=index_0, end=index_1),
-            self._slerp(self.body_rotations, blend=blend, start=index_0, end=index_1),
-            self._interpolate(self.body_linear_velocities, blend=blend, start=index_0, end=index_1),
-            self._interpolate(self.body_angular_velocities, blend=blend, start=index_0, end=index_1),
+            interpolate("dof_positions"),
+            interpolate("dof_velocities"),
+            interpolate("body_positions"),
+            interpolate("body_rotations"),
+            interpolate("body_linear_velocities"),
+            interpolate("body_angular_velocities"),
+        )
+
+    def sample_fields(
+        self,
+        num_samples: int,
+        fields: Mapping[str, FieldIndexes],
+        times: Optional[torch.Tensor] = None,
+        duration: float | None = None,
+    ) -> dict[str, torch.Tensor]:
+        """Sample only the requested motion data.
+
+        Only the requested fields, DOFs and bodies are gathered and interpolated.
+
+        Args:
+            num_samples: Number of time samples to generate. If ``times`` is defined, this parameter is ignored.
+            fields: Motion fields to sample (see ``DOF_FIELDS`` and ``BODY_FIELDS``), mapped to the DOF/body indexes
+                to sample from them. Indexes can be None (all DOFs/bodies), a single index, or a list/tensor of indexes.
+            times: Motion time used for sampling.
+                If not defined, motion data will be random sampled uniformly in time.
+            duration: Maximum motion duration to sample.
+                If not defined, samples will be within the range of the motion duration.
+                If ``times`` is defined, this parameter is ignored.
+
+        Returns:
+            Sampled motion data for each requested field. Shape is (N, X) for a single index,
+            otherwise (N, M) for DOF fields and (N, M, X) for body fields, where M is the number of indexes.
+        """
+        times = self.sample_times(num_samples, duration) if times is None else times
+        index_0, index_1, blend = self._compute_frame_blend(times)
+        return self._sample_frame_fields(index_0, index_1, blend, fields)
+
+    def _sample_frame_fields(
+        self,
+        index_0: torch.Tensor,
+        index_1: torch.Tensor,
+        blend: torch.Tensor,
+        fields: Mapping[str, FieldIndexes],
+    ) -> dict[str, torch.Tensor]:
+        """Gather and interpolate the requested motion data between the given frames.
+
+        Args:
+            index_0: First frame indexes.
+            index_1: Second frame indexes.
+            blend: Interpolation coefficient between 0 (first frame) and 1 (second frame).
+            fields: Motion fields to sample, mapped to the DOF/body indexes to sample from them.
+
+        Raises:
+            AssertionError: If a requested field doesn't exist or is not loaded.
+
+        Returns:
+            Interpolated motion data for each requested field (see :meth:`sample_fields`).
+        """
+        samples = {}
+        for name, indexes in fields.items():
+            assert name in DOF_FIELDS + BODY_FIELDS, f"The specified field ({name}) doesn't exist"
+            values = getattr(self, name)
+            assert values is not None, f"The specified field ({name}) is not loaded"
+            # gather only the requested DOFs/bodies of both frames
+            if indexes is None:
+                value_0, value_1 = values[index_0], values[index_1]
+            elif isinstance(indexes, int):
+                value_0, value_1 = values[index_0, indexes], values[index_1, indexes]
+            else:
+                indexes = torch.as_tensor(indexes, dtype=torch.long, device=self.device)
+                value_0 = values[index_0.unsqueeze(-1), indexes]
+                value_1 = values[index_1.unsqueeze(-1), indexes]
+            value_0, value_1 = self._dequantize(name, value_0), self._dequantize(name, value_1)
+            if name == "body_rotations":
+                samples[name] = self._slerp(value_0, q1=value_1, blend=blend)
+            else:
+                samples[name] = self._interpolate(value_0, b=value_1, blend=blend)
+        return samples
+
+    def pack_frames(self, compile: bool = True) -> None:
+        """Store the motion data as one contiguous record per frame.
+
+        Each record holds the DOF positions and velocities, followed by the body positions, rotations,
+        linear velocities and angular velocities. The motion data attributes become views of the packed
+        frames, so the memory is not duplicated. :meth:`sample_packed` can then gather both frames with
+        a single ``index_select`` each, and interpolate them in the same (compiled) function.
+
+        Args:
+            compile: Whether to compile the packed frame interpolation with :func:`torch.compile`.
+
+        Raises:
+            AssertionError: If not all motion fields are loaded, or if a field is not stored as float32.
+        """
+        names = DOF_FIELDS + BODY_FIELDS
+        for name in names:
+            assert getattr(self, name) is not None, f"The motion field ({name}) must be loaded to pack the frames"
+            assert self._field_precisions[name] == "float32", f"The motion field ({name}) must be stored as float32"
+        values = [getattr(self, name) for name in names]
+        self.packed_frames = torch.cat([value.reshape(value.shape[0], -1) for value in values], dim=-1).contiguous()
+        # replace the motion data by views of the packed frames
+        start = 0
+        for name, value in zip(names, values):
+            end = start + value[0].numel()
+            setattr(self, name, self.packed_frames[:, start:end].view(value.shape))
+            if name == "body_rotations":
+                self._packed_rotation_range = (start, end)
+            start = end
+        self._interpolate_packed_frames = (
+            torch.compile(interpolate_packed_frames, dynamic=True) if compile else interpolate_packed_frames
+        )
+
+    def sample_packed(
+        self, num_samples: int, times: Optional[torch.Tensor] = None, duration: float | None = None
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Sample motion data from the packed frames (see :meth:`pack_frames`).
+
+        Args:
+            num_samples: Number of time samples to generate. If ``times`` is defined, this parameter is ignored.
+            times: Motion time used for sampling.
+                If not defined, motion data will be random sampled uniformly in time.
+            duration: Maximum motion duration to sample.
+                If not defined, samples will be within the range of the motion duration.
+                If ``times`` is defined, this parameter is ignored.
+
+        Returns:
+            Sampled motion data, in the same order and with the same shapes as :meth:`sample`.
+        """
+        times = self.sample_times(num_samples, duration) if times is None else times
+        index_0, index_1, blend = self._compute_frame_blend(times)
+        return self._sample_packed_frames(index_0, index_1, blend)
+
+    def _sample_packed_frames(
+        self, index_0: torch.Tensor, index_1: torch.Tensor, blend: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Interpolate the packed frames between the given frames.
+
+        Args:
+            index_0: First frame indexes.
+            index_1: Second frame indexes.
+            blend: Interpolation coefficient between 0 (first frame) and 1 (second frame).
+
+        Raises:
+            AssertionError: If the frames are not packed.
+
+        Returns:
+            Interpolated motion data (as views of the interpolated records), in the same order
+            and with the same shapes as :meth:`sample`.
+        """
+        assert self.packed_frames is not None, "The frames are not packed. Call 'pack_frames' first"
+        frames = self._interpolate_packed_frames(
+            self.packed_frames, index_0, index_1, blend, *self._packed_rotation_range
         )
+        num_samples = frames.shape[0]
+        samples, start = [], 0
+        for name in DOF_FIELDS + BODY_FIELDS:
+            shape = getattr(self, name).shape[1:]
+            end = start + shape.numel()
+            samples.append(frames[:, start:end].view(num_samples, *shape))
+            start = end
+        return tuple(samples)
 
     def get_dof_index(self, dof_names: list[str]) -> list[int]:
         """Get skeleton DOFs indexes by DOFs names.
@@ -0,0 +1,254 @@
+"""
+Opt-in phase-level profiler (environment step phases, AMP motion sampling and the training loop).
+
+Phases are recorded with :meth:`Profiler.record` (context manager), the :meth:`Profiler.function` decorator, or by
+wrapping object methods with :meth:`Profiler.instrument`. For each phase, the profiler accumulates the call count,
+the wall-clock time (host side, without synchronization), the device-synchronized time (if enabled, on CUDA) and
+the number of CUDA memory allocations. Recorded spans can be exported as a Chrome/Perfetto trace (JSON), and the
+statistics written as periodic summaries (e.g. to the skrl agent's TensorBoard writer, see :meth:`write_summary`).
+
+While disabled (default), :meth:`Profiler.record` returns a shared no-op context and decorated functions only check
+a flag. Methods are only wrapped by :meth:`Profiler.instrument` (usually called once profiling is enabled).
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import Optional
+
+import torch
+
+
+class _NullRecord:
+    """No-op context (profiling disabled)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_RECORD = _NullRecord()
+
+
+class PhaseStatistics:
+    """Accumulated statistics of a profiled phase."""
+
+    __slots__ = ("calls", "wall_time", "device_time", "allocations", "max_wall_time")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall_time = 0.0
+        self.device_time = 0.0
+        self.allocations = 0
+        self.max_wall_time = 0.0
+
+
+class _Record:
+    """Profiled span (see :meth:`Profiler.record`)."""
+
+    __slots__ = ("_profiler", "_name", "_start", "_device_start", "_allocations")
+
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        profiler = self._profiler
+        self._start = time.perf_counter()
+        self._device_start = profiler._synchronize(self._start)
+        self._allocations = profiler._allocations()
+        return self
+
+    def __exit__(self, *args):
+        profiler = self._profiler
+        end = time.perf_counter()
+        device_end = profiler._synchronize(end)
+        profiler._add(
+            self._name,
+            start=self._start,
+            wall_time=end - self._start,
+            device_time=device_end - self._device_start,
+            allocations=profiler._allocations() - self._allocations,
+        )
+        return False
+
+
+class Profiler:
+    """Phase-level profiler.
+
+    Args:
+        enabled: Whether to record phases.
+        sync_device: Whether to synchronize the CUDA device around phases, to measure the device time.
+            Synchronization serializes the host and the device, so it changes the timing of the profiled program.
+        count_allocations: Whether to count the CUDA memory allocations of phases.
+        max_trace_events: Maximum number of recorded spans for the trace (0 to not record spans).
+    """
+
+    def __init__(
+        self, enabled: bool = False, sync_device: bool = True, count_allocations: bool = True, max_trace_events: int = 1000000
+    ) -> None:
+        self.enabled = False
+        self.configure(enabled, sync_device, count_allocations, max_trace_events)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def configure(
+        self, enabled: bool = True, sync_device: bool = True, count_allocations: bool = True, max_trace_events: int = 1000000
+    ) -> None:
+        """Enable (or disable) the profiler and set its options."""
+        cuda = torch.cuda.is_available()
+        self.sync_device = sync_device and cuda
+        self.count_allocations = count_allocations and cuda
+        self.max_trace_events = max_trace_events
+        self.enabled = enabled
+
+    def reset(self) -> None:
+        """Clear the statistics and the recorded spans."""
+        self.statistics: dict[str, PhaseStatistics] = {}
+        self._summary_statistics: dict[str, PhaseStatistics] = {}
+        self._trace_events = []
+        self._dropped_trace_events = 0
+        self._origin = time.perf_counter()
+
+    def _synchronize(self, now: float) -> float:
+        if not self.sync_device:
+            return now
+        torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def _allocations(self) -> int:
+        if not self.count_allocations:
+            return 0
+        return torch.cuda.memory_stats().get("allocation.all.allocated", 0)
+
+    def _add(self, name: str, start: float, wall_time: float, device_time: float, allocations: int) -> None:
+        with self._lock:
+            for statistics in (self.statistics, self._summary_statistics):
+                phase = statistics.get(name)
+                if phase is None:
+                    phase = statistics[name] = PhaseStatistics()
+                phase.calls += 1
+                phase.wall_time += wall_time
+                phase.device_time += device_time
+                phase.allocations += allocations
+                phase.max_wall_time = max(phase.max_wall_time, wall_time)
+            if len(self._trace_events) < self.max_trace_events:
+                args = {"device_ms": device_time * 1e3} if self.sync_device else {}
+                if self.count_allocations:
+                    args["allocations"] = allocations
+                # complete event (timestamps and durations in microseconds)
+                self._trace_events.append(
+                    (name, (start - self._origin) * 1e6, max(wall_time, device_time) * 1e6, threading.get_ident(), args)
+                )
+            elif self.max_trace_events:
+                self._dropped_trace_events += 1
+
+    def record(self, name: str):
+        """Context manager that records a phase (a shared no-op context if the profiler is disabled)."""
+        if not self.enabled:
+            return _NULL_RECORD
+        return _Record(self, name)
+
+    def function(self, name: Optional[str] = None) -> Callable:
+        """Decorator that records the calls of a function (only a flag check if the profiler is disabled)."""
+
+        def decorator(function: Callable) -> Callable:
+            label = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Record(self, label):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def instrument(self, obj: object, method_names: Sequence[str], prefix: Optional[str] = None) -> None:
+        """Wrap (in place) methods of an object so that their calls are recorded, as ``<prefix>.<method name>``.
+
+        Methods that don't exist are ignored, and methods are only wrapped once.
+        """
+        prefix = type(obj).__name__ if prefix is None else prefix
+        for method_name in method_names:
+            method = getattr(obj, method_name, None)
+            if method is None or getattr(method, "_profiled", False):
+                continue
+            wrapper = self.function(f"{prefix}.{method_name}")(method)
+            wrapper._profiled = True
+            setattr(obj, method_name, wrapper)
+
+    def summary(self, reset: bool = False) -> dict[str, dict[str, float]]:
+        """Per-phase statistics (times in milliseconds) since the profiler was reset.
+
+        Args:
+            reset: Whether to get the statistics since the last summary (and start a new summary period) instead.
+        """
+        with self._lock:
+            statistics = self._summary_statistics if reset else self.statistics
+            if reset:
+                self._summary_statistics = {}
+        summary = {}
+        for name, phase in statistics.items():
+            summary[name] = {
+                "calls": phase.calls,
+                "wall_ms": phase.wall_time * 1e3,
+                "mean_wall_ms": phase.wall_time / phase.calls * 1e3,
+                "max_wall_ms": phase.max_wall_time * 1e3,
+            }
+            if self.sync_device:
+                summary[name]["device_ms"] = phase.device_time * 1e3
+                summary[name]["mean_device_ms"] = phase.device_time / phase.calls * 1e3
+            if self.count_allocations:
+                summary[name]["allocations"] = phase.allocations
+        return summary
+
+    def write_summary(self, track_data: Callable[[str, float], None], prefix: str = "Profiling") -> None:
+        """Write the statistics since the last summary with a ``track_data(tag, value)`` callable
+        (e.g. the skrl agent's ``track_data``, which writes to TensorBoard)."""
+        for name, phase in self.summary(reset=True).items():
+            track_data(f"{prefix} / {name} (ms)", phase["mean_wall_ms"])
+            track_data(f"{prefix} / {name} calls", phase["calls"])
+            if "mean_device_ms" in phase:
+                track_data(f"{prefix} / {name} device (ms)", phase["mean_device_ms"])
+            if "allocations" in phase:
+                track_data(f"{prefix} / {name} allocations", phase["allocations"] / phase["calls"])
+
+    def export_chrome_trace(self, path: str) -> None:
+        """Write the recorded spans as a Chrome/Perfetto trace (JSON), e.g. for https://ui.perfetto.dev."""
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {"name": name, "ph": "X", "ts": ts, "dur": dur, "pid": pid, "tid": tid, "args": args}
+                for name, ts, dur, tid, args in self._trace_events
+            ]
+            dropped = self._dropped_trace_events
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"summary": self.summary()}}, file)
+        if dropped:
+            print(f"[WARNING] {dropped} profiler spans were not recorded (max_trace_events: {self.max_trace_events})")
+        print(f"[INFO] Profiler trace written to {path} ({len(events)} spans)")
+
+    def print_summary(self) -> None:
+        """Print the per-phase statistics (sorted by total wall-clock time)."""
+        summary = sorted(self.summary().items(), key=lambda item: -item[1]["wall_ms"])
+        print(f"{'phase':<48} | {'calls':>8} | {'total (ms)':>11} | {'mean (ms)':>9} | {'device (ms)':>11} | {'allocs':>7}")
+        for name, phase in summary:
+            print(
+                f"{name:<48} | {phase['calls']:>8} | {phase['wall_ms']:>11.2f} | {phase['mean_wall_ms']:>9.4f} |"
+                f" {phase.get('mean_device_ms', float('nan')):>11.4f} |"
+                f" {phase.get('allocations', 0) / phase['calls']:>7.1f}"
+            )
+
+
+PROFILER = Profiler()
+"""Global profiler (disabled by default), shared by the environment, the AMP motion manager and the scripts."""
@@ -0,0 +1,113 @@
+"""
+Per-step cost of the observation computation (``policy`` and ``amp_obs`` groups): the fused AMP observation term
+against the previous per-term configuration (seven terms evaluated by each group).
+
+USAGE:
+    python benchmarks/amp_observation_terms.py [--num_envs 4096] [--num-steps 1000]
+
+REQUIREMENTS:
+    - Isaac Lab (the task must be registered, see the README installation)
+"""
+
+import argparse
+
+from isaaclab.app import AppLauncher
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--task", type=str, default="Isaac-G1-AMP-Walk-v0", help="Task name")
+parser.add_argument("--num_envs", type=int, default=4096, help="Number of environments")
+parser.add_argument("--num-steps", type=int, default=1000, help="Number of timed observation computations")
+AppLauncher.add_app_launcher_args(parser)
+args = parser.parse_args()
+args.headless = True
+simulation_app = AppLauncher(args).app
+
+import time  # noqa: E402
+
+import gymnasium as gym  # noqa: E402
+import torch  # noqa: E402
+
+import isaaclab_tasks  # noqa: E402, F401
+import isaaclab_tasks.manager_based.classic.humanoid.mdp as mdp  # noqa: E402
+from isaaclab.managers import ObservationGroupCfg as ObsGroup  # noqa: E402
+from isaaclab.managers import ObservationTermCfg as ObsTerm  # noqa: E402
+from isaaclab.utils import configclass  # noqa: E402
+from isaaclab_tasks.manager_based.g1_amp.amp_mdp import observations as amp_mdp  # noqa: E402
+from isaaclab_tasks.utils import parse_env_cfg  # noqa: E402
+
+
+@configclass
+class PerTermObservationsCfg:
+    """Previous observation configuration: each group evaluates the seven AMP terms."""
+
+    @configclass
+    class PolicyCfg(ObsGroup):
+        dof_positions = ObsTerm(func=mdp.joint_pos)
+        dof_velocities = ObsTerm(func=mdp.joint_vel)
+        root_positions = ObsTerm(func=amp_mdp.body_pos_w)
+        root_rotations = ObsTerm(func=amp_mdp.body_quat_w)
+        root_linear_velocities = ObsTerm(func=amp_mdp.body_lin_vel_w)
+        root_angular_velocities = ObsTerm(func=amp_mdp.body_ang_vel_w)
+        key_body_positions = ObsTerm(func=amp_mdp.key_body_pos_w)
+        actions = ObsTerm(func=mdp.last_action)
+
+        def __post_init__(self):
+            self.enable_corruption = False
+            self.concatenate_terms = True
+
+    @configclass
+    class AmpCfg(ObsGroup):
+        dof_positions = ObsTerm(func=mdp.joint_pos)
+        dof_velocities = ObsTerm(func=mdp.joint_vel)
+        root_positions = ObsTerm(func=amp_mdp.body_pos_w)
+        root_rotations = ObsTerm(func=amp_mdp.body_quat_w)
+        root_linear_velocities = ObsTerm(func=amp_mdp.body_lin_vel_w)
+        root_angular_velocities = ObsTerm(func=amp_mdp.body_ang_vel_w)
+        key_body_positions = ObsTerm(func=amp_mdp.key_body_pos_w)
+
+        def __post_init__(self):
+            self.enable_corruption = False
+            self.concatenate_terms = True
+
+    policy: PolicyCfg = PolicyCfg()
+    amp_obs: AmpCfg = AmpCfg()
+
+
+def measure(env, num_steps: int) -> tuple[float, dict[str, torch.Tensor]]:
+    """Time the observation computation (in milliseconds per step), and return the last observations."""
+    observation_manager = env.unwrapped.observation_manager
+    synchronize = torch.cuda.synchronize if str(env.unwrapped.device).startswith("cuda") else lambda: None
+    for _ in range(10):
+        observation_manager.compute()
+    synchronize()
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        # a new environment step (the fused term recomputes the observation once per step)
+        env.unwrapped.common_step_counter += 1
+        observations = observation_manager.compute()
+    synchronize()
+    return (time.perf_counter() - start) / num_steps * 1e3, observations
+
+
+if __name__ == "__main__":
+    results, error = {}, None
+    for label in ["per-term", "fused"]:
+        env_cfg = parse_env_cfg(args.task, device=args.device, num_envs=args.num_envs)
+        if label == "per-term":
+            env_cfg.observations = PerTermObservationsCfg()
+        env = gym.make(args.task, cfg=env_cfg)
+        env.reset(seed=42)
+        milliseconds, observations = measure(env, args.num_steps)
+        results[label] = milliseconds
+        if label == "per-term":
+            # compare with the fused term on the same simulation state
+            term = amp_mdp.amp_observation(ObsTerm(func=amp_mdp.amp_observation), env.unwrapped)
+            error = (term(env.unwrapped) - observations["amp_obs"]).abs().max().item()
+        env.close()
+
+    print(f"Observation computation ({args.num_envs} envs, {args.num_steps} steps)")
+    for label, milliseconds in results.items():
+        print(f"  {label:<8}: {milliseconds:.3f} ms/step")
+    print(f"  speedup : {results['per-term'] / results['fused']:.2f}x (max abs difference: {error:.2e})")
+
+    simulation_app.close()
@@ -0,0 +1,168 @@
+"""
+Throughput, memory and style-reward statistics of the AMP models trained in bfloat16 autocast against float32.
+
+Each configuration trains the policy, value and discriminator models (``scripts/models/amp.py``) from the same
+initial weights, on the same mini-batches, with the AMP agent's losses (clipped surrogate, value loss, and
+discriminator loss with logit regularization, gradient penalty and weight decay). The discriminator separates
+reference AMP-like observations (computed from a motion file) from perturbed ones, standing in for the policy.
+
+USAGE:
+    python benchmarks/bf16_training.py [--device cuda] [--batch-size 32768] [--steps 200]
+
+REQUIREMENTS:
+    - skrl
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+import gymnasium
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "amp_task", "motions"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from compact_memory import amp_like_observations  # noqa: E402
+from motion_loader import MotionLoader  # noqa: E402
+from models.amp import Discriminator, Policy, Value, get_amp_cfg  # noqa: E402
+
+NUM_OBSERVATIONS = 130  # policy observations (AMP observation and last actions)
+NUM_ACTIONS = 29
+
+
+def create_models(device: str, autocast_bf16: bool) -> dict:
+    observation_space = gymnasium.spaces.Box(low=-np.inf, high=np.inf, shape=(NUM_OBSERVATIONS,))
+    action_space = gymnasium.spaces.Box(low=-1, high=1, shape=(NUM_ACTIONS,))
+    amp_observation_space = gymnasium.spaces.Box(low=-np.inf, high=np.inf, shape=(202,))
+    torch.manual_seed(0)
+    return {
+        "policy": Policy(observation_space, action_space, device, autocast_bf16=autocast_bf16),
+        "value": Value(observation_space, action_space, device, autocast_bf16=autocast_bf16),
+        "discriminator": Discriminator(amp_observation_space, action_space, device, autocast_bf16=autocast_bf16),
+    }
+
+
+def update(models: dict, optimizer: torch.optim.Optimizer, cfg: dict, batch: dict) -> dict:
+    """One mini-batch update, with the losses of the AMP agent."""
+    _, log_prob, _ = models["policy"].act(
+        {"states": batch["states"], "taken_actions": batch["actions"]}, role="policy"
+    )
+    ratio = torch.exp(log_prob - batch["log_prob"])
+    advantages = batch["advantages"]
+    policy_loss = -torch.min(
+        advantages * ratio, advantages * torch.clip(ratio, 1.0 - cfg["ratio_clip"], 1.0 + cfg["ratio_clip"])
+    ).mean()
+    values, _, _ = models["value"].act({"states": batch["states"]}, role="value")
+    value_loss = cfg["value_loss_scale"] * F.mse_loss(batch["returns"], values)
+
+    discriminator = models["discriminator"]
+    motion_states = batch["motion_states"].clone().requires_grad_(True)
+    policy_logits, _, _ = discriminator.act({"states": batch["amp_states"]}, role="discriminator")
+    motion_logits, _, _ = discriminator.act({"states": motion_states}, role="discriminator")
+    discriminator_loss = 0.5 * (
+        F.binary_cross_entropy_with_logits(policy_logits, torch.zeros_like(policy_logits))
+        + F.binary_cross_entropy_with_logits(motion_logits, torch.ones_like(motion_logits))
+    )
+    logit_weights = torch.flatten(list(discriminator.modules())[-1].weight)
+    discriminator_loss += cfg["discriminator_logit_regularization_scale"] * torch.sum(torch.square(logit_weights))
+    gradient = torch.autograd.grad(
+        motion_logits, motion_states, grad_outputs=torch.ones_like(motion_logits), create_graph=True, retain_graph=True
+    )[0]
+    gradient_penalty = torch.sum(torch.square(gradient), dim=-1).mean()
+    discriminator_loss += cfg["discriminator_gradient_penalty_scale"] * gradient_penalty
+    weights = [torch.flatten(m.weight) for m in discriminator.modules() if isinstance(m, torch.nn.Linear)]
+    discriminator_loss += cfg["discriminator_weight_decay_scale"] * torch.sum(torch.square(torch.cat(weights)))
+    discriminator_loss *= cfg["discriminator_loss_scale"]
+
+    optimizer.zero_grad()
+    (policy_loss + value_loss + discriminator_loss).backward()
+    optimizer.step()
+    return {"discriminator_loss": discriminator_loss.item(), "gradient_penalty": gradient_penalty.item()}
+
+
+def style_rewards(discriminator, states: torch.Tensor, cfg: dict) -> torch.Tensor:
+    # same as the AMP agent
+    with torch.no_grad():
+        logits, _, _ = discriminator.act({"states": states}, role="discriminator")
+        reward = -torch.log(torch.clamp(1 - 1 / (1 + torch.exp(-logits)), min=0.0001))
+    return reward * cfg["discriminator_reward_scale"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", type=str, default=os.path.join(ROOT_DIR, "amp_task", "motions", "g1_walk.npz"))
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--batch-size", type=int, default=32768, help="Policy/value mini-batch size")
+    parser.add_argument("--discriminator-batch-size", type=int, default=4096, help="Discriminator mini-batch size")
+    parser.add_argument("--steps", type=int, default=200, help="Number of (timed) updates")
+    parser.add_argument("--noise", type=float, default=0.3, help="Policy observation perturbation (in std)")
+    args = parser.parse_args()
+
+    device = args.device
+    cfg = get_amp_cfg(
+        env=argparse.Namespace(observation_space=NUM_OBSERVATIONS, amp_observation_space=202), device=device
+    )
+    # data (normalized, as seen by the models after the running standard scalers)
+    torch.manual_seed(42)
+    loader = MotionLoader(args.file, "cpu", verbose=False)
+    expert = amp_like_observations(loader, 4 * args.discriminator_batch_size).to(device)
+    expert = (expert - expert.mean(dim=0)) / (expert.std(dim=0) + 1e-8)
+    perturbed = expert[torch.randperm(expert.shape[0], device=device)]
+    perturbed = perturbed + args.noise * torch.randn_like(perturbed)
+    batches = []
+    for _ in range(4):
+        indexes = torch.randint(0, expert.shape[0] // 2, (args.discriminator_batch_size,), device=device)
+        batches.append(
+            {
+                "states": torch.randn(args.batch_size, NUM_OBSERVATIONS, device=device),
+                "actions": torch.rand(args.batch_size, NUM_ACTIONS, device=device) * 2 - 1,
+                "log_prob": torch.randn(args.batch_size, 1, device=device) + 40,
+                "advantages": torch.randn(args.batch_size, 1, device=device),
+                "returns": torch.randn(args.batch_size, 1, device=device),
+                "amp_states": perturbed[indexes],
+                "motion_states": expert[indexes],
+            }
+        )
+    held_out = perturbed[expert.shape[0] // 2 :]
+
+    results = {}
+    for label, autocast_bf16 in [("float32", False), ("bfloat16", True)]:
+        models = create_models(device, autocast_bf16)
+        parameters = [p for model in models.values() for p in model.parameters() if p.requires_grad]
+        optimizer = torch.optim.Adam(parameters, lr=cfg["learning_rate"])
+        # warm-up (on a copy of the models, to train both configurations from the same weights)
+        warmup_models = copy.deepcopy(models)
+        warmup_optimizer = torch.optim.SGD([p for model in warmup_models.values() for p in model.parameters()], lr=0.0)
+        for step in range(5):
+            update(warmup_models, warmup_optimizer, cfg, batches[step % len(batches)])
+        if device.startswith("cuda"):
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+        start = time.perf_counter()
+        for step in range(args.steps):
+            statistics = update(models, optimizer, cfg, batches[step % len(batches)])
+        if device.startswith("cuda"):
+            torch.cuda.synchronize()
+        elapsed = time.perf_counter() - start
+        rewards = style_rewards(models["discriminator"], held_out, cfg)
+        results[label] = {
+            "updates/s": args.steps / elapsed,
+            "samples/s": args.steps * args.batch_size / elapsed,
+            "peak memory (MB)": torch.cuda.max_memory_allocated() / 1e6 if device.startswith("cuda") else float("nan"),
+            "style reward mean": rewards.mean().item(),
+            "style reward std": rewards.std().item(),
+            "discriminator loss": statistics["discriminator_loss"],
+            "gradient penalty": statistics["gradient_penalty"],
+        }
+
+    print(f"Device: {device}, batch size: {args.batch_size}, updates: {args.steps}")
+    print(f"{'':>20} | {'float32':>12} | {'bfloat16':>12} | {'ratio':>6}")
+    for name in results["float32"]:
+        fp32, bf16 = results["float32"][name], results["bfloat16"][name]
+        print(f"{name:>20} | {fp32:>12.4f} | {bf16:>12.4f} | {bf16 / fp32 if fp32 else float('nan'):>6.3f}")
@@ -0,0 +1,153 @@
+"""
+Compact AMP replay memory: memory footprint, sampling throughput and effect on the discriminator loss.
+
+A discriminator (same architecture as in ``scripts/models/amp.py``) is trained in float32 to separate reference
+AMP-like observations (computed from a motion file) from perturbed ones (standing in for the policy observations).
+The perturbed observations are then stored in a replay memory for each storage type, and the discriminator loss
+of the sampled (upcast) batches is compared with the float32 one on the same samples.
+
+USAGE:
+    python benchmarks/compact_memory.py [--memory-size 1000000] [--device cpu]
+
+REQUIREMENTS:
+    - skrl
+"""
+
+import argparse
+import os
+import sys
+
+import gymnasium
+import numpy as np
+import torch
+import torch.nn.functional as F
+import torch.utils.benchmark as benchmark
+from skrl.resources.preprocessors.torch import RunningStandardScaler
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOTIONS_DIR = os.path.join(ROOT_DIR, "amp_task", "motions")
+# import the motion loader without the task package (which requires Isaac Lab), and the training models
+sys.path.insert(0, MOTIONS_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts"))
+from motion_loader import MotionLoader  # noqa: E402
+from models.amp import Discriminator  # noqa: E402
+from models.memories import CompactRandomMemory  # noqa: E402
+
+
+def quat_rotate(q: torch.Tensor, v: torch.Tensor) -> torch.Tensor:
+    # rotate vectors by wxyz quaternions
+    xyz = q[:, 1:]
+    t = 2 * torch.cross(xyz, v, dim=-1)
+    return v + q[:, :1] * t + torch.cross(xyz, t, dim=-1)
+
+
+def amp_like_observations(loader: MotionLoader, num_samples: int, num_history: int = 2) -> torch.Tensor:
+    """AMP observation layout (see compute_obs), with the history, from random motion times."""
+    times = loader.sample_times(num_samples)
+    history = []
+    for step in range(num_history):
+        motion = loader.sample_fields(
+            num_samples,
+            fields={
+                "dof_positions": None,
+                "dof_velocities": None,
+                "body_positions": None,
+                "body_rotations": 0,
+                "body_linear_velocities": 0,
+                "body_angular_velocities": 0,
+            },
+            times=times - step * loader.dt,
+        )
+        rotation = motion["body_rotations"]
+        history.append(
+            torch.cat(
+                [
+                    motion["dof_positions"],
+                    motion["dof_velocities"],
+                    motion["body_positions"][:, 0, 2:3],
+                    quat_rotate(rotation, torch.tensor([[1.0, 0.0, 0.0]]).expand(num_samples, -1)),
+                    quat_rotate(rotation, torch.tensor([[0.0, 0.0, 1.0]]).expand(num_samples, -1)),
+                    motion["body_linear_velocities"],
+                    motion["body_angular_velocities"],
+                    (motion["body_positions"][:, 1:] - motion["body_positions"][:, :1]).flatten(1),
+                ],
+                dim=-1,
+            )
+        )
+    return torch.cat(history, dim=-1)
+
+
+def discriminator_loss(discriminator, scaler, expert: torch.Tensor, policy: torch.Tensor) -> tuple[float, float]:
+    """Discriminator loss (binary cross-entropy) and mean style reward of the policy samples."""
+    with torch.no_grad():
+        expert_logits, _, _ = discriminator.act({"states": scaler(expert)}, role="discriminator")
+        policy_logits, _, _ = discriminator.act({"states": scaler(policy)}, role="discriminator")
+        loss = 0.5 * (
+            F.binary_cross_entropy_with_logits(expert_logits, torch.ones_like(expert_logits))
+            + F.binary_cross_entropy_with_logits(policy_logits, torch.zeros_like(policy_logits))
+        )
+        style_reward = -torch.log(torch.clamp(1 - torch.sigmoid(policy_logits), min=1e-4))
+    return loss.item(), style_reward.mean().item()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", type=str, default=os.path.join(MOTIONS_DIR, "g1_walk.npz"), help="Motion file")
+    parser.add_argument("--device", type=str, default="cpu", help="Device")
+    parser.add_argument("--memory-size", type=int, default=200000, help="Replay memory size")
+    parser.add_argument("--batch-size", type=int, default=65536, help="Sampled batch size (rollouts * envs)")
+    parser.add_argument("--mini-batches", type=int, default=2, help="Number of mini-batches")
+    parser.add_argument("--train-steps", type=int, default=200, help="Discriminator training steps")
+    parser.add_argument("--noise", type=float, default=0.3, help="Perturbation (in standard deviations)")
+    args = parser.parse_args()
+
+    torch.manual_seed(42)
+    device = args.device
+    loader = MotionLoader(args.file, "cpu", verbose=False)
+    expert = amp_like_observations(loader, args.memory_size).to(device)
+    policy = expert[torch.randperm(expert.shape[0], device=device)]
+    policy = policy + args.noise * policy.std(dim=0) * torch.randn_like(policy)
+    size = expert.shape[-1]
+
+    # discriminator (and AMP observation normalizer) trained in float32
+    space = gymnasium.spaces.Box(low=-np.inf, high=np.inf, shape=(size,))
+    discriminator = Discriminator(space, gymnasium.spaces.Box(low=-1, high=1, shape=(1,)), device)
+    scaler = RunningStandardScaler(size=space, device=device)
+    optimizer = torch.optim.Adam(discriminator.parameters(), lr=1e-4)
+    for _ in range(args.train_steps):
+        indexes = torch.randint(0, args.memory_size, (4096,), device=device)
+        states = scaler(torch.cat([expert[indexes], policy[indexes]]), train=True)
+        logits, _, _ = discriminator.act({"states": states}, role="discriminator")
+        labels = torch.cat([torch.ones(4096, 1, device=device), torch.zeros(4096, 1, device=device)])
+        loss = F.binary_cross_entropy_with_logits(logits, labels)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+    indexes = torch.randint(0, args.memory_size, (args.batch_size,))
+    reference_loss, reference_reward = discriminator_loss(discriminator, scaler, expert[indexes], policy[indexes])
+    print(f"AMP observations: {size}, memory size: {args.memory_size}, device: {device}")
+    print(
+        f"{'storage':>8} | {'bytes/sample':>12} | {'samples/GB':>10} | {'sample (ms)':>11} |"
+        f" {'max abs error':>13} | {'disc. loss':>10} | {'style reward':>12}"
+    )
+    for storage in ["float32", "bfloat16", "float16", "int8"]:
+        memory = CompactRandomMemory(args.memory_size, device=device, compact_names=("states",), storage=storage)
+        memory.create_tensor(name="states", size=size, dtype=torch.float32)
+        memory.set_scaler("states", scaler)
+        for start in range(0, args.memory_size, 4096):
+            memory.add_samples(states=policy[start : start + 4096])
+        bytes_per_sample = memory.tensors["states"].element_size() * size
+        timer = benchmark.Timer(
+            stmt="memory.sample(names=['states'], batch_size=batch_size, mini_batches=mini_batches)",
+            globals={"memory": memory, "batch_size": args.batch_size, "mini_batches": args.mini_batches},
+        )
+        milliseconds = timer.blocked_autorange(min_run_time=1.0).median * 1e3
+        sampled = torch.cat([batch[0] for batch in memory.sample_by_index(["states"], indexes, args.mini_batches)])
+        error = (sampled - policy[indexes]).abs().max().item()
+        loss, reward = discriminator_loss(discriminator, scaler, expert[indexes], sampled)
+        print(
+            f"{storage:>8} | {bytes_per_sample:>12} | {int(1e9 / bytes_per_sample):>10} | {milliseconds:>11.3f} |"
+            f" {error:>13.2e} | {loss:>10.5f} | {reward:>12.5f}"
+        )
+    print(f"(float32 reference on the same samples: loss {reference_loss:.5f}, style reward {reference_reward:.5f})")
@@ -0,0 +1,296 @@
+"""
+Microbenchmark suite of the per-step and per-reset hot paths (motion sampling and AMP observations), on CPU.
+
+Each case is measured for each motion (the bundled ``g1_walk.npz`` and ``humanoid_dance.npz``, and a long
+synthetic motion with the G1 skeleton) and sample count (from 1k to 64k):
+
+- ``MotionLoader.sample``, ``MotionLoader._slerp`` and ``MotionLoader._interpolate``
+- ``compute_obs`` and ``quaternion_to_tangent_and_normal``
+- ``AMPMotionManager.collect_reference_motions``, ``AMPMotionManager.sample_reset_motions`` and
+  ``AMPMotionManager.amp_step`` (AMP observation history update, one sample per environment)
+
+The results (median and interquartile range, in milliseconds) are written to a JSON file with the run metadata.
+Runs can be compared with ``--compare`` (e.g. before and after a change).
+
+USAGE:
+    python benchmarks/hot_paths.py [--output hot_paths.json] [--compare baseline.json] [--cases sample compute_obs]
+
+REQUIREMENTS:
+    - Isaac Lab (``isaaclab.utils.math``, used by ``compute_obs``, and the AMP motion manager). Cases that cannot be
+      imported are skipped (and reported as such in the JSON file)
+"""
+
+import argparse
+import datetime
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import types
+
+import numpy as np
+import torch
+import torch.utils.benchmark as benchmark
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOTIONS_DIR = os.path.join(ROOT_DIR, "amp_task", "motions")
+# import the motion loader without the task package (which requires Isaac Lab)
+sys.path.insert(0, MOTIONS_DIR)
+from motion_loader import MotionLoader  # noqa: E402
+
+NUM_SAMPLES = [1024, 4096, 16384, 65536]
+MOTION_FILES = {
+    "g1_walk": os.path.join(MOTIONS_DIR, "g1_walk.npz"),
+    "humanoid_dance": os.path.join(MOTIONS_DIR, "humanoid_dance.npz"),
+}
+REFERENCE_BODY = "pelvis"
+
+
+def import_task_module(name: str) -> types.ModuleType:
+    """Import a module of the task package without running the initialization of the task package (environment
+    registration) and of the MDP package, which require the simulator."""
+    for package in ["amp_task", "amp_task.amp_mdp"]:
+        if package not in sys.modules:
+            path = os.path.join(ROOT_DIR, *package.split("."))
+            spec = importlib.util.spec_from_file_location(
+                package, os.path.join(path, "__init__.py"), submodule_search_locations=[path]
+            )
+            sys.modules[package] = importlib.util.module_from_spec(spec)
+    return importlib.import_module(f"amp_task.{name}")
+
+
+def write_synthetic_motion(path: str, num_frames: int = 36000, fps: int = 60, seed: int = 0) -> None:
+    """Write a long synthetic motion with the G1 skeleton (DOF and body names of ``g1_walk.npz``)."""
+    rng = np.random.default_rng(seed)
+    reference = np.load(MOTION_FILES["g1_walk"])
+    num_dofs, num_bodies = len(reference["dof_names"]), len(reference["body_names"])
+
+    def smooth(shape: tuple) -> np.ndarray:
+        return np.cumsum(rng.normal(scale=0.01, size=shape), axis=0).astype(np.float32)
+
+    rotations = rng.normal(size=(num_bodies, 4)) + smooth((num_frames, num_bodies, 4))
+    np.savez(
+        path,
+        fps=fps,
+        dof_names=reference["dof_names"],
+        body_names=reference["body_names"],
+        dof_positions=smooth((num_frames, num_dofs)),
+        dof_velocities=smooth((num_frames, num_dofs)),
+        body_positions=smooth((num_frames, num_bodies, 3)),
+        body_rotations=(rotations / np.linalg.norm(rotations, axis=-1, keepdims=True)).astype(np.float32),
+        body_linear_velocities=smooth((num_frames, num_bodies, 3)),
+        body_angular_velocities=smooth((num_frames, num_bodies, 3)),
+    )
+
+
+def create_motion_manager(motion_file: str, loader: MotionLoader, num_envs: int):
+    """AMP motion manager (see ``AMPCfg``) for a motion, with all its DOFs and its bodies as key bodies."""
+    amp_motion_manager = import_task_module("manager.amp_motion_manager")
+    key_body_names = [name for name in loader.body_names if name != REFERENCE_BODY]
+    amp = types.SimpleNamespace(
+        reference_body=REFERENCE_BODY,
+        key_body_names=key_body_names,
+        num_amp_observations=2,
+        num_amp_observation_space=2 * loader.num_dofs + 1 + 6 + 3 + 3 + 3 * len(key_body_names),
+        motion_file=motion_file,
+        motion_weights=None,
+        motion_catalog_filter=None,
+        motion_mmap=False,
+        motion_num_workers=0,
+        motion_cache_dir=None,
+        motion_precision=None,
+        motion_seed=0,
+        precompute_reference_observations=False,
+        reference_observation_table_tolerance=1e-2,
+        reference_observation_bank_size=0,
+    )
+    robot_data = types.SimpleNamespace(joint_names=loader.dof_names, body_names=loader.body_names)
+    env = types.SimpleNamespace(scene=_Scene(num_envs, types.SimpleNamespace(data=robot_data)))
+    with open(os.devnull, "w") as devnull:  # silence the motion library summary
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            return amp_motion_manager.AMPMotionManager(types.SimpleNamespace(amp=amp, seed=0), env, "cpu")
+        finally:
+            sys.stdout = stdout
+
+
+class _Scene:
+    """Interactive scene attributes used by the AMP motion manager."""
+
+    def __init__(self, num_envs: int, robot) -> None:
+        self.num_envs = num_envs
+        self._robot = robot
+
+    def __getitem__(self, name: str):
+        return self._robot
+
+
+def create_cases(loader: MotionLoader, motion_file: str, num_samples: int) -> dict:
+    """Statements (and their globals) of the benchmark cases, or the reason why a case is skipped."""
+    times = loader.sample_times(num_samples)
+    index_0, index_1, blend = loader._compute_frame_blend(times)
+    cases = {
+        "MotionLoader.sample": ("loader.sample(num_samples, times=times)", {}),
+        "MotionLoader._slerp": (
+            "loader._slerp(rotations, blend=blend, start=index_0, end=index_1)",
+            {"rotations": loader.get_field("body_rotations")},
+        ),
+        "MotionLoader._interpolate": (
+            "loader._interpolate(positions, blend=blend, start=index_0, end=index_1)",
+            {"positions": loader.get_field("body_positions")},
+        ),
+    }
+    try:
+        amp_utils = import_task_module("amp_mdp.utils")
+        (dof_positions, dof_velocities, body_positions, body_rotations, body_linear_velocities,
+         body_angular_velocities) = loader.sample(num_samples, times=times)
+        cases["quaternion_to_tangent_and_normal"] = (
+            "amp_utils.quaternion_to_tangent_and_normal(rotations)",
+            {"amp_utils": amp_utils, "rotations": body_rotations[:, 0].contiguous()},
+        )
+        cases["compute_obs"] = (
+            "amp_utils.compute_obs(*inputs)",
+            {
+                "amp_utils": amp_utils,
+                "inputs": (
+                    dof_positions,
+                    dof_velocities,
+                    body_positions[:, 0],
+                    body_rotations[:, 0],
+                    body_linear_velocities[:, 0],
+                    body_angular_velocities[:, 0],
+                    body_positions[:, 1:],
+                ),
+            },
+        )
+    except ImportError as e:
+        cases["quaternion_to_tangent_and_normal"] = cases["compute_obs"] = f"import error: {e}"
+    try:
+        manager = create_motion_manager(motion_file, loader, num_envs=num_samples)
+        amp_observations = torch.randn(num_samples, manager.cfg.amp.num_amp_observation_space)
+        cases["AMPMotionManager.collect_reference_motions"] = (
+            "manager.collect_reference_motions(num_samples)",
+            {"manager": manager},
+        )
+        cases["AMPMotionManager.sample_reset_motions"] = (
+            "manager.sample_reset_motions(num_samples)",
+            {"manager": manager},
+        )
+        cases["AMPMotionManager.amp_step"] = (
+            "manager.amp_step(({'amp_obs': amp_observations}, {}))",
+            {"manager": manager, "amp_observations": amp_observations},
+        )
+    except ImportError as e:
+        for name in ["collect_reference_motions", "sample_reset_motions", "amp_step"]:
+            cases[f"AMPMotionManager.{name}"] = f"import error: {e}"
+    common = {
+        "loader": loader,
+        "num_samples": num_samples,
+        "times": times,
+        "index_0": index_0,
+        "index_1": index_1,
+        "blend": blend,
+    }
+    return {
+        name: case if isinstance(case, str) else (case[0], {**common, **case[1]}) for name, case in cases.items()
+    }
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "num_threads": torch.get_num_threads(),
+    }
+
+
+def compare(results: list, baseline_file: str) -> None:
+    """Print the speedup of the results with respect to a previous run."""
+    with open(baseline_file) as file:
+        baseline = {
+            (result["case"], result["motion"], result["num_samples"]): result["median_ms"]
+            for result in json.load(file)["results"]
+        }
+    print(f"\nComparison with {baseline_file} (speedup > 1: faster than the baseline)")
+    for result in results:
+        key = (result["case"], result["motion"], result["num_samples"])
+        if key in baseline:
+            print(
+                f"  {result['case']:<42} {result['motion']:<15} {result['num_samples']:>6}:"
+                f" {baseline[key]:>9.3f} -> {result['median_ms']:>9.3f} ms ({baseline[key] / result['median_ms']:.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", type=str, default="hot_paths.json", help="Output JSON file")
+    parser.add_argument("--compare", type=str, default=None, help="Previous JSON output to compare the results with")
+    parser.add_argument("--num-samples", type=int, nargs="+", default=NUM_SAMPLES, help="Sample counts")
+    parser.add_argument("--cases", type=str, nargs="+", default=None, help="Run only the cases containing these names")
+    parser.add_argument("--motions", type=str, nargs="+", default=None, help="Run only these motions")
+    parser.add_argument("--num-threads", type=int, default=None, help="Number of CPU threads (default: torch's)")
+    parser.add_argument("--min-run-time", type=float, default=0.5, help="Minimum run time per measurement (sec)")
+    args = parser.parse_args()
+
+    if args.num_threads is not None:
+        torch.set_num_threads(args.num_threads)
+    torch.manual_seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        motion_files = {**MOTION_FILES, "synthetic": os.path.join(directory, "synthetic.npz")}
+        if args.motions is not None:
+            motion_files = {name: path for name, path in motion_files.items() if name in args.motions}
+        if "synthetic" in motion_files:
+            write_synthetic_motion(motion_files["synthetic"])
+
+        results, skipped = [], {}
+        print(f"{'case':<42} | {'motion':<15} | {'samples':>7} | {'median (ms)':>11} | {'IQR (ms)':>9} | {'Msamples/s':>10}")
+        for motion, motion_file in motion_files.items():
+            loader = MotionLoader(motion_file, "cpu", verbose=False)
+            for num_samples in args.num_samples:
+                for name, case in create_cases(loader, motion_file, num_samples).items():
+                    if args.cases is not None and not any(pattern in name for pattern in args.cases):
+                        continue
+                    if isinstance(case, str):
+                        skipped[name] = case
+                        continue
+                    stmt, globals_ = case
+                    measurement = benchmark.Timer(stmt=stmt, globals=globals_).blocked_autorange(
+                        min_run_time=args.min_run_time
+                    )
+                    result = {
+                        "case": name,
+                        "motion": motion,
+                        "num_frames": loader.num_frames,
+                        "num_samples": num_samples,
+                        "median_ms": measurement.median * 1e3,
+                        "iqr_ms": measurement.iqr * 1e3,
+                        "num_runs": len(measurement.times) * measurement.number_per_run,
+                    }
+                    results.append(result)
+                    print(
+                        f"{name:<42} | {motion:<15} | {num_samples:>7} | {result['median_ms']:>11.3f} |"
+                        f" {result['iqr_ms']:>9.3f} | {num_samples / measurement.median / 1e6:>10.2f}"
+                    )
+    for name, reason in skipped.items():
+        print(f"[WARNING] Skipped {name} ({reason})")
+
+    with open(args.output, "w") as file:
+        json.dump({"metadata": metadata(), "results": results, "skipped": skipped}, file, indent=2)
+    print(f"[INFO] Results written to {args.output}")
+    if args.compare is not None:
+        compare(results, args.compare)
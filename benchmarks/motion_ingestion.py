@@ -0,0 +1,43 @@
+"""
+Load throughput of the motion library (clips/s and MB/s) for different numbers of loading threads.
+
+Note that files read again are served from the OS page cache, so the first measurement may be slower
+(disk-bound) than the following ones.
+
+USAGE:
+    python benchmarks/motion_ingestion.py --files MOTION_DIR [--device cpu] [--num-workers 0 1 2 4 8 16]
+"""
+
+import argparse
+import os
+import sys
+
+# import the motion library without the task package (which requires Isaac Lab)
+MOTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "amp_task", "motions")
+sys.path.insert(0, MOTIONS_DIR)
+from motion_library import MotionLibrary  # noqa: E402
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=str, nargs="+", required=True, help="Motion files, directories or patterns")
+    parser.add_argument("--device", type=str, default="cpu", help="Device to load the motions to")
+    parser.add_argument("--num-workers", type=int, nargs="+", default=[0, 1, 2, 4, 8, 16], help="Thread counts")
+    parser.add_argument("--mmap", action="store_true", default=False, help="Memory-map the motion files")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of loads per thread count (best is reported)")
+    args = parser.parse_args()
+
+    results = []
+    for num_workers in args.num_workers:
+        statistics = []
+        for _ in range(args.repeats):
+            library = MotionLibrary(args.files, args.device, mmap=args.mmap, num_workers=num_workers)
+            statistics.append(library.load_statistics)
+        results.append((num_workers, max(statistics, key=lambda item: item["clips_per_second"])))
+
+    print(f"\nMotions: {library.num_motions} ({library.num_frames} frames, device: {args.device})")
+    print(f"{'workers':>7} | {'time (s)':>8} | {'clips/s':>9} | {'MB/s':>8}")
+    for num_workers, item in results:
+        print(
+            f"{num_workers:>7} | {item['time']:>8.3f} | {item['clips_per_second']:>9.1f} |"
+            f" {item['megabytes_per_second']:>8.1f}"
+        )
@@ -0,0 +1,142 @@
+"""
+Error statistics of the reduced-precision motion storage on the AMP observations (``compute_obs`` outputs).
+
+For each storage precision configuration, the AMP observations of the same random motion samples are computed
+from a float32 motion and from the reduced-precision motion, and the absolute error is reported per observation
+term, together with the motion memory size.
+
+USAGE:
+    python benchmarks/motion_precision.py [--file MOTION_FILE] [--num-samples 65536] [--device cpu]
+
+REQUIREMENTS:
+    - Isaac Lab (``isaaclab.utils.math``, used by ``compute_obs``)
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+import torch
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOTIONS_DIR = os.path.join(ROOT_DIR, "amp_task", "motions")
+# import the motion loader and the AMP observation without the task package (which requires the simulator)
+sys.path.insert(0, MOTIONS_DIR)
+from motion_loader import MotionLoader  # noqa: E402
+
+_spec = importlib.util.spec_from_file_location("amp_utils", os.path.join(ROOT_DIR, "amp_task", "amp_mdp", "utils.py"))
+amp_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(amp_utils)
+
+# default AMP bodies (see AMPCfg in amp_task/g1_amp_env_cfg.py)
+REFERENCE_BODY = "pelvis"
+KEY_BODY_NAMES = [
+    "left_shoulder_pitch_link",
+    "right_shoulder_pitch_link",
+    "left_elbow_link",
+    "right_elbow_link",
+    "right_hip_yaw_link",
+    "left_hip_yaw_link",
+    "right_rubber_hand",
+    "left_rubber_hand",
+    "right_ankle_roll_link",
+    "left_ankle_roll_link",
+]
+
+PRECISIONS = {
+    "fp16": {
+        "dof_positions": "float16",
+        "dof_velocities": "float16",
+        "body_positions": "float16",
+        "body_linear_velocities": "float16",
+        "body_angular_velocities": "float16",
+    },
+    "fp16+int16 rotations": {
+        "dof_positions": "float16",
+        "dof_velocities": "float16",
+        "body_positions": "float16",
+        "body_rotations": "int16",
+        "body_linear_velocities": "float16",
+        "body_angular_velocities": "float16",
+    },
+    "bf16+int16 rotations": {
+        "dof_positions": "bfloat16",
+        "dof_velocities": "bfloat16",
+        "body_positions": "bfloat16",
+        "body_rotations": "int16",
+        "body_linear_velocities": "bfloat16",
+        "body_angular_velocities": "bfloat16",
+    },
+    "velocities only (fp16)": {
+        "dof_velocities": "float16",
+        "body_linear_velocities": "float16",
+        "body_angular_velocities": "float16",
+    },
+}
+
+
+def compute_amp_observations(loader: MotionLoader, times: torch.Tensor, num_key_bodies: int) -> torch.Tensor:
+    motion = loader.sample_fields(
+        num_samples=times.shape[0],
+        fields={
+            "dof_positions": None,
+            "dof_velocities": None,
+            "body_positions": None,
+            "body_rotations": 0,
+            "body_linear_velocities": 0,
+            "body_angular_velocities": 0,
+        },
+        times=times,
+    )
+    return amp_utils.compute_obs(
+        motion["dof_positions"],
+        motion["dof_velocities"],
+        motion["body_positions"][:, 0],
+        motion["body_rotations"],
+        motion["body_linear_velocities"],
+        motion["body_angular_velocities"],
+        motion["body_positions"][:, 1 : 1 + num_key_bodies],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", type=str, default=os.path.join(MOTIONS_DIR, "g1_walk.npz"), help="Motion file")
+    parser.add_argument("--device", type=str, default="cpu", help="Device to load the motion to")
+    parser.add_argument("--num-samples", type=int, default=65536, help="Number of motion samples")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the motion time samples")
+    args = parser.parse_args()
+
+    body_names = [REFERENCE_BODY] + KEY_BODY_NAMES
+    reference = MotionLoader(args.file, args.device, verbose=False, body_names=body_names)
+    generator = torch.Generator(device=args.device).manual_seed(args.seed)
+    times = reference.duration * torch.rand(args.num_samples, device=args.device, generator=generator)
+    expected = compute_amp_observations(reference, times, len(KEY_BODY_NAMES))
+
+    # observation terms (see compute_obs)
+    num_dofs = reference.num_dofs
+    terms = {
+        "dof_positions": slice(0, num_dofs),
+        "dof_velocities": slice(num_dofs, 2 * num_dofs),
+        "root_height": slice(2 * num_dofs, 2 * num_dofs + 1),
+        "root_tangent_normal": slice(2 * num_dofs + 1, 2 * num_dofs + 7),
+        "root_linear_velocity": slice(2 * num_dofs + 7, 2 * num_dofs + 10),
+        "root_angular_velocity": slice(2 * num_dofs + 10, 2 * num_dofs + 13),
+        "key_body_positions": slice(2 * num_dofs + 13, expected.shape[-1]),
+    }
+
+    print(f"Motion: {args.file} ({reference.num_frames} frames, {args.num_samples} samples)")
+    print(f"float32 memory: {reference.memory_size / 1024:.1f} KiB")
+    for label, precision in PRECISIONS.items():
+        loader = MotionLoader(args.file, args.device, verbose=False, body_names=body_names, precision=precision)
+        error = (compute_amp_observations(loader, times, len(KEY_BODY_NAMES)) - expected).abs()
+        ratio = reference.memory_size / loader.memory_size
+        print(f"\n{label}: memory {loader.memory_size / 1024:.1f} KiB ({ratio:.2f}x smaller)")
+        print(f"  {'term':<24} {'max abs error':>14} {'mean abs error':>15} {'rms error':>10}")
+        for name, columns in list(terms.items()) + [("all", slice(None))]:
+            term_error = error[:, columns]
+            print(
+                f"  {name:<24} {term_error.max().item():>14.2e} {term_error.mean().item():>15.2e}"
+                f" {term_error.square().mean().sqrt().item():>10.2e}"
+            )
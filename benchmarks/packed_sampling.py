@@ -0,0 +1,54 @@
+"""
+Benchmark of the packed frame sampling against the per-field sampling of the motion loader.
+
+USAGE:
+    python benchmarks/packed_sampling.py [--file MOTION_FILE] [--device cpu] [--num-samples 4096 65536]
+"""
+
+import argparse
+import os
+import sys
+
+import torch
+import torch.utils.benchmark as benchmark
+
+# import the motion loader without the task package (which requires Isaac Lab)
+MOTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "amp_task", "motions")
+sys.path.insert(0, MOTIONS_DIR)
+from motion_loader import MotionLoader  # noqa: E402
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", type=str, default=os.path.join(MOTIONS_DIR, "g1_walk.npz"), help="Motion file")
+    parser.add_argument("--device", type=str, default="cpu", help="Device to load the motion to")
+    parser.add_argument(
+        "--num-samples", type=int, nargs="+", default=[4096, 8192, 16384, 32768, 65536], help="Sample counts"
+    )
+    parser.add_argument("--no-compile", action="store_true", default=False, help="Don't compile the packed kernel")
+    parser.add_argument("--min-run-time", type=float, default=1.0, help="Minimum run time per measurement (sec)")
+    args = parser.parse_args()
+
+    unpacked = MotionLoader(args.file, args.device, verbose=False)
+    packed = MotionLoader(args.file, args.device, verbose=False)
+    packed.pack_frames(compile=not args.no_compile)
+
+    print(f"Motion: {args.file} ({unpacked.num_frames} frames, device: {args.device})")
+    print(f"{'samples':>8} | {'sample (ms)':>12} | {'sample_packed (ms)':>18} | {'speedup':>7} | {'max abs error':>13}")
+    for num_samples in args.num_samples:
+        times = unpacked.sample_times(num_samples)
+        # check that both layouts produce the same motion data (and warm up the compiled kernel)
+        error = max(
+            (a - b).abs().max().item()
+            for a, b in zip(unpacked.sample(num_samples, times=times), packed.sample_packed(num_samples, times=times))
+        )
+        results = []
+        for loader, method in [(unpacked, "sample"), (packed, "sample_packed")]:
+            timer = benchmark.Timer(
+                stmt=f"loader.{method}(num_samples, times=times)",
+                globals={"loader": loader, "num_samples": num_samples, "times": times},
+            )
+            results.append(timer.blocked_autorange(min_run_time=args.min_run_time).median * 1e3)
+        print(
+            f"{num_samples:>8} | {results[0]:>12.3f} | {results[1]:>18.3f} | {results[0] / results[1]:>6.2f}x |"
+            f" {error:>13.2e}"
+        )
@@ -0,0 +1,115 @@
+"""
+Wall time per rollout step (and per mini-batch update) of the policy and value models: separate networks against
+stacked networks (one batched GEMM per layer) and a shared trunk (see ``get_policy_value_models`` in
+``scripts/models/amp.py``).
+
+A rollout step evaluates the models as the AMP agent does: the policy on the states (``act``), and the value on the
+states and on the next states (``record_transition``), all preprocessed by the agent's state preprocessor
+(``MemoizedRunningStandardScaler``). With the stacked and shared networks, the value of the states is computed with
+the actions, both during the rollout and the update.
+
+USAGE:
+    python benchmarks/policy_value_networks.py [--device cuda] [--num-envs 4096]
+
+REQUIREMENTS:
+    - skrl
+"""
+
+import argparse
+import os
+import sys
+
+import gymnasium
+import numpy as np
+import torch
+import torch.nn.functional as F
+import torch.utils.benchmark as benchmark
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts"))
+from models.amp import MemoizedRunningStandardScaler, get_policy_value_models  # noqa: E402
+
+NUM_OBSERVATIONS = 130  # policy observations (AMP observation and last actions)
+NUM_ACTIONS = 29
+
+
+def rollout_step(policy, value, scaler, states: torch.Tensor, next_states: torch.Tensor) -> tuple[torch.Tensor]:
+    """Mean actions, values and next values."""
+    with torch.no_grad():
+        _, _, outputs = policy.act({"states": scaler(states)}, role="policy")
+        values, _, _ = value.act({"states": scaler(states)}, role="value")
+        next_values, _, _ = value.act({"states": scaler(next_states)}, role="value")
+    return outputs["mean_actions"], values, next_values
+
+
+def update_step(policy, value, optimizer, states: torch.Tensor, actions: torch.Tensor, returns: torch.Tensor) -> None:
+    _, log_prob, _ = policy.act({"states": states, "taken_actions": actions}, role="policy")
+    values, _, _ = value.act({"states": states}, role="value")
+    loss = -log_prob.mean() + F.mse_loss(returns, values)
+    optimizer.zero_grad()
+    loss.backward()
+    optimizer.step()
+
+
+def copy_separate_weights(separate: tuple, batched_policy) -> None:
+    """Copy the weights of the separate policy and value networks into the stacked networks."""
+    net = batched_policy.net
+    with torch.no_grad():
+        linears = [[m for m in model.net if isinstance(m, torch.nn.Linear)] for model in separate]
+        for i, (weight, bias) in enumerate(zip(net.weights, net.biases)):
+            for j in range(2):
+                weight[j].copy_(linears[j][i].weight.T)
+                bias[j, 0].copy_(linears[j][i].bias)
+        net.policy_head.load_state_dict(linears[0][-1].state_dict())
+        net.value_head.load_state_dict(linears[1][-1].state_dict())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--num-envs", type=int, default=4096, help="Number of environments (rollout batch size)")
+    parser.add_argument("--mini-batch-size", type=int, default=32768, help="Update mini-batch size")
+    parser.add_argument("--autocast-bf16", action="store_true", help="Evaluate the models in bfloat16 autocast")
+    args = parser.parse_args()
+
+    device = args.device
+    observation_space = gymnasium.spaces.Box(low=-np.inf, high=np.inf, shape=(NUM_OBSERVATIONS,))
+    action_space = gymnasium.spaces.Box(low=-1, high=1, shape=(NUM_ACTIONS,))
+    scaler = MemoizedRunningStandardScaler(size=observation_space, device=device)
+    scaler(torch.randn(args.num_envs, NUM_OBSERVATIONS, device=device), train=True)
+    states = torch.randn(args.num_envs, NUM_OBSERVATIONS, device=device)
+    next_states = torch.randn(args.num_envs, NUM_OBSERVATIONS, device=device)
+    batch_states = torch.randn(args.mini_batch_size, NUM_OBSERVATIONS, device=device)
+    batch_actions = torch.rand(args.mini_batch_size, NUM_ACTIONS, device=device) * 2 - 1
+    batch_returns = torch.randn(args.mini_batch_size, 1, device=device)
+
+    print(f"Device: {device}, envs: {args.num_envs}, mini-batch: {args.mini_batch_size}, bf16: {args.autocast_bf16}")
+    print(f"{'networks':>9} | {'rollout step (ms)':>17} | {'update step (ms)':>16} | {'max abs difference':>18}")
+    separate = None
+    for networks in ["separate", "stacked", "shared"]:
+        torch.manual_seed(0)
+        policy, value = get_policy_value_models(
+            observation_space, action_space, device, networks=networks, autocast_bf16=args.autocast_bf16
+        )
+        policy.to(device)
+        value.to(device)
+        # the stacked networks compute the same outputs as the separate networks with the same weights
+        difference = float("nan")
+        if networks == "separate":
+            separate = (policy, value)
+        elif networks == "stacked":
+            copy_separate_weights(separate, policy)
+            reference = rollout_step(*separate, scaler, states, next_states)
+            outputs = rollout_step(policy, value, scaler, states, next_states)
+            difference = max((output - expected).abs().max().item() for output, expected in zip(outputs, reference))
+
+        parameters = list(policy.parameters()) + list(value.parameters())
+        optimizer = torch.optim.Adam([p for p in parameters if p.requires_grad], lr=5e-5)
+        timings = []
+        for stmt in [
+            "rollout_step(policy, value, scaler, states, next_states)",
+            "update_step(policy, value, optimizer, batch_states, batch_actions, batch_returns)",
+        ]:
+            timer = benchmark.Timer(stmt=stmt, globals={**globals(), "policy": policy, "value": value})
+            timings.append(timer.blocked_autorange(min_run_time=1.0).median * 1e3)
+        print(f"{networks:>9} | {timings[0]:>17.3f} | {timings[1]:>16.3f} | {difference:>18.2e}")
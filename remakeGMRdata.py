@@ -8,12 +8,18 @@ This script converts humanoid motion data from GMR pkl format to NPZ format suit
 Isaac Lab's Adversarial Motion Prior (AMP) training 
 
 USAGE:
-    python data_convert.py
+    # convert PKL_FILE_PATH to OUT_NPZ_PATH
+    python remakeGMRdata.py
+    # convert files, directories or glob patterns in parallel (only the new or modified inputs)
+    python remakeGMRdata.py --input gmr_output/ "lafan/*.pkl" --output-dir motions/ [--num-workers 8] [--force]
+    # bound the memory usage for very long captures (frames processed at once, the output doesn't depend on it)
+    python remakeGMRdata.py --window-size 1024
+    # check the batched velocity estimation against the scalar reference implementation
+    python remakeGMRdata.py --check
 
 INPUT:
     - pkl file containing motion capture data from GMR
-    - URDF file defining the robot model
-    - Mesh directory containing 3D models
+    - URDF file defining the robot model (kinematics only, meshes are not needed)
     
 OUTPUT:
     - NPZ file containing:
@@ -29,34 +35,168 @@ OUTPUT:
         
 REQUIREMENTS:
     - numpy
-    - pandas
     - scipy
-    - pinocchio
+    - torch (forward kinematics, see amp_task/motions/motion_kinematics.py)
 
 
 Thanks to https://github.com/linden713/humanoid_amp for reference.
 """
+import argparse
+import concurrent.futures
+import functools
+import glob
+import hashlib
+import json
+import os
 import pickle
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
 import numpy as np
-import pandas as pd
 from scipy.ndimage import gaussian_filter1d
 from scipy.interpolate import interp1d
 from scipy.spatial.transform import Rotation as R, Slerp
-import pinocchio as pin
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "amp_task", "motions"))
+from motion_kinematics import URDFKinematics  # noqa: E402
 
 # Path of your GMR output pkl file
 PKL_FILE_PATH = "XXX.pkl"
 FPS_NEW = 60  # Desired new sampling rate
-# URDF and Mesh paths, download from https://huggingface.co/datasets/lvhaidong/LAFAN1_Retargeting_Dataset
-URDF_PATH = "robot/robot_description/g1/g1_29dof_rev_1_0.urdf"
-MESH_DIR = "robot/robot_description/g1"
+# URDF path (the bundled G1 29 DOF model, as in https://huggingface.co/datasets/lvhaidong/LAFAN1_Retargeting_Dataset)
+URDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "amp_task", "usd", "g1_29dof_rev_1_0.urdf")
 # Output NPZ file path
 OUT_NPZ_PATH = "g1_dance.npz"
 
+# Joint names (order of the GMR dof_pos columns)
+JOINT_NAMES = [
+    "left_hip_pitch_joint",
+    "left_hip_roll_joint",
+    "left_hip_yaw_joint",
+    "left_knee_joint",
+    "left_ankle_pitch_joint",
+    "left_ankle_roll_joint",
+    "right_hip_pitch_joint",
+    "right_hip_roll_joint",
+    "right_hip_yaw_joint",
+    "right_knee_joint",
+    "right_ankle_pitch_joint",
+    "right_ankle_roll_joint",
+    "waist_yaw_joint",
+    "waist_roll_joint",
+    "waist_pitch_joint",
+    "left_shoulder_pitch_joint",
+    "left_shoulder_roll_joint",
+    "left_shoulder_yaw_joint",
+    "left_elbow_joint",
+    "left_wrist_roll_joint",
+    "left_wrist_pitch_joint",
+    "left_wrist_yaw_joint",
+    "right_shoulder_pitch_joint",
+    "right_shoulder_roll_joint",
+    "right_shoulder_yaw_joint",
+    "right_elbow_joint",
+    "right_wrist_roll_joint",
+    "right_wrist_pitch_joint",
+    "right_wrist_yaw_joint"
+]
+
+# Link names to record (poses in global coordinate frame)
+BODY_NAMES = [
+    "pelvis", 
+    # "head_link",
+    "left_shoulder_pitch_link",
+    "right_shoulder_pitch_link",
+    "left_elbow_link",
+    "right_elbow_link",
+    "right_hip_yaw_link",
+    "left_hip_yaw_link",
+    "right_rubber_hand",
+    "left_rubber_hand",
+    "right_ankle_roll_link",
+    "left_ankle_roll_link"
+]
+
+# Number of new frames processed at once (bounds the conversion memory, the result doesn't depend on it)
+WINDOW_SIZE = 4096
+# Gaussian smoothing (sigma = 1 frame) truncated at 4 sigmas: the smoothed velocities depend on 4 frames on each
+# side, and the velocities (finite differences) on 1 frame: windows are extended by WINDOW_MARGIN frames
+GAUSSIAN_TRUNCATE = 4.0
+WINDOW_MARGIN = int(GAUSSIAN_TRUNCATE + 0.5) + 1
+
+# Version of the conversion: increment it when the output changes, to reconvert the batch outputs (see --input)
+CONVERTER_VERSION = 2
+# Conversion manifest (input file states and hashes of the batch outputs), in the output directory
+MANIFEST_FILE = "conversion_manifest.json"
+MANIFEST_VERSION = 2
+
 # -----------------------------------------------
-# 1. Quaternion Helper Functions
+# 1. Quaternion Helper Functions (batched: arrays of shape (..., 4))
 # -----------------------------------------------
 def quaternion_inverse(q):
+    """Input q: (..., 4) quaternions (w, x, y, z), returns their inverses."""
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    norm_sq = np.maximum(w*w + x*x + y*y + z*z, 1e-8).astype(q.dtype)
+    return np.stack([w, -x, -y, -z], axis=-1) / norm_sq[..., None]
+
+def quaternion_multiply(q1, q2):
+    """Input/output: (..., 4) quaternions (w, x, y, z)"""
+    w1, x1, y1, z1 = np.moveaxis(q1, -1, 0)
+    w2, x2, y2, z2 = np.moveaxis(q2, -1, 0)
+    w = w1*w2 - x1*x2 - y1*y2 - z1*z2
+    x = w1*x2 + x1*w2 + y1*z2 - z1*y2
+    y = w1*y2 - x1*z2 + y1*w2 + z1*x2
+    z = w1*z2 + x1*y2 - y1*x2 + z1*w2
+    return np.stack([w, x, y, z], axis=-1).astype(q1.dtype)
+
+def compute_angular_velocity(q_prev, q_next, dt, eps=1e-8):
+    """
+    Compute angular velocities from adjacent quaternions (..., 4) (w, x, y, z):
+      - Relative rotation q_rel = inv(q_prev) * q_next
+      - Extract rotation angle and axis from q_rel
+      - Return (angle / dt) * axis (zero for degenerate relative rotations)
+    """
+    q_rel = quaternion_multiply(quaternion_inverse(q_prev), q_next)
+    norm_q_rel = np.linalg.norm(q_rel, axis=-1, keepdims=True)
+    valid = norm_q_rel >= eps
+    q_rel = q_rel / np.where(valid, norm_q_rel, 1)
+
+    w = np.clip(q_rel[..., :1], -1.0, 1.0)
+    angle = 2.0 * np.arccos(w)
+    sin_half = np.sqrt(1.0 - w*w)
+    valid &= sin_half >= eps
+    axis = q_rel[..., 1:] / np.where(valid, sin_half, 1)
+    return np.where(valid, (angle / dt) * axis, 0).astype(np.float32)
+
+def compute_angular_velocities(quats, dt, eps=1e-8):
+    """
+    Angular velocities (N, ..., 3) of a quaternion sequence (N, ..., 4) (w, x, y, z):
+    mean of the velocities from the previous and to the next frame (one-sided at the boundaries).
+    """
+    angular_vels = np.zeros(quats.shape[:-1] + (3,), dtype=np.float32)
+    if quats.shape[0] > 1:
+        # velocity between each pair of adjacent frames, computed once
+        pair_vels = compute_angular_velocity(quats[:-1], quats[1:], dt, eps)
+        angular_vels[0] = pair_vels[0]
+        angular_vels[-1] = pair_vels[-1]
+        angular_vels[1:-1] = 0.5 * (pair_vels[:-1] + pair_vels[1:])
+    return angular_vels
+
+def finite_difference(x, dt):
+    """Time derivative along the first axis: central differences, forward/backward differences at the boundaries."""
+    dx = np.zeros_like(x)
+    dx[1:-1] = (x[2:] - x[:-2]) / (2 * dt)
+    dx[0] = (x[1] - x[0]) / dt
+    dx[-1] = (x[-1] - x[-2]) / dt
+    return dx
+
+
+# -----------------------------------------------
+# 1.1 Scalar Reference Implementation (for the equivalence check, see --check)
+# -----------------------------------------------
+def quaternion_inverse_scalar(q):
     """Input q: (w, x, y, z), returns its inverse."""
     w, x, y, z = q
     norm_sq = w*w + x*x + y*y + z*z
@@ -64,7 +204,7 @@ def quaternion_inverse(q):
         norm_sq = 1e-8
     return np.array([w, -x, -y, -z], dtype=q.dtype) / norm_sq
 
-def quaternion_multiply(q1, q2):
+def quaternion_multiply_scalar(q1, q2):
     """Input/output: (w, x, y, z)"""
     w1, x1, y1, z1 = q1
     w2, x2, y2, z2 = q2
@@ -74,15 +214,10 @@ def quaternion_multiply(q1, q2):
     z = w1*z2 + x1*y2 - y1*x2 + z1*w2
     return np.array([w, x, y, z], dtype=q1.dtype)
 
-def compute_angular_velocity(q_prev, q_next, dt, eps=1e-8):
-    """
-    Compute angular velocity from adjacent quaternions (w, x, y, z):
-      - Relative rotation q_rel = inv(q_prev) * q_next
-      - Extract rotation angle and axis from q_rel
-      - Return (angle / dt) * axis
-    """
-    q_inv = quaternion_inverse(q_prev)
-    q_rel = quaternion_multiply(q_inv, q_next)
+def compute_angular_velocity_scalar(q_prev, q_next, dt, eps=1e-8):
+    """Angular velocity from two adjacent quaternions (w, x, y, z)."""
+    q_inv = quaternion_inverse_scalar(q_prev)
+    q_rel = quaternion_multiply_scalar(q_inv, q_next)
     norm_q_rel = np.linalg.norm(q_rel)
     if norm_q_rel < eps:
         return np.zeros(3, dtype=np.float32)
@@ -96,39 +231,100 @@ def compute_angular_velocity(q_prev, q_next, dt, eps=1e-8):
     axis = q_rel[1:] / sin_half
     return (angle / dt) * axis
 
+def compute_body_angular_velocities_scalar(body_rotations, dt):
+    """Smoothed body angular velocities (N, B, 3), computed frame by frame and body by body."""
+    N, B = body_rotations.shape[:2]
+    body_angular_velocities = np.zeros((N, B, 3), dtype=np.float32)
+    for j in range(B):
+        quats = body_rotations[:, j, :]
+        angular_vels = np.zeros((N, 3), dtype=np.float32)
+        if N > 1:
+            angular_vels[0] = compute_angular_velocity_scalar(quats[0], quats[1], dt)
+            angular_vels[-1] = compute_angular_velocity_scalar(quats[-2], quats[-1], dt)
+        for k in range(1, N - 1):
+            av1 = compute_angular_velocity_scalar(quats[k - 1], quats[k], dt)
+            av2 = compute_angular_velocity_scalar(quats[k], quats[k + 1], dt)
+            angular_vels[k] = 0.5 * (av1 + av2)
+        # Smoothing
+        body_angular_velocities[:, j, :] = gaussian_filter1d(angular_vels, sigma=1, axis=0)
+    return body_angular_velocities
+
+def check_equivalence(num_frames=2000, num_bodies=11, fps=60, tolerance=1e-4, flip_tolerance=1e-2, seed=0):
+    """
+    Compare the batched angular velocities with the scalar reference implementation, on random-walk
+    rotations (float32, as the FK output) with repeated frames, then with quaternion sign flips.
+
+    Sign flips give relative rotations of ~2*pi (w ~ -1), where the axis extraction is ill-conditioned in float32:
+    both implementations are only compared up to a tolerance relative to the velocity norm there.
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / fps
+    # random walk of rotation vectors (up to ~3 rad/s), with some repeated frames
+    steps = rng.normal(scale=3.0 * dt, size=(num_frames, num_bodies, 3))
+    steps[rng.random(num_frames) < 0.05] = 0.0
+    rotations = R.from_rotvec(np.cumsum(steps, axis=0).reshape(-1, 3))
+    quats = np.roll(rotations.as_quat(), 1, axis=-1).reshape(num_frames, num_bodies, 4)  # (w, x, y, z)
+    flips = rng.random((num_frames, num_bodies, 1)) < 0.02
+
+    for name, body_rotations, rtol in [
+        ("continuous", quats.astype(np.float32), 0.0),
+        ("sign flips", np.where(flips, -quats, quats).astype(np.float32), flip_tolerance),
+    ]:
+        start = time.perf_counter()
+        expected = compute_body_angular_velocities_scalar(body_rotations, dt)
+        scalar_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = gaussian_filter1d(compute_angular_velocities(body_rotations, dt), sigma=1, axis=0)
+        batched_time = time.perf_counter() - start
+
+        assert result.dtype == expected.dtype and result.shape == expected.shape
+        error = np.abs(result - expected)
+        print(f"Angular velocities, {name} ({num_frames} frames, {num_bodies} bodies):"
+              f" max abs difference {error.max():.3e}, scalar: {scalar_time * 1e3:.1f} ms,"
+              f" batched: {batched_time * 1e3:.1f} ms ({scalar_time / batched_time:.0f}x)")
+        assert np.all(error <= tolerance + rtol * np.linalg.norm(expected, axis=-1, keepdims=True)), \
+            f"The batched angular velocities ({name}) differ from the scalar implementation"
+    print("The batched and scalar implementations are equivalent")
+
 
 # -----------------------------------------------
-# 2. Helper Function to Build Pinocchio RobotWrapper
+# 2. Helper Function to Build the Forward Kinematics
 # -----------------------------------------------
-def build_pin_robot(urdf_path, mesh_dir):
+@functools.lru_cache(maxsize=None)
+def build_kinematics(urdf_path, device="cpu"):
     """
-    Load URDF file and construct a pin.RobotWrapper with free-flyer.
+    Parse the URDF file (once per process) into a batched forward kinematics engine (floating base).
     Args:
         urdf_path: Path to the URDF file
-        mesh_dir: Directory containing associated mesh files
+        device: Device to compute the kinematics on
     Returns:
-        robot (pin.RobotWrapper)
+        kinematics (URDFKinematics) of the BODY_NAMES links
     """
-    # Note: If URDF already contains floating joint, you can modify this to use BuildFromURDF(urdf_path, ...)
-    robot = pin.RobotWrapper.BuildFromURDF(
-        urdf_path,
-        mesh_dir,
-        pin.JointModelFreeFlyer()
-    )
-    return robot
+    return URDFKinematics(urdf_path, body_names=BODY_NAMES, device=device)
 
 
 # -----------------------------------------------
 # 3. Main Conversion Pipeline
 # -----------------------------------------------
-def main():
-    # 3.1 Read Pkl data
-    pkl_file = PKL_FILE_PATH
+def convert(pkl_file, out_npz_path, device="cpu", verbose=True, window_size=WINDOW_SIZE):
+    """
+    Convert a GMR pkl file to an NPZ motion file (forward kinematics computed on the given device).
+
+    The motion is processed in windows of ``window_size`` output frames, extended by WINDOW_MARGIN frames on
+    each side so that the finite differences and the Gaussian smoothing are exact at the window borders (the result
+    doesn't depend on the window size). Each window is written to temporary memory-mapped .npy files, which are then
+    streamed into the NPZ file: the peak memory depends on the window size, not on the clip length.
+    The NPZ file is written atomically (to a temporary file in the output directory, then renamed).
+    Returns:
+        Number of frames of the converted motion
+    """
+    # 3.1 Read Pkl data (the source arrays are compact, the windows are sliced from them)
     with open(pkl_file, 'rb') as f:
         data = pickle.load(f)
 
     N_orig = data['dof_pos'].shape[0]
-    print(f"Loading pkl_file: {pkl_file}, total {N_orig} frames.")
+    if verbose:
+        print(f"Loading pkl_file: {pkl_file}, total {N_orig} frames.")
 
     root_data_orig = np.concatenate([data['root_pos'], data['root_rot']], axis=-1)
     joint_data_orig = data['dof_pos']
@@ -143,189 +339,339 @@ def main():
     N_new = 2 * N_orig - 1   # Insert one new frame between every two frames
     t_new = np.linspace(0, (N_orig - 1) * dt_orig, N_new)
 
-    # 3.3 Interpolate root_data positions and joint angles
+    # Update frame count, sampling rate, and time interval
+    N = N_new
+    fps = fps_new
+    dt = dt_new
+
+    # 3.3 Define joint names (see JOINT_NAMES) and link names to record (see BODY_NAMES)
+    dof_names = np.array(JOINT_NAMES, dtype=np.str_)
+    body_names = np.array(BODY_NAMES, dtype=np.str_)
+    D, B = joint_data_orig.shape[1], len(body_names)
+
+    # 3.4 Build the forward kinematics of the URDF
+    kinematics = build_kinematics(URDF_PATH, device)
+    for name in JOINT_NAMES:
+        assert name in kinematics.joint_names, f"{pkl_file}: joint not found in the URDF file: {name}"
+    if len(JOINT_NAMES) != D or len(kinematics.joint_names) != D:
+        print(f"[WARNING] {pkl_file}: {D} joint columns, but {len(JOINT_NAMES)} joint names and"
+              f" {len(kinematics.joint_names)} URDF joints, may need to check or adjust script parsing.")
+
+    # 3.5 Output arrays: temporary .npy files (memory-mapped), next to the output file
+    directory = os.path.dirname(os.path.abspath(out_npz_path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=directory, suffix=".tmp") as tmp_dir:
+        npy_files, outputs = {}, {}
+
+        # 3.6 Process the windows [start, stop), extended to [s, e)
+        for start in range(0, N, window_size):
+            stop = min(start + window_size, N)
+            s, e = max(start - WINDOW_MARGIN, 0), min(stop + WINDOW_MARGIN, N)
+            window = convert_window(root_data_orig, joint_data_orig, t_orig, t_new[s:e], kinematics, dt)
+            for name, array in window.items():
+                if name not in outputs:
+                    npy_files[name] = os.path.join(tmp_dir, f"{name}.npy")
+                    outputs[name] = np.lib.format.open_memmap(npy_files[name], mode="w+", dtype=array.dtype,
+                                                              shape=(N,) + array.shape[1:])
+                outputs[name][start:stop] = array[start - s:stop - s]
+        shapes = {name: array.shape for name, array in outputs.items()}
+        for array in outputs.values():
+            array.flush()
+        del outputs
+
+        # 3.7 Package and save to NPZ
+        data_dict = {
+            "fps": fps,                                   # int64 scalar, sampling rate
+            "dof_names": dof_names,                       # unicode array (D,)
+            "body_names": body_names,                     # unicode array (B,)
+            **npy_files,                                  # per-frame arrays (see convert_window)
+        }
+        write_npz_atomic(out_npz_path, data_dict)
+
+    if verbose:
+        print(f"Conversion completed, data saved to {out_npz_path}")
+        print("fps:", fps)
+        print("dof_names:", dof_names.shape)
+        print("body_names:", body_names.shape)
+        for name, shape in shapes.items():
+            print(f"{name}:", shape)
+    return N
+
+
+def convert_window(root_data_orig, joint_data_orig, t_orig, t_window, kinematics, dt):
+    """
+    Interpolate, compute the forward kinematics and the (smoothed) velocities of a window of new frames.
+    Only the window frames at least WINDOW_MARGIN frames away from its borders are exact
+    (except at the borders of the motion).
+    Returns:
+        Per-frame arrays of the window, by NPZ key
+    """
+    # original frames covering the window, with one more frame on each side, so that the interpolation intervals
+    # (chosen by searchsorted) are the same as with all the frames
+    i0 = max(np.searchsorted(t_orig, t_window[0]) - 1, 0)
+    i1 = min(np.searchsorted(t_orig, t_window[-1]) + 2, len(t_orig))
+    t_orig = t_orig[i0:i1]
+    root_data_orig = root_data_orig[i0:i1]
+    joint_data_orig = joint_data_orig[i0:i1]
+
+    # Interpolate root_data positions and joint angles
     # Linear interpolation for positions (first three columns)
-    root_pos_interp = interp1d(t_orig, root_data_orig[:, 0:3], axis=0, kind='linear')(t_new)
+    root_pos_interp = interp1d(t_orig, root_data_orig[:, 0:3], axis=0, kind='linear')(t_window)
 
     # Slerp interpolation for quaternions (qx, qy, qz, qw)
     # Note: Quaternions in CSV are stored as (qx, qy, qz, qw), which matches scipy requirements
     rotations_orig = R.from_quat(root_data_orig[:, 3:7])
     slerp = Slerp(t_orig, rotations_orig)
-    rotations_new = slerp(t_new)
-    root_quat_interp = rotations_new.as_quat()  # (N_new, 4) still (qx, qy, qz, qw)
+    rotations_new = slerp(t_window)
+    root_quat_interp = rotations_new.as_quat()  # (n, 4) still (qx, qy, qz, qw)
 
     # Combine interpolated root data
-    root_data = np.hstack((root_pos_interp, root_quat_interp))  # (N_new, 7)
+    root_data = np.hstack((root_pos_interp, root_quat_interp))  # (n, 7)
 
     # Linear interpolation for joint angles (joint_data)
-    joint_data = interp1d(t_orig, joint_data_orig, axis=0, kind='linear')(t_new)
+    joint_data = interp1d(t_orig, joint_data_orig, axis=0, kind='linear')(t_window)
 
-    # Update frame count, sampling rate, and time interval
-    N = N_new
-    fps = fps_new
-    dt = dt_new
+    # Get joint positions (excluding Root)
+    dof_positions = joint_data.copy()      # shape: (n, D)
+
+    # Calculate joint velocities (central differences + boundary forward/backward differences + Gaussian smoothing)
+    dof_velocities = finite_difference(dof_positions, dt)
+    dof_velocities_smoothed = gaussian_filter1d(dof_velocities, sigma=1, axis=0, truncate=GAUSSIAN_TRUNCATE)
 
-    # 3.4 Define joint names 
-    joint_names = [
-        "left_hip_pitch_joint",
-        "left_hip_roll_joint",
-        "left_hip_yaw_joint",
-        "left_knee_joint",
-        "left_ankle_pitch_joint",
-        "left_ankle_roll_joint",
-        "right_hip_pitch_joint",
-        "right_hip_roll_joint",
-        "right_hip_yaw_joint",
-        "right_knee_joint",
-        "right_ankle_pitch_joint",
-        "right_ankle_roll_joint",
-        "waist_yaw_joint",
-        "waist_roll_joint",
-        "waist_pitch_joint",
-        "left_shoulder_pitch_joint",
-        "left_shoulder_roll_joint",
-        "left_shoulder_yaw_joint",
-        "left_elbow_joint",
-        "left_wrist_roll_joint",
-        "left_wrist_pitch_joint",
-        "left_wrist_yaw_joint",
-        "right_shoulder_pitch_joint",
-        "right_shoulder_roll_joint",
-        "right_shoulder_yaw_joint",
-        "right_elbow_joint",
-        "right_wrist_roll_joint",
-        "right_wrist_pitch_joint",
-        "right_wrist_yaw_joint"
-    ]
-    dof_names = np.array(joint_names, dtype=np.str_)
-
-    # 3.5 Get joint positions (excluding Root)
-    dof_positions = joint_data.copy()      # shape: (N, D)
-
-    # 3.6 Calculate joint velocities (central differences + boundary forward/backward differences + Gaussian smoothing)
-    dof_velocities = np.zeros_like(dof_positions)
-    dof_velocities[1:-1] = (dof_positions[2:] - dof_positions[:-2]) / (2 * dt)
-    dof_velocities[0] = (dof_positions[1] - dof_positions[0]) / dt
-    dof_velocities[-1] = (dof_positions[-1] - dof_positions[-2]) / dt
-    dof_velocities_smoothed = gaussian_filter1d(dof_velocities, sigma=1, axis=0)
-
-    # 3.7 Specify link names to record and get their poses in global coordinate frame
-    body_names = [
-        "pelvis", 
-        # "head_link",
-        "left_shoulder_pitch_link",
-        "right_shoulder_pitch_link",
-        "left_elbow_link",
-        "right_elbow_link",
-        "right_hip_yaw_link",
-        "left_hip_yaw_link",
-        "right_rubber_hand",
-        "left_rubber_hand",
-        "right_ankle_roll_link",
-        "left_ankle_roll_link"
-    ]
-
-
-
-    body_names = np.array(body_names, dtype=np.str_)
-    B = len(body_names)
-
-    body_positions = np.zeros((N, B, 3), dtype=np.float32)
-    body_rotations = np.zeros((N, B, 4), dtype=np.float32)
-
-    # 3.8 Build pin.RobotWrapper
-    #    (Please change urdf_path and mesh_dir to your actual paths)
-    urdf_path = URDF_PATH
-    mesh_dir = MESH_DIR
-    robot = build_pin_robot(urdf_path, mesh_dir)
-    model = robot.model
-    data_pk = robot.data
-
-    nq = model.nq  # Total DOF (including free-flyer)
-    if (7 + joint_data.shape[1]) != nq:
-        print(f"Warning: CSV columns={7 + joint_data.shape[1]}, but pinocchio nq={nq}, may need to check or adjust script parsing.")
-
-    # 3.9 Perform forward kinematics (FK) for each frame to get link poses in world coordinate frame
-    q_pin = pin.neutral(model)
-
-    for i in range(N):
-        # Set free-flyer
-        q_pin[0:3] = root_data[i, 0:3]
-        # Quaternions stored in root_data are in (qx, qy, qz, qw) order
-        q_pin[3:7] = root_data[i, 3:7]
-        # Other joints
-        dofD = joint_data.shape[1]
-        q_pin[7:7 + dofD] = joint_data[i, :]
-
-        # Forward kinematics
-        pin.forwardKinematics(model, data_pk, q_pin)
-        pin.updateFramePlacements(model, data_pk)
-
-        # Read and save global poses for each link
-        for j, link_name in enumerate(body_names):
-            fid = model.getFrameId(link_name)
-            link_tf = data_pk.oMf[fid]  # Link transformation in world frame
-
-            # Translation
-            body_positions[i, j, :] = link_tf.translation
-            # Rotation (pin.Quaternion defaults to (x,y,z,w), need to convert to (w,x,y,z))
-            quat_xyzw = pin.Quaternion(link_tf.rotation)
-            body_rotations[i, j, :] = np.array([quat_xyzw.w,
-                                                quat_xyzw.x,
-                                                quat_xyzw.y,
-                                                quat_xyzw.z],
-                                               dtype=np.float32)
-
-    # 3.10 Calculate body linear and angular velocities (in world coordinate frame)
+    # Perform forward kinematics (FK) for all frames at once to get link poses in world coordinate frame
+    # Quaternions stored in root_data are in (qx, qy, qz, qw) order, the kinematics use (w, x, y, z)
+    positions, rotations = kinematics.forward(root_data[:, 0:3], np.roll(root_data[:, 3:7], 1, axis=-1),
+                                              joint_data, dof_names=JOINT_NAMES)
+    body_positions = positions.cpu().numpy().astype(np.float32)   # (n, B, 3)
+    body_rotations = rotations.cpu().numpy().astype(np.float32)   # (n, B, 4) (w,x,y,z)
+
+    # Calculate body linear and angular velocities (in world coordinate frame)
     # -- Linear velocities: central differences --
-    body_linear_velocities = np.zeros_like(body_positions)
-    body_linear_velocities[1:-1] = (body_positions[2:] - body_positions[:-2]) / (2 * dt)
-    body_linear_velocities[0] = (body_positions[1] - body_positions[0]) / dt
-    body_linear_velocities[-1] = (body_positions[-1] - body_positions[-2]) / dt
-    body_linear_velocities = gaussian_filter1d(body_linear_velocities, sigma=1, axis=0)
+    body_linear_velocities = finite_difference(body_positions, dt)
+    body_linear_velocities = gaussian_filter1d(body_linear_velocities, sigma=1, axis=0, truncate=GAUSSIAN_TRUNCATE)
+
+    # -- Angular velocities: computed from adjacent quaternions (in world coordinate frame), all bodies at once --
+    body_angular_velocities = compute_angular_velocities(body_rotations, dt)
+    # Smoothing
+    body_angular_velocities = gaussian_filter1d(body_angular_velocities, sigma=1, axis=0, truncate=GAUSSIAN_TRUNCATE)
+
+    return {
+        "dof_positions": dof_positions,               # float (n, D)
+        "dof_velocities": dof_velocities_smoothed,    # float (n, D)
+        "body_positions": body_positions,             # float32 (n, B, 3)
+        "body_rotations": body_rotations,             # float32 (n, B, 4) (w,x,y,z)
+        "body_linear_velocities": body_linear_velocities,     # float32 (n, B, 3)
+        "body_angular_velocities": body_angular_velocities    # float32 (n, B, 3)
+    }
 
-    # -- Angular velocities: computed from adjacent quaternions (in world coordinate frame) --
-    body_angular_velocities = np.zeros((N, B, 3), dtype=np.float32)
-    for j in range(B):
-        quats = body_rotations[:, j, :]
-        angular_vels = np.zeros((N, 3), dtype=np.float32)
-        if N > 1:
-            angular_vels[0] = compute_angular_velocity(quats[0], quats[1], dt)
-            angular_vels[-1] = compute_angular_velocity(quats[-2], quats[-1], dt)
-        for k in range(1, N - 1):
-            av1 = compute_angular_velocity(quats[k - 1], quats[k], dt)
-            av2 = compute_angular_velocity(quats[k], quats[k + 1], dt)
-            angular_vels[k] = 0.5 * (av1 + av2)
-        # Smoothing
-        body_angular_velocities[:, j, :] = gaussian_filter1d(angular_vels, sigma=1, axis=0)
 
-    # 3.11 Package and save to NPZ
-    data_dict = {
-        "fps": fps,                                   # int64 scalar, sampling rate
-        "dof_names": dof_names,                       # unicode array (D,)
-        "body_names": body_names,                     # unicode array (B,)
-        "dof_positions": dof_positions,               # float32 (N, D)
-        "dof_velocities": dof_velocities_smoothed,    # float32 (N, D)
-        "body_positions": body_positions,             # float32 (N, B, 3)
-        "body_rotations": body_rotations,             # float32 (N, B, 4) (w,x,y,z)
-        "body_linear_velocities": body_linear_velocities,     # float32 (N, B, 3)
-        "body_angular_velocities": body_angular_velocities    # float32 (N, B, 3)
+def chmod_default(path):
+    """
+    Give a file the default permissions of a new file (0666 minus the umask): mkstemp creates the temporary files
+    of the atomic writes readable by the owner only.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, 0o666 & ~umask)
+
+def write_npz_atomic(path, arrays):
+    """
+    Write an NPZ file (uncompressed, as np.savez) to a temporary file in the same directory, then rename it
+    (no partial outputs). The values are arrays, or paths of .npy files, which are copied by chunks.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npz.tmp")
+    try:
+        with os.fdopen(fd, "wb") as file, zipfile.ZipFile(file, mode="w", compression=zipfile.ZIP_STORED,
+                                                          allowZip64=True) as archive:
+            for name, value in arrays.items():
+                with archive.open(f"{name}.npy", mode="w", force_zip64=True) as member:
+                    if isinstance(value, str):
+                        with open(value, "rb") as npy_file:
+                            shutil.copyfileobj(npy_file, member, length=1 << 24)
+                    else:
+                        np.lib.format.write_array(member, np.asanyarray(value), allow_pickle=False)
+        chmod_default(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# -----------------------------------------------
+# 4. Batch Conversion (parallel and incremental)
+# -----------------------------------------------
+def converter_settings_hash():
+    """Hash of the conversion settings (the outputs of different settings are not up to date)."""
+    settings = {
+        "version": CONVERTER_VERSION,
+        "fps": FPS_NEW,
+        "joint_names": JOINT_NAMES,
+        "body_names": BODY_NAMES,
+        "urdf": file_hash(URDF_PATH) if os.path.isfile(URDF_PATH) else URDF_PATH,
     }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
 
-    out_filename = OUT_NPZ_PATH
-    np.savez(out_filename, **data_dict)
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-    print(f"Conversion completed, data saved to {out_filename}")
-    print("fps:", fps)
-    print("dof_names:", dof_names.shape)
-    print("body_names:", body_names.shape)
-    print("dof_positions:", dof_positions.shape)
-    print("dof_velocities:", dof_velocities_smoothed.shape)
-    print("body_positions:", body_positions.shape)
-    print("body_rotations:", body_rotations.shape)
-    print("body_linear_velocities:", body_linear_velocities.shape)
-    print("body_angular_velocities:", body_angular_velocities.shape)
+def resolve_inputs(inputs, output_dir):
+    """
+    Resolve pkl file paths, directories (searched recursively) and glob patterns into (pkl file, NPZ path) pairs.
+    Files found in a directory keep their relative path in the output directory, other files their name.
+    """
+    pairs = {}
+    for entry in inputs:
+        if os.path.isdir(entry):
+            files = [(path, os.path.relpath(path, entry))
+                     for path in sorted(glob.glob(os.path.join(entry, "**", "*.pkl"), recursive=True))]
+        elif glob.has_magic(entry):
+            files = [(path, os.path.basename(path)) for path in sorted(glob.glob(entry, recursive=True))]
+        else:
+            assert os.path.isfile(entry), f"Invalid file path: {entry}"
+            files = [(entry, os.path.basename(entry))]
+        for path, name in files:
+            out_path = os.path.join(output_dir, os.path.splitext(name)[0] + ".npz")
+            assert pairs.get(out_path, path) == path, f"Several inputs are converted to {out_path}"
+            pairs[out_path] = path
+    return [(path, out_path) for out_path, path in pairs.items()]
+
+def load_manifest(manifest_path):
+    """Conversion manifest: input file state and hashes of each output (relative to the output directory)."""
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest["entries"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+def save_manifest(manifest_path, entries):
+    """Write the conversion manifest (atomically)."""
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": entries}, f, indent=1, sort_keys=True)
+        chmod_default(tmp_path)
+        os.replace(tmp_path, manifest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _convert_job(pkl_file, out_npz_path, device, window_size, known_hash):
+    """
+    Process pool job: hash the input, and convert it unless its content hash is ``known_hash`` (output up to date).
+    Returns the input hash, the number of frames (None if not converted) and the job time.
+    """
+    start = time.perf_counter()
+    input_hash = file_hash(pkl_file)
+    if input_hash == known_hash:
+        return input_hash, None, time.perf_counter() - start
+    num_frames = convert(pkl_file, out_npz_path, device=device, verbose=False, window_size=window_size)
+    return input_hash, num_frames, time.perf_counter() - start
+
+def convert_batch(inputs, output_dir, num_workers=None, force=False, device="cpu", window_size=WINDOW_SIZE):
+    """
+    Convert GMR pkl files in a process pool, skipping the outputs that are up to date.
 
+    An output is up to date if it exists and the manifest (``conversion_manifest.json`` in the output directory)
+    records the same conversion settings and input content. Inputs whose modification time and size match the
+    manifest are skipped without being read; the others are hashed by the pool workers, and only converted if their
+    content hash changed. The manifest is updated after each file, and the outputs are written atomically: an
+    interrupted batch resumes where it stopped.
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    manifest = load_manifest(manifest_path)
+    settings_hash = converter_settings_hash()
+
+    jobs = {}
+    num_skipped = 0
+    for pkl_file, out_path in resolve_inputs(inputs, output_dir):
+        key = os.path.relpath(out_path, output_dir)
+        stat = os.stat(pkl_file)
+        entry = manifest.get(key, {})
+        known_hash = None
+        if not force and os.path.isfile(out_path) and entry.get("settings_hash") == settings_hash:
+            if entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                num_skipped += 1
+                continue
+            known_hash = entry.get("input_hash")
+        jobs[key] = (pkl_file, out_path, stat, known_hash)
+    print(f"[INFO] {len(jobs)} file(s) to check and convert, {num_skipped} up to date (output: {output_dir})")
+
+    num_converted, num_frames, conversion_time, failed = 0, 0, 0.0, []
+    if jobs:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = {executor.submit(_convert_job, pkl_file, out_path, device, window_size, known_hash): key
+                       for key, (pkl_file, out_path, _, known_hash) in jobs.items()}
+            for i, future in enumerate(concurrent.futures.as_completed(futures)):
+                key = futures[future]
+                pkl_file, out_path, stat, _ = jobs[key]
+                try:
+                    input_hash, frames, duration = future.result()
+                except Exception as e:
+                    print(f"[WARNING] Unable to convert {pkl_file}: {e!r}")
+                    failed.append(pkl_file)
+                    continue
+                if frames is None:
+                    # same content (e.g. touched file): only the recorded modification time changes
+                    frames = manifest[key]["num_frames"]
+                    num_skipped += 1
+                    print(f"[{i + 1}/{len(jobs)}] {pkl_file}: unchanged content, {out_path} is up to date")
+                else:
+                    num_converted += 1
+                    num_frames += frames
+                    conversion_time += duration
+                    print(f"[{i + 1}/{len(jobs)}] {pkl_file} -> {out_path} ({frames} frames, {duration:.2f} s)")
+                manifest[key] = {
+                    "source": os.path.abspath(pkl_file),
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "input_hash": input_hash,
+                    "settings_hash": settings_hash,
+                    "num_frames": frames,
+                }
+                save_manifest(manifest_path, manifest)
+
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] Converted {num_converted} file(s) ({num_frames} frames) in {elapsed:.2f} s:"
+          f" {num_converted / elapsed:.2f} files/s, {num_frames / elapsed:.0f} frames/s"
+          f" ({conversion_time / max(num_converted, 1):.2f} s/file per process), {num_skipped} skipped,"
+          f" {len(failed)} failed")
+    return failed
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", type=str, nargs="+", default=None,
+                        help="GMR pkl files, directories (searched recursively) or glob patterns to convert"
+                             " (default: PKL_FILE_PATH to OUT_NPZ_PATH)")
+    parser.add_argument("--output-dir", type=str, default=".", help="Output directory (with --input)")
+    parser.add_argument("--num-workers", type=int, default=None,
+                        help="Number of conversion processes (default: number of CPUs)")
+    parser.add_argument("--device", type=str, default="cpu", help="Device to compute the forward kinematics on")
+    parser.add_argument("--window-size", type=int, default=WINDOW_SIZE,
+                        help="Number of frames processed at once (bounds the memory usage)")
+    parser.add_argument("--force", action="store_true", help="Convert the files even if their output is up to date")
+    parser.add_argument("--check", action="store_true",
+                        help="Check the batched velocity estimation against the scalar reference implementation")
+    args = parser.parse_args()
+    if args.check:
+        check_equivalence()
+    elif args.input:
+        failed = convert_batch(args.input, args.output_dir, args.num_workers, args.force, args.device,
+                               args.window_size)
+        sys.exit(1 if failed else 0)
+    else:
+        convert(PKL_FILE_PATH, OUT_NPZ_PATH, device=args.device, window_size=args.window_size)
@@ -0,0 +1,240 @@
+"""
+Export a trained AMP policy for deployment (TorchScript and ONNX), without skrl nor the training configuration.
+
+The state preprocessor (RunningStandardScaler) is folded into the first linear layer: its clipping becomes an
+element-wise clamp of the raw observations. The log standard deviation and the value networks are dropped: the
+exported policy maps the observations to the (deterministic) mean actions. Each artifact is checked against the
+original agent's models, and its CPU latency at batch size 1 is measured.
+
+USAGE:
+    python scripts/export_policy.py [--checkpoint runs/UnitreeG1_AMP/<experiment>/checkpoints/best_agent.pt]
+
+The artifacts (policy.pt, policy.onnx and policy.json) are written to the ``exported`` folder of the experiment.
+ONNX export and checks require ``onnx`` and ``onnxruntime``.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import gymnasium
+import numpy as np
+import torch
+import torch.nn as nn
+from skrl.resources.preprocessors.torch import RunningStandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from models.amp import get_policy_value_models  # noqa: E402
+
+EXPERIMENT_PATH = "runs/UnitreeG1_AMP/"
+CHECK_POINT_NAME = "best_agent.pt"
+
+
+class DeployablePolicy(nn.Module):
+    """Policy network with the state preprocessor folded in: observations -> mean actions.
+
+    Args:
+        layers: Weights and biases of the policy's linear layers (ReLU between them, tanh after the last one).
+        mean: Running mean of the state preprocessor (None if the states were not preprocessed).
+        std: Standard deviation (plus epsilon) of the state preprocessor.
+        clip_threshold: Clip threshold of the state preprocessor (in standard deviations).
+    """
+
+    def __init__(self, layers, mean=None, std=None, clip_threshold=5.0):
+        super().__init__()
+        weight, bias = layers[0][0].double(), layers[0][1].double()
+        if mean is None:
+            lower = torch.full((weight.shape[1],), -torch.inf, dtype=torch.float64)
+            upper = torch.full((weight.shape[1],), torch.inf, dtype=torch.float64)
+        else:
+            # W((x - m) / s) + b = (W / s) x + (b - W (m / s)),
+            # and clamp((x - m) / s, -c, c) = (clamp(x, m - cs, m + cs) - m) / s
+            mean, std = mean.double(), std.double()
+            lower, upper = mean - clip_threshold * std, mean + clip_threshold * std
+            bias = bias - weight @ (mean / std)
+            weight = weight / std
+        self.num_observations, self.num_actions = weight.shape[1], layers[-1][0].shape[0]
+        self.register_buffer("lower", lower.float())
+        self.register_buffer("upper", upper.float())
+        modules = []
+        for i, (w, b) in enumerate([(weight, bias)] + list(layers[1:])):
+            linear = nn.Linear(w.shape[1], w.shape[0])
+            linear.weight.data.copy_(w)
+            linear.bias.data.copy_(b)
+            modules += [linear, nn.ReLU()] if i < len(layers) - 1 else [linear, nn.Tanh()]
+        self.net = nn.Sequential(*modules)
+
+    def forward(self, observations: torch.Tensor) -> torch.Tensor:
+        return self.net(torch.clamp(observations, self.lower, self.upper))
+
+
+def policy_layers(state_dict: dict) -> list:
+    """Get the (weight, bias) of the policy linear layers, for the separate, stacked and shared networks
+    (see ``get_policy_value_models``)."""
+    if "net.0.weight" in state_dict:  # separate networks (Policy)
+        return [(state_dict[f"net.{i}.weight"], state_dict[f"net.{i}.bias"]) for i in (0, 2, 4)]
+    if "net.trunk.0.weight" in state_dict:  # shared trunk
+        layers = [(state_dict[f"net.trunk.{i}.weight"], state_dict[f"net.trunk.{i}.bias"]) for i in (0, 2)]
+    else:  # stacked networks: (policy, value) weights of shape (2, in, out)
+        num_layers = len([name for name in state_dict if name.startswith("net.weights.")])
+        layers = [(state_dict[f"net.weights.{i}"][0].T, state_dict[f"net.biases.{i}"][0, 0]) for i in range(num_layers)]
+    return layers + [(state_dict["net.policy_head.weight"], state_dict["net.policy_head.bias"])]
+
+
+def networks_type(state_dict: dict) -> str:
+    if "net.0.weight" in state_dict:
+        return "separate"
+    return "shared" if "net.trunk.0.weight" in state_dict else "stacked"
+
+
+def latest_checkpoint() -> str:
+    """Checkpoint of the latest experiment (as in play_amp.py)."""
+    folders = [f for f in os.listdir(EXPERIMENT_PATH) if os.path.isdir(os.path.join(EXPERIMENT_PATH, f))]
+    assert folders, f"No experiment folders found in {EXPERIMENT_PATH}"
+    latest_folder = max(folders, key=lambda x: os.path.getmtime(os.path.join(EXPERIMENT_PATH, x)))
+    return os.path.join(EXPERIMENT_PATH, latest_folder, "checkpoints", CHECK_POINT_NAME)
+
+
+def preprocessor_statistics(modules: dict) -> tuple:
+    """Mean and standard deviation (plus epsilon) of the state preprocessor, or None if there is none."""
+    if "state_preprocessor" not in modules:
+        return None, None
+    preprocessor = modules["state_preprocessor"]
+    epsilon = RunningStandardScaler(size=1, device="cpu").epsilon
+    return preprocessor["running_mean"], torch.sqrt(preprocessor["running_variance"]) + epsilon
+
+
+def load_deployable_policy(modules: dict) -> DeployablePolicy:
+    """Deployable policy (in evaluation mode) from the modules of an agent checkpoint."""
+    assert "policy" in modules, "No policy in the checkpoint"
+    mean, std = preprocessor_statistics(modules)
+    if mean is None:
+        print("[WARNING] No state preprocessor in the checkpoint: the observations are not normalized")
+    clip_threshold = RunningStandardScaler(size=1, device="cpu").clip_threshold
+    return DeployablePolicy(policy_layers(modules["policy"]), mean, std, clip_threshold).eval()
+
+
+def load_agent_policy(modules: dict, num_observations: int, num_actions: int):
+    """Original models (skrl policy and state preprocessor), as used by the agent."""
+    observation_space = gymnasium.spaces.Box(low=-np.inf, high=np.inf, shape=(num_observations,))
+    action_space = gymnasium.spaces.Box(low=-1, high=1, shape=(num_actions,))
+    policy, _ = get_policy_value_models(observation_space, action_space, "cpu", networks=networks_type(modules["policy"]))
+    policy.load_state_dict(modules["policy"])
+    policy.eval()
+    scaler = None
+    if "state_preprocessor" in modules:
+        scaler = RunningStandardScaler(size=observation_space, device="cpu")
+        scaler.load_state_dict(modules["state_preprocessor"])
+        scaler.eval()
+
+    def act(observations: torch.Tensor) -> torch.Tensor:
+        states = scaler(observations) if scaler is not None else observations
+        _, _, outputs = policy.act({"states": states}, role="policy")
+        return outputs["mean_actions"]
+
+    return act
+
+
+def measure_latency(function, observation: torch.Tensor, num_runs: int = 2000) -> tuple[float, float]:
+    """Median and 99th percentile latency (in microseconds)."""
+    for _ in range(100):
+        function(observation)
+    timings = []
+    for _ in range(num_runs):
+        start = time.perf_counter()
+        function(observation)
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1e6, np.percentile(timings, 99) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", type=str, default=None, help="Agent checkpoint (default: latest experiment)")
+    parser.add_argument("--output-dir", type=str, default=None, help="Output directory (default: <experiment>/exported)")
+    parser.add_argument("--num-samples", type=int, default=100000, help="Number of observations for the check")
+    parser.add_argument("--tolerance", type=float, default=1e-5, help="Maximum absolute difference of the actions")
+    parser.add_argument("--num-threads", type=int, default=1, help="Number of CPU threads for the latency benchmark")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or latest_checkpoint()
+    output_dir = args.output_dir or os.path.join(os.path.dirname(os.path.dirname(checkpoint)), "exported")
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"[INFO] Exporting {checkpoint} to {output_dir}")
+
+    modules = torch.load(checkpoint, map_location="cpu", weights_only=False)
+    deployable_policy = load_deployable_policy(modules)
+    num_observations, num_actions = deployable_policy.num_observations, deployable_policy.num_actions
+    mean, std = preprocessor_statistics(modules)
+
+    # artifacts
+    observation = torch.zeros(1, num_observations)
+    torchscript_path = os.path.join(output_dir, "policy.pt")
+    torch.jit.script(deployable_policy).save(torchscript_path)
+    onnx_path = os.path.join(output_dir, "policy.onnx")
+    try:
+        torch.onnx.export(
+            deployable_policy,
+            (observation,),
+            onnx_path,
+            input_names=["observations"],
+            output_names=["actions"],
+            dynamic_axes={"observations": {0: "batch"}, "actions": {0: "batch"}},
+            opset_version=17,
+            dynamo=False,
+        )
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = args.num_threads
+        session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+    except Exception as e:
+        # e.g. onnx/onnxruntime not installed, or a torch version without the TorchScript-based exporter
+        print(f"[WARNING] ONNX export/check skipped: {type(e).__name__}: {e}")
+        if os.path.exists(onnx_path):
+            os.remove(onnx_path)
+        onnx_path = session = None
+
+    # equivalence check against the agent's models, with observations within and beyond the clipping range
+    torch.manual_seed(0)
+    agent_act = load_agent_policy(modules, num_observations, num_actions)
+    observations = torch.randn(args.num_samples, num_observations) * 3
+    if mean is not None:
+        observations = mean.float() + observations * std.float()
+    torchscript_policy = torch.jit.load(torchscript_path).eval()
+    artifacts = {"folded": deployable_policy, "torchscript": torchscript_policy}
+    if session is not None:
+        artifacts["onnx"] = lambda x: torch.from_numpy(session.run(None, {"observations": x.numpy()})[0])
+    errors = {}
+    with torch.inference_mode():
+        expected = agent_act(observations)
+        for name, function in artifacts.items():
+            errors[name] = (function(observations) - expected).abs().max().item()
+            print(f"[INFO] {name}: max abs difference with the agent's policy: {errors[name]:.3e}")
+            assert errors[name] <= args.tolerance, f"The {name} policy differs from the agent's policy"
+
+        # CPU latency at batch size 1
+        torch.set_num_threads(args.num_threads)
+        latencies = {}
+        for name, function in {"agent": agent_act, **artifacts}.items():
+            latencies[name] = measure_latency(function, observations[:1].clone())
+    print(f"CPU latency at batch size 1 ({args.num_threads} thread(s)), in microseconds:")
+    for name, (p50, p99) in latencies.items():
+        print(f"  {name:<12} p50: {p50:8.1f}  p99: {p99:8.1f}")
+
+    with open(os.path.join(output_dir, "policy.json"), "w") as file:
+        json.dump(
+            {
+                "checkpoint": os.path.abspath(checkpoint),
+                "num_observations": num_observations,
+                "num_actions": num_actions,
+                "torchscript": os.path.basename(torchscript_path),
+                "onnx": os.path.basename(onnx_path) if onnx_path else None,
+                "max_abs_difference": errors,
+                "latency_us": {name: {"p50": p50, "p99": p99} for name, (p50, p99) in latencies.items()},
+            },
+            file,
+            indent=2,
+        )
+    print(f"[INFO] Exported policy: {output_dir}")
@@ -4,11 +4,58 @@ from skrl.agents.torch.amp import AMP_DEFAULT_CONFIG
 from skrl.models.torch import DeterministicMixin, GaussianMixin, Model
 from skrl.resources.preprocessors.torch import RunningStandardScaler
 
+
+def forward_net(net, states, autocast_bf16=False):
+    """Evaluate a network (in bfloat16 autocast, if enabled). The output (or each output, if it is a tuple) is float32.
+
+    The states are cast to bfloat16 inside the autocast region, so gradients with respect to the (float32) states,
+    e.g. for the discriminator gradient penalty, are float32 and the double backward goes through the bfloat16 ops.
+    """
+    with torch.autocast(device_type=states.device.type, dtype=torch.bfloat16, enabled=autocast_bf16):
+        outputs = net(states)
+        if isinstance(outputs, tuple):
+            return tuple(None if output is None else output.float() for output in outputs)
+        return outputs.float()
+
+def tensor_version(tensor):
+    """In-place modification counter of a tensor (None for inference tensors, which don't track it)."""
+    return None if tensor.is_inference() else tensor._version
+
+class MemoizedRunningStandardScaler(RunningStandardScaler):
+    """Running standard scaler that returns the same output tensor when standardizing the same input tensor again.
+
+    During the rollout, the AMP agent standardizes the states for the policy (``act``) and again for the value
+    (``record_transition``). Returning the same tensor lets BatchedValue reuse the value computed with the actions.
+    Only the last standardization (without training or inverse) is kept. It is reused if the input tensor and the
+    running statistics are unchanged, and the output wasn't modified (same tensors and in-place modification counters).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._memo = None
+
+    def forward(self, x, train=False, inverse=False, no_grad=True):
+        # inference tensors are not memoized: their in-place modifications can't be detected
+        if train or inverse or not no_grad or x.is_inference():
+            self._memo = None
+            return super().forward(x, train, inverse, no_grad)
+        # the statistics buffers are replaced when trained, and modified in place when loaded
+        inputs = (x, self.running_mean, self.running_variance, self.current_count)
+        if self._memo is not None:
+            memo_inputs, outputs, versions = self._memo
+            same_tensors = all(a is b for a, b in zip(memo_inputs, inputs))
+            if same_tensors and versions == tuple(tensor_version(tensor) for tensor in (*inputs, outputs)):
+                return outputs
+        outputs = super().forward(x, train, inverse, no_grad)
+        self._memo = (inputs, outputs, tuple(tensor_version(tensor) for tensor in (*inputs, outputs)))
+        return outputs
+
 class Policy(GaussianMixin, Model):
     def __init__(self, observation_space, action_space, device, clip_actions=False,
-                 clip_log_std=True, min_log_std=-20, max_log_std=2):
+                 clip_log_std=True, min_log_std=-20, max_log_std=2, autocast_bf16=False):
         Model.__init__(self, observation_space, action_space, device)
         GaussianMixin.__init__(self, clip_actions, clip_log_std, min_log_std, max_log_std)
+        self.autocast_bf16 = autocast_bf16
 
         self.net = nn.Sequential(nn.Linear(self.num_observations, 1024),
                                  nn.ReLU(),
@@ -20,12 +67,13 @@ class Policy(GaussianMixin, Model):
         self.log_std_parameter = nn.Parameter(torch.full((self.num_actions,), fill_value=-2.9), requires_grad=False)
 
     def compute(self, inputs, role):
-        return torch.tanh(self.net(inputs["states"])), self.log_std_parameter, {}
+        return torch.tanh(forward_net(self.net, inputs["states"], self.autocast_bf16)), self.log_std_parameter, {}
 
 class Value(DeterministicMixin, Model):
-    def __init__(self, observation_space, action_space, device, clip_actions=False):
+    def __init__(self, observation_space, action_space, device, clip_actions=False, autocast_bf16=False):
         Model.__init__(self, observation_space, action_space, device)
         DeterministicMixin.__init__(self, clip_actions)
+        self.autocast_bf16 = autocast_bf16
 
         self.net = nn.Sequential(nn.Linear(self.num_observations, 1024),
                                  nn.ReLU(),
@@ -34,12 +82,142 @@ class Value(DeterministicMixin, Model):
                                  nn.Linear(512, 1))
 
     def compute(self, inputs, role):
-        return self.net(inputs["states"]), {}
+        return forward_net(self.net, inputs["states"], self.autocast_bf16), {}
+
+class PolicyValueNet(nn.Module):
+    """Policy and value networks (same layers as in Policy and Value) evaluated in a single pass.
+
+    Args:
+        num_observations: Number of observations.
+        num_actions: Number of actions.
+        shared_trunk: If True, the policy and value heads share the hidden layers. Otherwise, the hidden layers of
+            both networks are stacked and evaluated with batched matrix multiplications (one GEMM per layer) on GPU.
+    """
+
+    def __init__(self, num_observations, num_actions, shared_trunk=False):
+        super().__init__()
+        self.shared_trunk = shared_trunk
+        sizes = [num_observations, 1024, 512]
+        if shared_trunk:
+            self.trunk = nn.Sequential(nn.Linear(sizes[0], sizes[1]), nn.ReLU(), nn.Linear(sizes[1], sizes[2]), nn.ReLU())
+        else:
+            # stacked (policy, value) weights, with the nn.Linear initialization: (2, in, out) and (2, 1, out)
+            self.weights, self.biases = nn.ParameterList(), nn.ParameterList()
+            for in_features, out_features in zip(sizes[:-1], sizes[1:]):
+                layers = [nn.Linear(in_features, out_features) for _ in range(2)]
+                self.weights.append(nn.Parameter(torch.stack([layer.weight.data.T for layer in layers])))
+                self.biases.append(nn.Parameter(torch.stack([layer.bias.data.unsqueeze(0) for layer in layers])))
+        self.policy_head = nn.Linear(sizes[-1], num_actions)
+        self.value_head = nn.Linear(sizes[-1], 1)
+
+    def _hidden(self, states, index):
+        """Hidden features of the stacked policy (index 0) or value (index 1) network."""
+        hidden = states
+        for weight, bias in zip(self.weights, self.biases):
+            hidden = torch.relu(torch.addmm(bias[index], hidden, weight[index]))
+        return hidden
+
+    def forward(self, states, value_only=False):
+        """Compute the policy output (pre-activation mean actions) and the value. The policy output is None if
+        ``value_only`` is True."""
+        if self.shared_trunk:
+            hidden = self.trunk(states)
+            return None if value_only else self.policy_head(hidden), self.value_head(hidden)
+        if value_only:
+            return None, self.value_head(self._hidden(states, 1))
+        if states.device.type != "cuda":
+            # there are no kernel launches to save on CPU, where the batched GEMMs are slower than one GEMM per network
+            return self.policy_head(self._hidden(states, 0)), self.value_head(self._hidden(states, 1))
+        hidden = states.unsqueeze(0).expand(2, -1, -1)
+        for weight, bias in zip(self.weights, self.biases):
+            hidden = torch.relu(torch.baddbmm(bias, hidden, weight))
+        return self.policy_head(hidden[0]), self.value_head(hidden[1])
+
+class BatchedPolicy(GaussianMixin, Model):
+    """Policy whose network also computes the value (see PolicyValueNet), for BatchedValue.
+
+    The value computed with the actions is cached, and used by the value model if it is next evaluated on the
+    same states tensor: the update evaluates both models on the same standardized states, and during the rollout the
+    MemoizedRunningStandardScaler state preprocessor (see get_amp_cfg) returns the same standardized states for the
+    policy and the value. The policy owns all the parameters.
+    """
+
+    def __init__(self, observation_space, action_space, device, clip_actions=False,
+                 clip_log_std=True, min_log_std=-20, max_log_std=2, autocast_bf16=False, shared_trunk=False):
+        Model.__init__(self, observation_space, action_space, device)
+        GaussianMixin.__init__(self, clip_actions, clip_log_std, min_log_std, max_log_std)
+        self.autocast_bf16 = autocast_bf16
+
+        self.net = PolicyValueNet(self.num_observations, self.num_actions, shared_trunk=shared_trunk)
+        self._value_cache = None
+
+        # set a fixed log standard deviation for the policy
+        self.log_std_parameter = nn.Parameter(torch.full((self.num_actions,), fill_value=-2.9), requires_grad=False)
+
+    def forward_net(self, states, value_only=False):
+        return forward_net(lambda x: self.net(x, value_only=value_only), states, self.autocast_bf16)
+
+    def cached_value(self, states):
+        """Pop the cached value, if it was computed from the given states tensor (and in the current grad mode).
+
+        The states are matched by identity (and in-place modification counter), without comparing their values.
+        """
+        if self._value_cache is None:
+            return None
+        cached_states, version, grad_enabled, values = self._value_cache
+        self._value_cache = None
+        if cached_states is not states or grad_enabled != torch.is_grad_enabled():
+            return None
+        # inference states (no version counter) are never matched, since they might have been modified in place
+        return values if version is not None and version == tensor_version(states) else None
+
+    def compute(self, inputs, role):
+        states = inputs["states"]
+        actions, values = self.forward_net(states)
+        self._value_cache = (states, tensor_version(states), torch.is_grad_enabled(), values)
+        return torch.tanh(actions), self.log_std_parameter, {}
+
+class BatchedValue(DeterministicMixin, Model):
+    """Value computed by the network of a BatchedPolicy (which owns the parameters)."""
+
+    def __init__(self, observation_space, action_space, device, policy, clip_actions=False):
+        Model.__init__(self, observation_space, action_space, device)
+        DeterministicMixin.__init__(self, clip_actions)
+        # not registered as a submodule: the parameters are optimized (and checkpointed) once, with the policy
+        self.__dict__["policy"] = policy
+
+    def compute(self, inputs, role):
+        values = self.policy.cached_value(inputs["states"])
+        if values is None:
+            _, values = self.policy.forward_net(inputs["states"], value_only=True)
+        return values, {}
+
+def get_policy_value_models(observation_space, action_space, device, networks="separate", autocast_bf16=False):
+    """Create the policy and value models.
+
+    Args:
+        networks: "separate" (Policy and Value), "stacked" (policy and value hidden layers evaluated with batched
+            matrix multiplications) or "shared" (shared hidden layers, with policy and value heads).
+
+    The discriminator is not batched with them: it takes the AMP observations, and the agent evaluates it on the
+    agent, replay and reference batches with separate calls, each one needing its own output.
+
+    Returns:
+        The policy and value models.
+    """
+    assert networks in ["separate", "stacked", "shared"], f"Unknown policy/value networks: {networks}"
+    if networks == "separate":
+        return (Policy(observation_space, action_space, device, autocast_bf16=autocast_bf16),
+                Value(observation_space, action_space, device, autocast_bf16=autocast_bf16))
+    policy = BatchedPolicy(observation_space, action_space, device, autocast_bf16=autocast_bf16,
+                           shared_trunk=networks == "shared")
+    return policy, BatchedValue(observation_space, action_space, device, policy)
 
 class Discriminator(DeterministicMixin, Model):
-    def __init__(self, observation_space, action_space, device, clip_actions=False):
+    def __init__(self, observation_space, action_space, device, clip_actions=False, autocast_bf16=False):
         Model.__init__(self, observation_space, action_space, device)
         DeterministicMixin.__init__(self, clip_actions)
+        self.autocast_bf16 = autocast_bf16
 
         self.net = nn.Sequential(nn.Linear(self.num_observations, 1024),
                                  nn.ReLU(),
@@ -48,12 +226,16 @@ class Discriminator(DeterministicMixin, Model):
                                  nn.Linear(512, 1))
 
     def compute(self, inputs, role):
-        return self.net(inputs["states"]), {}
+        return forward_net(self.net, inputs["states"], self.autocast_bf16), {}
 
 
 # instantiate a memory as rollout buffer (any memory can be used for this)
-def get_amp_cfg(env, device, use_wandb=False, wandb_project="skrl", resume_id=None):
+def get_amp_cfg(env, device, use_wandb=False, wandb_project="skrl", resume_id=None, autocast_bf16=False):
     cfg = AMP_DEFAULT_CONFIG.copy()
+    # bfloat16 autocast of the models (pass cfg["autocast_bf16"] to the models). It doesn't need gradient scaling,
+    # so skrl's mixed precision (float16 autocast with a gradient scaler) stays disabled
+    cfg["autocast_bf16"] = autocast_bf16
+    cfg["mixed_precision"] = False
     cfg["rollouts"] = 16  # memory_size
     cfg["learning_epochs"] = 6
     cfg["mini_batches"] = 2  # 16 * 4096 / 32768
@@ -77,7 +259,9 @@ def get_amp_cfg(env, device, use_wandb=False, wandb_project="skrl", resume_id=No
     cfg["discriminator_logit_regularization_scale"] = 0.05
     cfg["discriminator_gradient_penalty_scale"] = 5
     cfg["discriminator_weight_decay_scale"] = 1.0e-04
-    cfg["state_preprocessor"] = RunningStandardScaler
+    # same running standard scaler, returning the same standardized states to the policy and the value during the
+    # rollout (see BatchedPolicy)
+    cfg["state_preprocessor"] = MemoizedRunningStandardScaler
     cfg["state_preprocessor_kwargs"] = {"size": env.observation_space, "device": device}
     cfg["value_preprocessor"] = RunningStandardScaler
     cfg["value_preprocessor_kwargs"] = {"size": 1, "device": device}
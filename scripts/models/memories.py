@@ -0,0 +1,211 @@
+from typing import List, Optional, Tuple, Union
+
+import gymnasium
+import numpy as np
+import torch
+from skrl.memories.torch import Memory, RandomMemory
+
+
+class ReferenceObservationMemory(Memory):
+    """AMP motion dataset backed by the reference observation bank of the AMP motion manager.
+
+    The bank is preallocated and filled on the environment device by the manager. Samples added by the agent are
+    ignored: instead, the bank is partially refreshed (according to the ``reference_observation_bank_*`` entries of
+    ``AMPCfg``) once per agent update, when the agent samples the expert batches.
+    Use :meth:`collect_reference_motions` as the agent's ``collect_reference_motions`` callable.
+    """
+
+    def __init__(self, amp_motion_manager, device: Optional[Union[str, torch.device]] = None) -> None:
+        assert amp_motion_manager.reference_observation_bank_size, "The reference observation bank is disabled"
+        super().__init__(memory_size=amp_motion_manager.reference_observation_bank_size, num_envs=1, device=device)
+        self._amp_motion_manager = amp_motion_manager
+        self._placeholder = None
+        self.filled = True
+
+    def __len__(self) -> int:
+        return self.memory_size
+
+    def collect_reference_motions(self, num_samples: int) -> torch.Tensor:
+        # the agent only passes these samples to add_samples, which ignores them: return a placeholder of the
+        # right shape (an expanded zero row, without allocating or gathering from the bank)
+        if self._placeholder is None:
+            self._placeholder = torch.zeros(1, self._amp_motion_manager.amp_observation_size, device=self.device)
+        return self._placeholder.expand(num_samples, -1)
+
+    def create_tensor(
+        self,
+        name: str,
+        size: Union[int, Tuple[int], gymnasium.Space],
+        dtype: Optional[torch.dtype] = None,
+        keep_dimensions: bool = False,
+    ) -> bool:
+        # the reference observations are stored in the bank
+        return False
+
+    def add_samples(self, **tensors: torch.Tensor) -> None:
+        # the bank is refreshed by the manager (see sample)
+        pass
+
+    def sample(
+        self, names: Tuple[str], batch_size: int, mini_batches: int = 1, sequence_length: int = 1
+    ) -> List[List[torch.Tensor]]:
+        self._amp_motion_manager.refresh_reference_observation_bank()
+        batches = self._amp_motion_manager.sample_reference_observation_bank(batch_size)
+        return [[batch for _ in names] for batch in batches.split(batch_size // mini_batches)[:mini_batches]]
+
+
+COMPACT_STORAGES = {"float32": torch.float32, "float16": torch.float16, "bfloat16": torch.bfloat16, "int8": torch.int8}
+"""Storage types of the compact memory tensors."""
+
+
+class CompactRandomMemory(RandomMemory):
+    """Random memory that stores selected float tensors (e.g. observations) in a compact storage type.
+
+    Tensors are stored as float16/bfloat16, or as int8 values quantized per feature with the mean and standard
+    deviation of a running normalizer (see :meth:`set_scaler`): values within ``int8_range`` standard deviations
+    of the mean are represented, and the rest is clipped. Until the normalizer is updated, the statistics of the
+    first added samples are used. When the normalizer statistics drift (relative change above
+    ``int8_rescale_tolerance``), the stored values are requantized with the new statistics. The drift is checked
+    (one host synchronization) every ``int8_rescale_interval`` samplings.
+    Tensors are upcast to float32 when sampled (or retrieved by name).
+    """
+
+    def __init__(
+        self,
+        memory_size: int,
+        num_envs: int = 1,
+        device: Optional[Union[str, torch.device]] = None,
+        compact_names: Tuple[str] = ("states",),
+        storage: str = "bfloat16",
+        int8_range: float = 5.0,
+        int8_rescale_tolerance: float = 0.25,
+        int8_rescale_interval: int = 8,
+        replacement: bool = True,
+    ) -> None:
+        assert storage in COMPACT_STORAGES, f"Unsupported storage type: {storage}"
+        super().__init__(memory_size=memory_size, num_envs=num_envs, device=device, replacement=replacement)
+        self._compact_names = tuple(compact_names) if storage != "float32" else ()
+        self._storage = storage
+        self._int8_range = int8_range
+        self._int8_rescale_tolerance = int8_rescale_tolerance
+        self._int8_rescale_interval = max(1, int8_rescale_interval)
+        self._num_samplings = 0
+        self._scalers = {}
+        self._int8_offsets = {}
+        self._int8_scales = {}
+
+    def set_scaler(self, name: str, scaler: torch.nn.Module) -> None:
+        """Set the running normalizer (e.g. ``RunningStandardScaler``) whose statistics quantize a tensor as int8."""
+        self._scalers[name] = scaler
+
+    def create_tensor(
+        self,
+        name: str,
+        size: Union[int, Tuple[int], gymnasium.Space],
+        dtype: Optional[torch.dtype] = None,
+        keep_dimensions: bool = False,
+    ) -> bool:
+        if name not in self._compact_names or dtype not in [None, torch.float32]:
+            return super().create_tensor(name, size, dtype, keep_dimensions)
+        assert not keep_dimensions, "Compact tensors must be flat"
+        created = super().create_tensor(name, size, COMPACT_STORAGES[self._storage], keep_dimensions)
+        if created and self._storage == "int8":
+            # statistics are set from the first samples (or the normalizer, if it has been updated)
+            self._int8_offsets[name] = None
+            self._int8_scales[name] = None
+        return created
+
+    def _encode(
+        self, name: str, tensor: torch.Tensor, offsets: Optional[torch.Tensor] = None, scales: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        if self._storage != "int8":
+            return tensor.to(COMPACT_STORAGES[self._storage])
+        offsets = self._int8_offsets[name] if offsets is None else offsets
+        scales = self._int8_scales[name] if scales is None else scales
+        return torch.round((tensor - offsets) / scales).clamp_(-127, 127).to(torch.int8)
+
+    def _decode(self, name: str, tensor: torch.Tensor) -> torch.Tensor:
+        if self._storage != "int8" or self._int8_scales[name] is None:
+            return tensor.float()
+        return tensor.float() * self._int8_scales[name] + self._int8_offsets[name]
+
+    def _calibrate_int8_scales(self, name: str, tensor: torch.Tensor) -> None:
+        """Set the int8 statistics of a tensor from its first samples (if its normalizer has not been updated yet)."""
+        tensor = tensor.view(-1, tensor.shape[-1]).float()
+        offsets = tensor.mean(dim=0)
+        stds = tensor.std(dim=0, unbiased=False).clamp_(min=1e-3) if tensor.shape[0] > 1 else torch.ones_like(offsets)
+        scaler = self._scalers.get(name)
+        if scaler is not None:
+            # select the normalizer statistics on the device (no host synchronization)
+            updated = scaler.current_count.to(self.device) > 1
+            offsets = torch.where(updated, scaler.running_mean.float().to(self.device), offsets)
+            stds = torch.where(
+                updated, torch.sqrt(scaler.running_variance.float().to(self.device)) + scaler.epsilon, stds
+            )
+        self._int8_offsets[name] = offsets
+        self._int8_scales[name] = stds * self._int8_range / 127
+
+    def _update_int8_scales(self, name: str, chunk_size: int = 65536) -> None:
+        """Update the int8 statistics of a tensor from its normalizer, and requantize it if they drifted."""
+        scaler = self._scalers.get(name)
+        if scaler is None or self._int8_scales[name] is None:
+            return
+        offsets = scaler.running_mean.float().to(self.device)
+        stds = torch.sqrt(scaler.running_variance.float().to(self.device)) + scaler.epsilon
+        scales = stds * self._int8_range / 127
+        drift = torch.maximum(
+            (scales / self._int8_scales[name] - 1).abs(), (offsets - self._int8_offsets[name]).abs() / stds
+        ).max()
+        # a single host synchronization: no drift until the normalizer has been updated
+        drift = torch.where(scaler.current_count.to(self.device) > 1, drift, torch.zeros_like(drift))
+        if drift.item() <= self._int8_rescale_tolerance:
+            return
+        # requantize the stored values (in chunks, to bound the memory usage)
+        with torch.no_grad():
+            for chunk in self.tensors_view[name].split(chunk_size):
+                chunk.copy_(self._encode(name, self._decode(name, chunk), offsets, scales))
+        self._int8_offsets[name] = offsets
+        self._int8_scales[name] = scales
+
+    def _update_all_int8_scales(self) -> None:
+        """Update the int8 statistics of the tensors every ``int8_rescale_interval`` samplings."""
+        if not self._int8_scales:
+            return
+        self._num_samplings += 1
+        if (self._num_samplings - 1) % self._int8_rescale_interval:
+            return
+        for name in self._int8_scales:
+            self._update_int8_scales(name)
+
+    def add_samples(self, **tensors: torch.Tensor) -> None:
+        for name in self._compact_names:
+            if name in tensors and name in self.tensors:
+                if self._storage == "int8" and self._int8_scales[name] is None:
+                    self._calibrate_int8_scales(name, tensors[name])
+                tensors[name] = self._encode(name, tensors[name])
+        super().add_samples(**tensors)
+
+    def get_tensor_by_name(self, name: str, keepdim: bool = True) -> torch.Tensor:
+        tensor = super().get_tensor_by_name(name, keepdim)
+        return self._decode(name, tensor) if name in self._compact_names else tensor
+
+    def set_tensor_by_name(self, name: str, tensor: torch.Tensor) -> None:
+        if name in self._compact_names:
+            tensor = self._encode(name, tensor)
+        super().set_tensor_by_name(name, tensor)
+
+    def _decode_batches(self, names: Tuple[str], batches: List[List[torch.Tensor]]) -> List[List[torch.Tensor]]:
+        return [
+            [self._decode(name, tensor) if name in self._compact_names else tensor for name, tensor in zip(names, batch)]
+            for batch in batches
+        ]
+
+    def sample_by_index(
+        self, names: Tuple[str], indexes: Union[tuple, np.ndarray, torch.Tensor], mini_batches: int = 1
+    ) -> List[List[torch.Tensor]]:
+        self._update_all_int8_scales()
+        return self._decode_batches(names, super().sample_by_index(names, indexes, mini_batches))
+
+    def sample_all(self, names: Tuple[str], mini_batches: int = 1, sequence_length: int = 1) -> List[List[torch.Tensor]]:
+        self._update_all_int8_scales()
+        return self._decode_batches(names, super().sample_all(names, mini_batches, sequence_length))
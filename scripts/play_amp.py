@@ -6,7 +6,7 @@ from skrl.memories.torch import RandomMemory
 from skrl.trainers.torch import SequentialTrainer
 from skrl.utils import set_seed
 
-from models.amp import Policy, Value, Discriminator, get_amp_cfg
+from models.amp import Discriminator, get_amp_cfg, get_policy_value_models
 import os
 import gymnasium as gym
 
@@ -16,6 +16,8 @@ EXPERIMENT_PATH = "runs/UnitreeG1_AMP/"
 # if you want to specify a particular experiment ID, you can set it here, such as EXPERIMENT_ID = "2024-06-10_15-30-00"
 EXPERIMENT_ID = None
 CHECK_POINT_NAME = "best_agent.pt"
+# policy and value networks used for training the checkpoint (POLICY_VALUE_NETWORKS in train_amp.py)
+POLICY_VALUE_NETWORKS = "separate"
 
 # try to load find the checkpoint path
 try:
@@ -46,7 +48,7 @@ video_kwargs = {
 
 # load and wrap the Isaac Lab environment
 # env = load_isaaclab_env(task_name="Isaac-Humanoid-AMP-Run-Direct-v0", cli_args=["--video", "--headless", "--enable_cameras"],)
-env = load_isaaclab_env(task_name="Isaac-G1-AMP-Dance-v0", cli_args=["--video", "--headless", "--enable_cameras"],)
+env = load_isaaclab_env(task_name="Isaac-G1-AMP-Dance-Play-v0", cli_args=["--video", "--headless", "--enable_cameras"],)
 if VIDEO:
     env = gym.wrappers.RecordVideo(env, **video_kwargs)
 env = wrap_env(env)
@@ -60,9 +62,11 @@ cfg["experiment"]["checkpoint_interval"] = 0  # don't save checkpoints
 memory = RandomMemory(memory_size=cfg['rollouts'], num_envs=env.num_envs, device=device)
 
 models = {}
-models["policy"] = Policy(env.observation_space, env.action_space, device)
-models["value"] = Value(env.observation_space, env.action_space, device)
-models["discriminator"] = Discriminator(env.amp_observation_space, env.action_space, device)
+models["policy"], models["value"] = get_policy_value_models(env.observation_space, env.action_space, device,
+                                                            networks=POLICY_VALUE_NETWORKS,
+                                                            autocast_bf16=cfg["autocast_bf16"])
+models["discriminator"] = Discriminator(env.amp_observation_space, env.action_space, device,
+                                        autocast_bf16=cfg["autocast_bf16"])
 
 agent = AMP(models=models,
             memory=memory,
@@ -71,9 +75,11 @@ agent = AMP(models=models,
             action_space=env.action_space,
             device=device,
             amp_observation_space=env.amp_observation_space,
-            motion_dataset=RandomMemory(memory_size=200000, device=device),
+            # no reference AMP observations: they are only used by the agent updates
+            # (the play task disables the reference observation bank)
+            motion_dataset=None,
             reply_buffer=RandomMemory(memory_size=1000000, device=device),
-            collect_reference_motions=lambda num_samples: env.collect_reference_motions(num_samples),
+            collect_reference_motions=None,
 )
 
 # configure and instantiate the RL trainer
@@ -0,0 +1,276 @@
+"""
+Local policy inference server: several robots (or HIL rigs) share one policy loaded once on the host.
+
+The policy is loaded from an agent checkpoint (with the state preprocessor folded in, see ``export_policy.py``)
+and served over a Unix socket by an asyncio front end. Requests that arrive within a batching window are evaluated
+together (up to a maximum batch size), in preallocated buffers and under ``torch.inference_mode``.
+
+Protocol (little-endian): when a client connects, the server sends the number of observations and actions (two
+uint32). Then, for each request, the client sends the observations (float32) and receives the actions (float32).
+
+USAGE:
+    # serve the policy
+    python scripts/policy_server.py [--checkpoint runs/UnitreeG1_AMP/<experiment>/checkpoints/best_agent.pt]
+    # latency and throughput with simulated clients (e.g. 16 robots at 50 Hz)
+    python scripts/policy_server.py --benchmark --num-clients 16 --rate 50
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from export_policy import latest_checkpoint, load_deployable_policy  # noqa: E402
+
+HEADER = struct.Struct("<II")
+
+
+class PolicyServer:
+    """Serve a policy (observations -> actions) with dynamic batching.
+
+    Args:
+        policy: Policy module (e.g. a DeployablePolicy).
+        num_observations: Number of observations.
+        num_actions: Number of actions.
+        max_batch_size: Maximum number of requests evaluated together.
+        batch_window: Time (in seconds) to wait for more requests after the first one of a batch. With no window,
+            the requests received while the previous batch was evaluated are batched. If the inference of a batch
+            fails, the connections of its requests are closed and the server keeps serving.
+    """
+
+    def __init__(self, policy, num_observations, num_actions, max_batch_size=64, batch_window=0.0):
+        self.policy = policy
+        self.num_observations = num_observations
+        self.num_actions = num_actions
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        # preallocated input/output buffers (and their numpy views)
+        self._observations = torch.zeros(max_batch_size, num_observations)
+        self._actions = torch.zeros(max_batch_size, num_actions)
+        self._observations_view = self._observations.numpy()
+        self._actions_view = self._actions.numpy()
+        self._queue = None
+        self.statistics = {"requests": 0, "batches": 0, "failed_batches": 0, "inference_time": 0.0, "max_batch_size": 0}
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        # add the requests already received, then wait for more until the end of the batching window
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_loop(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            num_requests = len(batch)
+            start = time.perf_counter()
+            try:
+                for i, (observations, _) in enumerate(batch):
+                    self._observations_view[i] = np.frombuffer(observations, dtype=np.float32)
+                with torch.inference_mode():
+                    self._actions[:num_requests] = self.policy(self._observations[:num_requests])
+            except Exception as e:
+                # fail the requests of the batch (their connections are closed), and keep serving
+                print(f"[WARNING] Policy inference failed for a batch of {num_requests} requests: {e!r}", flush=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self.statistics["failed_batches"] += 1
+                continue
+            self.statistics["inference_time"] += time.perf_counter() - start
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(self._actions_view[i].tobytes())
+            self.statistics["requests"] += num_requests
+            self.statistics["batches"] += 1
+            self.statistics["max_batch_size"] = max(self.statistics["max_batch_size"], num_requests)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        writer.write(HEADER.pack(self.num_observations, self.num_actions))
+        try:
+            while True:
+                observations = await reader.readexactly(4 * self.num_observations)
+                future = loop.create_future()
+                self._queue.put_nowait((observations, future))
+                writer.write(await future)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        except Exception:
+            # failed inference (see _batch_loop): the client gets a closed connection
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str) -> None:
+        """Serve the policy on a Unix socket, until cancelled (or SIGINT/SIGTERM)."""
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+
+        def on_batch_loop_done(task: asyncio.Task) -> None:
+            # the batch loop only stops if cancelled, or on an unexpected error: stop the server
+            if not task.cancelled() and task.exception() is not None:
+                print(f"[ERROR] The batch loop stopped: {task.exception()!r}", flush=True)
+                if not stop.done():
+                    stop.cancel()
+
+        batch_task = asyncio.create_task(self._batch_loop())
+        batch_task.add_done_callback(on_batch_loop_done)
+        server = await asyncio.start_unix_server(self._handle_client, path=socket_path)
+        for signal_number in [signal.SIGINT, signal.SIGTERM]:
+            loop.add_signal_handler(signal_number, stop.cancel)
+        print(f"[INFO] Serving the policy on {socket_path} (window: {self.batch_window * 1e3} ms)", flush=True)
+        try:
+            async with server:
+                await stop
+        except asyncio.CancelledError:
+            pass
+        finally:
+            batch_task.cancel()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            requests, batches = self.statistics["requests"], max(self.statistics["batches"], 1)
+            print(
+                f"[INFO] Served {requests} requests in {self.statistics['batches']} batches (mean batch size:"
+                f" {requests / batches:.2f}, max: {self.statistics['max_batch_size']}, mean inference time:"
+                f" {self.statistics['inference_time'] / batches * 1e6:.1f} us, failed batches:"
+                f" {self.statistics['failed_batches']})",
+                flush=True,
+            )
+
+
+class PolicyClient:
+    """Blocking client of the policy server (e.g. for a robot control loop)."""
+
+    def __init__(self, socket_path: str):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        self.num_observations, self.num_actions = HEADER.unpack(self._receive(HEADER.size))
+        self._actions = np.zeros(self.num_actions, dtype=np.float32)
+
+    def _receive(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self._socket.recv(size - len(data))
+            assert chunk, "Connection closed by the policy server"
+            data += chunk
+        return data
+
+    def act(self, observations: np.ndarray) -> np.ndarray:
+        """Get the actions for an observation vector."""
+        self._socket.sendall(np.ascontiguousarray(observations, dtype=np.float32).tobytes())
+        self._actions[:] = np.frombuffer(self._receive(4 * self.num_actions), dtype=np.float32)
+        return self._actions
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+def run_server(checkpoint: str, socket_path: str, max_batch_size: int, batch_window: float, num_threads: int) -> None:
+    torch.set_num_threads(num_threads)
+    policy = load_deployable_policy(torch.load(checkpoint, map_location="cpu", weights_only=False))
+    num_observations, num_actions = policy.num_observations, policy.num_actions
+    policy = torch.jit.script(policy)
+    # warm-up (TorchScript optimizes the graph during the first calls)
+    with torch.inference_mode():
+        for batch_size in range(1, max_batch_size + 1):
+            for _ in range(3):
+                policy(torch.zeros(batch_size, num_observations))
+    server = PolicyServer(policy, num_observations, num_actions, max_batch_size, batch_window)
+    asyncio.run(server.serve(socket_path))
+
+
+async def run_clients(socket_path: str, num_clients: int, rate: float, duration: float) -> tuple[np.ndarray, float]:
+    """Simulated robots: each client sends an observation vector at a fixed rate (with a random phase).
+
+    Returns:
+        The latencies (in seconds) of all requests, and the elapsed time.
+    """
+
+    async def client(latencies: list) -> None:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        num_observations, num_actions = HEADER.unpack(await reader.readexactly(HEADER.size))
+        observations = np.random.randn(num_observations).astype(np.float32).tobytes()
+        loop = asyncio.get_running_loop()
+        next_time = loop.time() + np.random.uniform(0, 1 / rate)
+        end_time = loop.time() + duration
+        while next_time < end_time:
+            await asyncio.sleep(max(next_time - loop.time(), 0))
+            start = time.perf_counter()
+            writer.write(observations)
+            await reader.readexactly(4 * num_actions)
+            latencies.append(time.perf_counter() - start)
+            next_time += 1 / rate
+        writer.close()
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(latencies) for _ in range(num_clients)])
+    return np.array(latencies), time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", type=str, default=None, help="Agent checkpoint (default: latest experiment)")
+    parser.add_argument("--socket", type=str, default="/tmp/g1_amp_policy.sock", help="Unix socket path")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Maximum batch size")
+    parser.add_argument("--batch-window", type=float, default=0.0, help="Batching window (in milliseconds)")
+    parser.add_argument("--num-threads", type=int, default=1, help="Number of CPU threads for the inference")
+    parser.add_argument("--benchmark", action="store_true", help="Run simulated clients against a server process")
+    parser.add_argument("--num-clients", type=int, default=16, help="Number of simulated clients (benchmark)")
+    parser.add_argument("--rate", type=float, default=50.0, help="Control rate of each client, in Hz (benchmark)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duration in seconds (benchmark)")
+    args = parser.parse_args()
+
+    server_args = (
+        args.checkpoint or latest_checkpoint(),
+        args.socket,
+        args.max_batch_size,
+        args.batch_window * 1e-3,
+        args.num_threads,
+    )
+    if not args.benchmark:
+        run_server(*server_args)
+    else:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = multiprocessing.get_context("spawn").Process(target=run_server, args=server_args)
+        server.start()
+        while not os.path.exists(args.socket):
+            assert server.is_alive(), "The policy server failed to start"
+            time.sleep(0.1)
+        latencies, elapsed = asyncio.run(run_clients(args.socket, args.num_clients, args.rate, args.duration))
+        server.terminate()
+        server.join()
+        latencies *= 1e6
+        print(
+            f"{args.num_clients} clients at {args.rate} Hz, window {args.batch_window} ms: {len(latencies)} requests,"
+            f" {len(latencies) / elapsed:.1f} requests/s"
+        )
+        print(
+            f"latency (us): p50 {np.percentile(latencies, 50):.1f}, p99 {np.percentile(latencies, 99):.1f},"
+            f" max {latencies.max():.1f}"
+        )
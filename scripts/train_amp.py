@@ -1,14 +1,28 @@
 
+import os
+
 # import the skrl components to build the RL system
 from skrl.agents.torch.amp import AMP
 from skrl.envs.loaders.torch import load_isaaclab_env
 from skrl.envs.wrappers.torch import wrap_env
-from skrl.memories.torch import RandomMemory
 
 from skrl.trainers.torch import SequentialTrainer
 from skrl.utils import set_seed
 
-from models.amp import Policy, Value, Discriminator, get_amp_cfg
+from models.amp import Discriminator, get_amp_cfg, get_policy_value_models
+from models.memories import CompactRandomMemory, ReferenceObservationMemory
+
+# storage of the rollout and replay buffer observations: "float32", "bfloat16", "float16" or "int8"
+# (int8 values are quantized with the running normalizer statistics, see models/memories.py)
+MEMORY_STORAGE = "float32"
+
+# policy and value networks: "separate", "stacked" (evaluated together, with batched GEMMs) or "shared" (shared
+# hidden layers). See models/amp.py and benchmarks/policy_value_networks.py (the checkpoints are not interchangeable)
+POLICY_VALUE_NETWORKS = "separate"
+
+# opt-in profiling of the environment step phases and of the training loop (see amp_task/profiling.py).
+# Summaries are written to TensorBoard ("Profiling / ..."), and the trace to the experiment directory
+PROFILING = False
 
 RESUME = False
 # if you want to resume training, set the path to the checkpoint file
@@ -27,13 +41,22 @@ cfg = get_amp_cfg(env=env, device=device)
 # cfg = get_amp_cfg(env=env, device=device, use_wandb=True, wandb_project="my-project")
 # if you want to resume training and log the experiment to wandb
 # cfg = get_amp_cfg(env=env, device=device, use_wandb=True, wandb_project="my-project", resume_id="xxxx")
+# if you want to train the models in bfloat16 autocast (see benchmarks/bf16_training.py)
+# cfg = get_amp_cfg(env=env, device=device, autocast_bf16=True)
+
+memory = CompactRandomMemory(memory_size=cfg['rollouts'], num_envs=env.num_envs, device=device,
+                             compact_names=("states", "amp_states"), storage=MEMORY_STORAGE)
+reply_buffer = CompactRandomMemory(memory_size=1000000, device=device, compact_names=("states",), storage=MEMORY_STORAGE)
 
-memory = RandomMemory(memory_size=cfg['rollouts'], num_envs=env.num_envs, device=device)
+# reference AMP observations (on-device bank, refreshed by the environment's AMP motion manager)
+motion_dataset = ReferenceObservationMemory(env.amp_motion_manager, device=device)
 
 models = {}
-models["policy"] = Policy(env.observation_space, env.action_space, device)
-models["value"] = Value(env.observation_space, env.action_space, device)
-models["discriminator"] = Discriminator(env.amp_observation_space, env.action_space, device)
+models["policy"], models["value"] = get_policy_value_models(env.observation_space, env.action_space, device,
+                                                            networks=POLICY_VALUE_NETWORKS,
+                                                            autocast_bf16=cfg["autocast_bf16"])
+models["discriminator"] = Discriminator(env.amp_observation_space, env.action_space, device,
+                                        autocast_bf16=cfg["autocast_bf16"])
 
 # instantiate the agent's models (function approximators).
 agent = AMP(models=models,
@@ -43,17 +66,40 @@ agent = AMP(models=models,
             action_space=env.action_space,
             device=device,
             amp_observation_space=env.amp_observation_space,
-            motion_dataset=RandomMemory(memory_size=200000, device=device),
-            reply_buffer=RandomMemory(memory_size=1000000, device=device),
-            collect_reference_motions=lambda num_samples: env.collect_reference_motions(num_samples),
+            motion_dataset=motion_dataset,
+            reply_buffer=reply_buffer,
+            collect_reference_motions=motion_dataset.collect_reference_motions,
 )
 
+# int8 storage uses the statistics of the agent's running normalizers
+memory.set_scaler("states", agent._state_preprocessor)
+memory.set_scaler("amp_states", agent._amp_state_preprocessor)
+reply_buffer.set_scaler("states", agent._amp_state_preprocessor)
+
 if RESUME:
     agent.load(RESUME)
 
+if PROFILING:
+    profiler = env.unwrapped.enable_profiling()
+    profiler.instrument(env, ["step", "reset"], prefix="wrapped_env")
+    profiler.instrument(agent, ["pre_interaction", "act", "record_transition", "_update"], prefix="agent")
+    post_interaction = agent.post_interaction
+
+    def profiled_post_interaction(timestep, timesteps):
+        # write the statistics since the last timestep (written to TensorBoard with the agent's tracking data)
+        profiler.write_summary(agent.track_data)
+        with profiler.record("agent.post_interaction"):
+            post_interaction(timestep=timestep, timesteps=timesteps)
+
+    agent.post_interaction = profiled_post_interaction
+
 # configure and instantiate the RL trainer
 cfg_trainer = {"timesteps": 80000, "headless": True}
 trainer = SequentialTrainer(cfg=cfg_trainer, env=env, agents=agent)
 
 # start training
-trainer.train()
\ No newline at end of file
+trainer.train()
+
+if PROFILING:
+    profiler.print_summary()
+    profiler.export_chrome_trace(os.path.join(agent.experiment_dir, "profiler_trace.json"))
\ No newline at end of file